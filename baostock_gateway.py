@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地Baostock网关：常驻进程保持一个已登录的会话，各脚本通过Unix socket查询，不再各自登录登出
+网关串行调用Baostock（baostock的连接是进程内全局的，同一时刻只能有一个请求），
+按--rate限速，成功的结果按--cache-ttl缓存，重复查询直接返回；调用仍经过重试、超时和统计包装
+
+用法（选项需写在脚本名之前，脚本名之后的参数原样传给脚本）：
+    python3 baostock_gateway.py serve                     # 启动网关
+    python3 baostock_gateway.py run check_pufa_dividend.py  # 脚本中的import baostock改为连接网关
+    python3 baostock_gateway.py stats                     # 查看调用和缓存统计
+    python3 baostock_gateway.py stop                      # 停止网关
+脚本中也可以直接`import baostock_gateway as bs`，接口与baostock模块一致
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import socket
+import inspect
+import logging
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+
+from baostock_metrics import BaostockMetrics
+from baostock_replay import ReplayResultData, request_key
+from baostock_retry import NETWORK_ERROR_PREFIX, BaostockError, resilient_baostock
+from progress import setup_logging, add_logging_arguments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.environ.get("BAOSTOCK_GATEWAY_SOCKET", "/tmp/dividend-ranker-baostock.sock")
+# 连接不上网关时返回的错误码，按网络错误分类，调用方会重试
+GATEWAY_ERROR_CODE = NETWORK_ERROR_PREFIX + "900"
+# 请求格式错误时返回的错误码，按不可重试的错误分类
+BAD_REQUEST_ERROR_CODE = "gateway_bad_request"
+
+
+def normalize_args(func, args, kwargs):
+    """按函数签名把位置参数转为关键字参数，同一查询无论按位置还是按名称传参都得到同一缓存键；
+    无法绑定或有可变参数时原样返回"""
+    try:
+        signature = inspect.signature(func)
+        bound = signature.bind_partial(*args, **kwargs)
+    except (TypeError, ValueError):
+        return args, kwargs
+    variadic = (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+    if any(signature.parameters[name].kind in variadic for name in bound.arguments):
+        return args, kwargs
+    return [], dict(bound.arguments)
+
+
+def cache_key(api, args, kwargs):
+    """查询的缓存键，与回放数据的键一致；有位置参数时附加在后面"""
+    key = request_key(api, kwargs)
+    return key + " " + json.dumps([str(arg) for arg in args], ensure_ascii=False) if args else key
+
+
+class QueryCache:
+    """带过期时间的LRU缓存，只保存成功的查询结果"""
+
+    def __init__(self, ttl=3600.0, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored, response = entry
+            if time.monotonic() - stored > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class RateLimiter:
+    """限制每秒调用次数：两次调用之间至少间隔1/rate秒，rate为0表示不限速"""
+
+    def __init__(self, rate=0.0):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = 0.0
+
+    def wait(self):
+        """在持有上游锁时调用，因此无需额外加锁"""
+        now = time.monotonic()
+        if now < self.next_time:
+            time.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = now + self.interval
+
+
+class BaostockGateway:
+    """持有上游会话，串行执行查询，负责缓存和限速；
+    api_module为未包装的baostock模块，用其函数签名规范化参数"""
+
+    def __init__(self, upstream, metrics, cache, limiter, api_module=None):
+        self.upstream = upstream
+        self.metrics = metrics
+        self.cache = cache
+        self.limiter = limiter
+        self.api_module = api_module
+        self.lock = threading.Lock()
+        # 请求在各连接线程中并发计数
+        self.counter_lock = threading.Lock()
+        self.requests = 0
+
+    def query(self, api, args, kwargs):
+        """执行一次查询，返回可JSON序列化的结果"""
+        with self.counter_lock:
+            self.requests += 1
+        func = getattr(self.api_module, api, None)
+        if callable(func):
+            args, kwargs = normalize_args(func, args, kwargs)
+        key = cache_key(api, args, kwargs)
+        response = self.cache.get(key)
+        if response is None:
+            with self.lock:
+                # 等锁期间可能已有相同的查询完成
+                response = self.cache.get(key)
+                if response is None:
+                    self.limiter.wait()
+                    response = self.call_upstream(api, args, kwargs)
+                    if response["error_code"] == "0":
+                        self.cache.put(key, response)
+                    return response
+        self.metrics.record_cache_hit(api)
+        return response
+
+    def call_upstream(self, api, args, kwargs):
+        try:
+            rs = getattr(self.upstream, api)(*args, **kwargs)
+        except BaostockError as e:
+            return {"error_code": e.error_code, "error_msg": e.error_msg, "fields": [], "rows": []}
+        except Exception as e:
+            return {"error_code": GATEWAY_ERROR_CODE, "error_msg": f"{type(e).__name__}: {e}", "fields": [], "rows": []}
+        rows = []
+        if rs.error_code == '0':
+            while rs.next():
+                rows.append(rs.get_row_data())
+        return {"error_code": rs.error_code, "error_msg": rs.error_msg, "fields": list(rs.fields or []), "rows": rows}
+
+    def stats(self):
+        return {"requests": self.requests, "cached": len(self.cache.entries), "apis": self.metrics.summaries()}
+
+
+class GatewayRequestHandler(socketserver.StreamRequestHandler):
+    """每行一个JSON请求，返回一行JSON；格式错误的请求返回错误结果，连接保持可用"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.respond(json.loads(line))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                logger.warning(f"网关收到格式错误的请求: {type(e).__name__}: {e}")
+                response = {"error_code": BAD_REQUEST_ERROR_CODE, "error_msg": f"请求格式错误: {type(e).__name__}: {e}",
+                            "fields": [], "rows": []}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def respond(self, request):
+        """处理一个请求，格式错误时抛出ValueError等异常"""
+        op = request.get("op", "query")
+        if op == "query":
+            api = request["api"]
+            args, kwargs = request.get("args", []), request.get("kwargs", {})
+            if not isinstance(api, str) or not api.startswith("query_"):
+                raise ValueError(f"不支持的接口: {api}")
+            if not isinstance(args, list) or not isinstance(kwargs, dict):
+                raise TypeError("args应为数组，kwargs应为对象")
+            return self.server.gateway.query(api, args, kwargs)
+        if op == "stats":
+            return self.server.gateway.stats()
+        if op == "stop":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"error_code": "0", "error_msg": "stopping"}
+        return {"error_code": "0", "error_msg": "pong"}
+
+
+class GatewayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, gateway):
+        self.gateway = gateway
+        super().__init__(socket_path, GatewayRequestHandler)
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET, timeout=None):
+    """向网关发送一个请求并返回结果；每次请求一个连接，调用线程被放弃时不会影响其他请求"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("网关关闭了连接")
+    return json.loads(line)
+
+
+class GatewayClient:
+    """网关客户端，接口与baostock模块一致：login/logout不需要真正登录，query_*转发给网关"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def login(self, *args, **kwargs):
+        """检查网关是否可用"""
+        return self.request({"op": "ping"})
+
+    def logout(self, *args, **kwargs):
+        """会话由网关持有，这里不做处理"""
+        return ReplayResultData()
+
+    def request(self, request):
+        try:
+            response = send_request(request, self.socket_path, self.timeout)
+        except (OSError, ValueError) as e:
+            return ReplayResultData(GATEWAY_ERROR_CODE, f"无法连接Baostock网关{self.socket_path}: {e}")
+        return ReplayResultData(response["error_code"], response["error_msg"],
+                                response.get("fields"), response.get("rows"))
+
+    def __getattr__(self, name):
+        if not name.startswith("query_"):
+            raise AttributeError(name)
+
+        def gateway_query(*args, **kwargs):
+            return self.request({"op": "query", "api": name, "args": [str(arg) for arg in args],
+                                 "kwargs": {key: str(value) for key, value in kwargs.items()}})
+
+        return gateway_query
+
+
+_client = None
+
+
+def __getattr__(name):
+    """`import baostock_gateway as bs`后bs.login()、bs.query_*()通过默认socket连接网关"""
+    global _client
+    if name in ("login", "logout") or name.startswith("query_"):
+        if _client is None:
+            _client = GatewayClient()
+        return getattr(_client, name)
+    raise AttributeError(name)
+
+
+def serve(socket_path=DEFAULT_SOCKET, cache_ttl=3600.0, cache_size=100000, rate=0.0,
+          max_retries=3, backoff=1.0, timeout=30.0):
+    """登录Baostock并启动网关，直到收到stop请求或Ctrl+C"""
+    import baostock as bs
+    metrics = BaostockMetrics()
+    upstream = resilient_baostock(bs, metrics, max_retries, backoff, timeout)
+    login_result = upstream.login()
+    if login_result.error_code != '0':
+        logger.error(f"Baostock登录失败: {login_result.error_msg}")
+        return False
+
+    if os.path.exists(socket_path):
+        try:
+            send_request({"op": "ping"}, socket_path, timeout=1)
+            running = True
+        except (ConnectionRefusedError, FileNotFoundError):
+            # 上次异常退出留下的socket文件，没有进程在监听
+            os.remove(socket_path)
+            running = False
+        except (OSError, ValueError):
+            # 超时等情况说明有进程在监听但繁忙，不能删除它的socket
+            running = True
+        if running:
+            logger.error(f"网关已在运行: {socket_path}")
+            upstream.logout()
+            return False
+
+    gateway = BaostockGateway(upstream, metrics, QueryCache(cache_ttl, cache_size), RateLimiter(rate), bs)
+    server = GatewayServer(socket_path, gateway)
+    os.chmod(socket_path, 0o600)
+    logger.info(f"Baostock网关已启动: {socket_path}（缓存{cache_ttl:g}秒，限速{rate:g}次/秒）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        upstream.logout()
+        logger.info(f"Baostock网关已停止，共处理{gateway.requests}个请求")
+        metrics.print_summary()
+        metrics.export("baostock_gateway")
+    return True
+
+
+def install(socket_path=DEFAULT_SOCKET):
+    """用网关客户端替换baostock模块，之后`import baostock`得到的都是该客户端"""
+    client = GatewayClient(socket_path)
+    sys.modules["baostock"] = client
+    return client
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket路径（也可用BAOSTOCK_GATEWAY_SOCKET指定）")
+    add_logging_arguments(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="启动网关")
+    serve_parser.add_argument("--cache-ttl", type=float, default=3600.0, help="查询结果缓存时长（秒），0表示不缓存")
+    serve_parser.add_argument("--cache-size", type=int, default=100000, help="最多缓存的查询数")
+    serve_parser.add_argument("--rate", type=float, default=0.0, help="每秒最多调用Baostock的次数，0表示不限速")
+    serve_parser.add_argument("--max-retries", type=int, default=3, help="网络或会话错误时的最大重试次数")
+    serve_parser.add_argument("--retry-backoff", type=float, default=1.0, help="首次重试前的等待时间（秒）")
+    serve_parser.add_argument("--call-timeout", type=float, default=30.0, help="单次Baostock调用的时限（秒）")
+
+    run_parser = commands.add_parser("run", help="通过网关运行脚本")
+    run_parser.add_argument("script", help="要运行的脚本，如check_pufa_dividend.py")
+    run_parser.add_argument("script_args", nargs=argparse.REMAINDER, help="传给脚本的参数")
+
+    commands.add_parser("stats", help="查看网关的调用和缓存统计")
+    commands.add_parser("stop", help="停止网关")
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
+    if args.command == "serve":
+        return serve(args.socket, args.cache_ttl, args.cache_size, args.rate,
+                     args.max_retries, args.retry_backoff, args.call_timeout)
+    if args.command == "run":
+        install(args.socket)
+        # 以__main__方式运行目标脚本，脚本本身无需修改
+        sys.argv = [args.script] + args.script_args
+        runpy.run_path(args.script, run_name="__main__")
+        return True
+
+    try:
+        response = send_request({"op": args.command}, args.socket, timeout=5)
+    except OSError as e:
+        logger.error(f"无法连接Baostock网关{args.socket}: {e}")
+        return False
+    if args.command == "stats":
+        print(f"请求{response['requests']}个，缓存{response['cached']}条查询")
+        print(f"{'接口':<28}{'调用':>8}{'缓存命中':>10}{'错误':>8}{'平均(s)':>10}")
+        for api, s in response["apis"].items():
+            print(f"{api:<28}{s['calls']:>8}{s['cache_hits']:>10}{sum(s['errors'].values()):>8}{s['mean']:>10.3f}")
+    else:
+        logger.info("已通知网关停止")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip(), formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    sys.exit(0 if main(parser.parse_args()) else 1)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Baostock调用统计：按接口记录耗时分布、错误码、返回行数、重试次数和缓存命中，
+运行结束时输出汇总表，并导出Prometheus textfile格式和JSON格式的统计文件
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+from progress import console, json_logging
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = "output/metrics"
+
+# 耗时直方图的分桶上限（秒）
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+def percentile(sorted_values, ratio):
+    """计算已排序数据的分位数"""
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * ratio), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ApiMetrics:
+    """单个接口的统计数据"""
+
+    def __init__(self, api):
+        self.api = api
+        self.calls = 0
+        self.errors = {}
+        self.rows = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.latencies = []
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds, error_code):
+        """记录一次调用"""
+        self.calls += 1
+        self.latencies.append(seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        if error_code != '0':
+            self.errors[error_code] = self.errors.get(error_code, 0) + 1
+
+    def summary(self):
+        """返回汇总数据"""
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "rows": self.rows,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "timeouts": self.timeouts,
+            "total_seconds": round(sum(latencies), 6),
+            "mean": round(sum(latencies) / len(latencies), 6) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 6),
+            "p95": round(percentile(latencies, 0.95), 6),
+            "p99": round(percentile(latencies, 0.99), 6),
+            "max": round(latencies[-1], 6) if latencies else 0.0,
+        }
+
+
+class BaostockMetrics:
+    """所有接口的统计数据，线程安全"""
+
+    def __init__(self):
+        self.apis = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def _api(self, api):
+        if api not in self.apis:
+            self.apis[api] = ApiMetrics(api)
+        return self.apis[api]
+
+    def observe(self, api, seconds, error_code):
+        """记录一次调用的耗时和错误码"""
+        with self.lock:
+            self._api(api).observe(seconds, error_code)
+
+    def add_rows(self, api, count=1):
+        """记录返回的数据行数"""
+        with self.lock:
+            self._api(api).rows += count
+
+    def record_retry(self, api):
+        """记录一次重试"""
+        with self.lock:
+            self._api(api).retries += 1
+
+    def record_cache_hit(self, api):
+        """记录一次缓存命中"""
+        with self.lock:
+            self._api(api).cache_hits += 1
+
+    def record_timeout(self, api):
+        """记录一次超时"""
+        with self.lock:
+            self._api(api).timeouts += 1
+
+    def summaries(self):
+        """返回各接口的汇总数据"""
+        with self.lock:
+            return {api: metrics.summary() for api, metrics in sorted(self.apis.items())}
+
+    def total_calls(self):
+        """所有接口的调用次数之和（包括重试）"""
+        with self.lock:
+            return sum(metrics.calls for metrics in self.apis.values())
+
+    def print_summary(self):
+        """打印汇总表；JSON日志时每个接口输出一条带汇总字段的日志"""
+        summaries = self.summaries()
+        if not summaries:
+            return
+        if json_logging():
+            for api, s in summaries.items():
+                logger.info(f"Baostock调用统计: {api}", extra=dict(s, api=api))
+            return
+        print("\nBaostock调用统计:")
+        print(f"{'接口':<28}{'调用':>8}{'错误':>8}{'行数':>10}{'重试':>6}{'缓存':>6}{'超时':>6}"
+              f"{'平均(s)':>10}{'p95(s)':>10}{'p99(s)':>10}{'总耗时(s)':>12}")
+        for api, s in summaries.items():
+            print(f"{api:<28}{s['calls']:>8}{sum(s['errors'].values()):>8}{s['rows']:>10}{s['retries']:>6}"
+                  f"{s['cache_hits']:>6}{s['timeouts']:>6}{s['mean']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}"
+                  f"{s['total_seconds']:>12.1f}")
+            for code, count in sorted(s["errors"].items()):
+                print(f"    错误码{code}: {count}次")
+
+    def prometheus_text(self, job):
+        """生成Prometheus textfile格式的统计数据"""
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            apis = sorted(self.apis.items())
+
+            metric("baostock_call_duration_seconds", "histogram", "Baostock API call latency")
+            for api, m in apis:
+                labels = f'job="{job}",api="{api}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                    cumulative += count
+                    lines.append(f'baostock_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'baostock_call_duration_seconds_bucket{{{labels},le="+Inf"}} {m.calls}')
+                lines.append(f"baostock_call_duration_seconds_sum{{{labels}}} {sum(m.latencies):.6f}")
+                lines.append(f"baostock_call_duration_seconds_count{{{labels}}} {m.calls}")
+
+            metric("baostock_errors_total", "counter", "Baostock API calls with non-zero error_code")
+            for api, m in apis:
+                for code, count in sorted(m.errors.items()):
+                    lines.append(f'baostock_errors_total{{job="{job}",api="{api}",code="{code}"}} {count}')
+
+            for name, attr, help_text in [
+                ("baostock_rows_total", "rows", "Rows returned by Baostock API calls"),
+                ("baostock_retries_total", "retries", "Retried Baostock API calls"),
+                ("baostock_cache_hits_total", "cache_hits", "Baostock API calls served from cache"),
+                ("baostock_timeouts_total", "timeouts", "Baostock API calls that hit the deadline"),
+            ]:
+                metric(name, "counter", help_text)
+                for api, m in apis:
+                    lines.append(f'{name}{{job="{job}",api="{api}"}} {getattr(m, attr)}')
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, job, metrics_dir=METRICS_DIR):
+        """导出Prometheus textfile和JSON统计文件，先写临时文件再替换，避免采集到半写的文件"""
+        os.makedirs(metrics_dir, exist_ok=True)
+        prom_path = os.path.join(metrics_dir, f"{job}.prom")
+        json_path = os.path.join(metrics_dir, f"{job}.json")
+
+        with open(prom_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(job))
+        os.replace(prom_path + ".tmp", prom_path)
+
+        with open(json_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"job": job, "started": self.started, "finished": time.time(),
+                       "apis": self.summaries()}, f, ensure_ascii=False, indent=2)
+        os.replace(json_path + ".tmp", json_path)
+
+        console(f"Baostock调用统计已导出: {prom_path}, {json_path}", logger)
+        return prom_path, json_path
+
+
+class CountingResultData:
+    """包装查询结果，逐行读取时累计返回行数"""
+
+    def __init__(self, rs, api, metrics):
+        self._rs = rs
+        self._api = api
+        self._metrics = metrics
+
+    def next(self):
+        has_next = self._rs.next()
+        if has_next:
+            self._metrics.add_rows(self._api)
+        return has_next
+
+    def __getattr__(self, name):
+        return getattr(self._rs, name)
+
+
+class InstrumentedBaostock:
+    """包装baostock模块，为每次query_*调用记录耗时、错误码和返回行数"""
+
+    def __init__(self, baostock, metrics):
+        self.baostock = baostock
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.baostock, name)
+        if not name.startswith("query_") or not callable(attr):
+            return attr
+
+        def timed_query(*args, **kwargs):
+            start = time.perf_counter()
+            rs = attr(*args, **kwargs)
+            self.metrics.observe(name, time.perf_counter() - start, rs.error_code)
+            return CountingResultData(rs, name, self.metrics)
+
+        return timed_query
+
+
+def instrument(baostock, metrics=None):
+    """返回带统计的baostock包装对象，metrics默认新建"""
+    return InstrumentedBaostock(baostock, metrics or BaostockMetrics())
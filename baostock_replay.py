@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Baostock录制与回放
+录制模式：调用真实Baostock，把每次query_*的返回结果保存为回放数据
+回放模式：不联网，按回放数据返回结果，可配置延迟、抖动和错误率，用于离线运行、性能测试和回归测试
+
+用法（选项需写在脚本名之前，脚本名之后的参数原样传给脚本）：
+    python3 baostock_replay.py record dividend_yield_collector.py
+    python3 baostock_replay.py replay --latency 0.05 --jitter 0.02 --error-rate 0.01 get_2020_2025_data.py
+    python3 baostock_replay.py replay --hang-rate 0.01 --hang-time 600 get_2020_2025_data.py --call-timeout 5
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import runpy
+import argparse
+import threading
+
+FIXTURE_DIR = "fixtures/baostock"
+
+# 各接口返回的字段，与Baostock一致
+STOCK_BASIC_FIELDS = ["code", "code_name", "ipoDate", "outDate", "type", "status"]
+DIVIDEND_FIELDS = [
+    "code", "dividPreNoticeDate", "dividAgmPumDate", "dividPlanAnnounceDate", "dividPlanDate",
+    "dividRegistDate", "dividOperateDate", "dividPayDate", "dividStockMarketDate",
+    "dividCashPsBeforeTax", "dividCashPsAfterTax", "dividStocksPs", "dividCashStock", "dividReserveToStockPs",
+]
+PROFIT_FIELDS = [
+    "code", "pubDate", "statDate", "roeAvg", "npMargin", "gpMargin",
+    "netProfit", "epsTTM", "MBRevenue", "totalShare", "liqaShare",
+]
+
+# 回放数据中没有对应查询时返回的错误码
+MISSING_FIXTURE_CODE = "10009999"
+# 模拟网络故障时返回的错误码
+INJECTED_ERROR_CODE = "10002007"
+
+
+def request_key(api, kwargs):
+    """把一次查询规范化为字符串，作为回放数据的键（参数值统一转为字符串）"""
+    params = {name: str(value) for name, value in kwargs.items()}
+    return api + " " + json.dumps(params, ensure_ascii=False, sort_keys=True)
+
+
+def make_record(api, params, fields, rows, error_code="0", error_msg="success"):
+    """构造一条回放数据"""
+    return {
+        "api": api,
+        "params": {key: str(value) for key, value in params.items()},
+        "error_code": error_code,
+        "error_msg": error_msg,
+        "fields": list(fields),
+        "rows": rows,
+    }
+
+
+def stock_basic_record(stocks):
+    """query_stock_basic的回放数据，stocks为(代码, 名称, IPO日期, 类型, 状态)列表"""
+    rows = [[code, name, ipo_date, "", stock_type, status] for code, name, ipo_date, stock_type, status in stocks]
+    return make_record("query_stock_basic", {}, STOCK_BASIC_FIELDS, rows)
+
+
+def dividend_record(code, year, amounts):
+    """query_dividend_data的回放数据，amounts为该年度各次每股税前分红"""
+    rows = []
+    for amount in amounts:
+        row = [code] + [""] * (len(DIVIDEND_FIELDS) - 1)
+        row[DIVIDEND_FIELDS.index("dividCashPsBeforeTax")] = str(amount)
+        rows.append(row)
+    return make_record("query_dividend_data", {"code": code, "year": year, "yearType": "report"},
+                       DIVIDEND_FIELDS, rows)
+
+
+def close_record(code, date, close):
+    """dividend_yield_collector按单日查询收盘价的回放数据，close为None表示当天无数据"""
+    params = {"code": code, "fields": "close", "start_date": date, "end_date": date,
+              "frequency": "d", "adjustflag": "3"}
+    rows = [[str(close)]] if close is not None else []
+    return make_record("query_history_k_data_plus", params, ["close"], rows)
+
+
+def yearly_close_record(code, year, date, close):
+    """get_2020_2025_data按年度查询收盘价的回放数据，只包含最后一个交易日"""
+    params = {"code": code, "fields": "date,close", "start_date": f"{year}-01-01",
+              "end_date": f"{year}-12-31", "frequency": "d", "adjustflag": "3"}
+    rows = [[date, str(close)]] if close is not None else []
+    return make_record("query_history_k_data_plus", params, ["date", "close"], rows)
+
+
+def profit_record(code, year, quarter, net_profit):
+    """query_profit_data的回放数据，net_profit单位为元，None表示无数据"""
+    rows = []
+    if net_profit is not None:
+        row = [code] + [""] * (len(PROFIT_FIELDS) - 1)
+        row[PROFIT_FIELDS.index("statDate")] = f"{year}-12-31" if quarter == 4 else f"{year}-09-30"
+        row[PROFIT_FIELDS.index("netProfit")] = f"{net_profit:.2f}"
+        rows.append(row)
+    return make_record("query_profit_data", {"code": code, "year": year, "quarter": quarter},
+                       PROFIT_FIELDS, rows)
+
+
+def build_fixtures_from_csv(store, current_csv="output/all_dividend_yield_2025.csv",
+                            yearly_csv="output/2020_2025_dividend_data.csv"):
+    """根据已有的输出CSV构造回放数据，使采集脚本回放后得到相同的结果"""
+    stocks = []
+    if os.path.exists(current_csv):
+        with open(current_csv, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = row["股票代码"]
+                stocks.append((code, row["股票名称"], "", "1", "1"))
+                dividend = float(row["2025年累计分红"])
+                close = float(row["2025-11-28收盘价"])
+                store.add(dividend_record(code, 2025, [dividend] if dividend else []))
+                store.add(close_record(code, "2025-11-28", close if close > 0 else None))
+    store.add(stock_basic_record(stocks))
+
+    if os.path.exists(yearly_csv):
+        with open(yearly_csv, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = row["股票代码"]
+                for year in range(2020, 2026):
+                    dividend = float(row[f"{year}年分红"])
+                    close = float(row[f"{year}年收盘价"])
+                    profit = float(row[f"{year}年利润(亿元)"])
+                    store.add(dividend_record(code, year, [dividend] if dividend else []))
+                    store.add(yearly_close_record(code, year, f"{year}-12-31", close if close > 0 else None))
+                    store.add(profit_record(code, year, 4, profit * 100000000 if profit else None))
+                    if not profit:
+                        store.add(profit_record(code, year, 3, None))
+    return store
+
+
+class ReplayResultData:
+    """与baostock.data.resultset.ResultData接口一致的查询结果"""
+
+    def __init__(self, error_code="0", error_msg="success", fields=None, rows=None):
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self.fields = list(fields or [])
+        self.data = [list(row) for row in rows or []]
+        self._cursor = -1
+
+    def next(self):
+        """移动到下一行，没有更多数据时返回False"""
+        self._cursor += 1
+        return self._cursor < len(self.data)
+
+    def get_row_data(self):
+        """返回当前行"""
+        return self.data[self._cursor]
+
+
+class FixtureStore:
+    """回放数据存储：每个API一个JSON Lines文件，每行一次查询"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """读取目录下所有回放数据"""
+        if not os.path.isdir(self.fixture_dir):
+            return self
+        for filename in sorted(os.listdir(self.fixture_dir)):
+            if not filename.endswith(".jsonl"):
+                continue
+            with open(os.path.join(self.fixture_dir, filename), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[request_key(record["api"], record["params"])] = record
+        return self
+
+    def get(self, api, kwargs):
+        """查找一次查询对应的回放数据"""
+        return self.records.get(request_key(api, kwargs))
+
+    def add(self, record):
+        """在内存中加入一条回放数据"""
+        self.records[request_key(record["api"], record["params"])] = record
+
+    def save(self):
+        """把内存中的全部回放数据写入目录，覆盖已有文件"""
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        by_api = {}
+        for record in self.records.values():
+            by_api.setdefault(record["api"], []).append(record)
+        for api, records in by_api.items():
+            with open(os.path.join(self.fixture_dir, f"{api}.jsonl"), 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def append(self, record):
+        """追加一条回放数据"""
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        path = os.path.join(self.fixture_dir, f"{record['api']}.jsonl")
+        with self.lock:
+            self.records[request_key(record["api"], record["params"])] = record
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class RecordingBaostock:
+    """录制模式：把query_*调用转发给真实Baostock，并保存完整结果"""
+
+    def __init__(self, baostock, store):
+        self.baostock = baostock
+        self.store = store
+
+    def __getattr__(self, name):
+        attr = getattr(self.baostock, name)
+        if not name.startswith("query_") or not callable(attr):
+            return attr
+
+        def record_query(**kwargs):
+            rs = attr(**kwargs)
+            rows = []
+            if rs.error_code == '0':
+                while rs.next():
+                    rows.append(rs.get_row_data())
+            record = make_record(name, kwargs, rs.fields or [], rows, rs.error_code, rs.error_msg)
+            self.store.append(record)
+            return ReplayResultData(rs.error_code, rs.error_msg, record["fields"], rows)
+
+        return record_query
+
+
+class ReplayBaostock:
+    """回放模式：按回放数据返回查询结果，接口与baostock模块一致"""
+
+    def __init__(self, store, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, hang_rate=0.0, hang_time=600.0):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_time = hang_time
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def login(self, *args, **kwargs):
+        """模拟登录，总是成功"""
+        return ReplayResultData()
+
+    def logout(self, *args, **kwargs):
+        """模拟登出"""
+        return ReplayResultData()
+
+    def __getattr__(self, name):
+        if not name.startswith("query_"):
+            raise AttributeError(name)
+
+        def replay_query(**kwargs):
+            # 随机数在锁内生成，保证多线程下给定seed时结果可复现
+            with self.lock:
+                delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+                failed = self.random.random() < self.error_rate
+                # 模拟连接失效：调用长时间阻塞
+                if self.random.random() < self.hang_rate:
+                    delay += self.hang_time
+            if delay:
+                time.sleep(delay)
+            if failed:
+                return ReplayResultData(INJECTED_ERROR_CODE, "网络接收错误(回放模拟)")
+
+            record = self.store.get(name, kwargs)
+            if record is None:
+                return ReplayResultData(MISSING_FIXTURE_CODE, f"回放数据中没有该查询: {request_key(name, kwargs)}")
+            return ReplayResultData(record["error_code"], record["error_msg"], record["fields"], record["rows"])
+
+        return replay_query
+
+
+def install(backend):
+    """用录制或回放对象替换baostock模块，之后`import baostock`得到的都是该对象"""
+    sys.modules["baostock"] = backend
+    return backend
+
+
+def install_recorder(fixture_dir=FIXTURE_DIR):
+    """安装录制模式"""
+    import baostock
+    return install(RecordingBaostock(baostock, FixtureStore(fixture_dir).load()))
+
+
+def install_replay(fixture_dir=FIXTURE_DIR, latency=0.0, jitter=0.0, error_rate=0.0, seed=None,
+                   hang_rate=0.0, hang_time=600.0):
+    """安装回放模式"""
+    store = FixtureStore(fixture_dir).load()
+    print(f"已加载{len(store.records)}条Baostock回放数据: {fixture_dir}")
+    return install(ReplayBaostock(store, latency, jitter, error_rate, seed, hang_rate, hang_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baostock录制与回放")
+    parser.add_argument("mode", choices=["record", "replay"], help="录制或回放")
+    parser.add_argument("script", help="要运行的脚本，如dividend_yield_collector.py")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="传给脚本的参数")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="回放数据目录")
+    parser.add_argument("--latency", type=float, default=0.0, help="回放时每次调用的平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="回放延迟的随机抖动范围（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回放时随机返回错误的比例")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="回放时随机长时间阻塞的比例，模拟连接失效")
+    parser.add_argument("--hang-time", type=float, default=600.0, help="模拟阻塞的时长（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，用于复现")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        install_recorder(args.fixtures)
+    else:
+        install_replay(args.fixtures, args.latency, args.jitter, args.error_rate, args.seed,
+                       args.hang_rate, args.hang_time)
+
+    # 以__main__方式运行目标脚本，脚本本身无需修改
+    sys.argv = [args.script] + args.script_args
+    runpy.run_path(args.script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Baostock调用重试：按错误码分类，网络和会话错误按指数退避重试，并在重试前重新登录；
+参数错误等不可重试的错误和重试耗尽后抛出BaostockError，由调用方明确记录失败，而不是当作0写入结果
+每次调用有超时时限，由看门狗在后台线程中执行调用，超时后关闭连接、放弃卡住的线程，按网络错误重试
+采集失败的股票写入失败队列（JSON Lines），可只重试这些股票；错误率突增时熔断暂停
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+
+from baostock_metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+# 错误码前缀：10001xxx为会话错误（如用户未登录），10002xxx为网络错误（连接、收发失败或超时）
+SESSION_ERROR_PREFIX = "10001"
+NETWORK_ERROR_PREFIX = "10002"
+# 调用抛出异常时使用的错误码
+EXCEPTION_ERROR_CODE = "exception"
+# 调用超过时限时使用的错误码
+TIMEOUT_ERROR_CODE = "timeout"
+
+# 熔断中止后未处理的股票使用的错误码
+CIRCUIT_OPEN_ERROR_CODE = "circuit_open"
+# 调用预算用完后未处理的股票使用的错误码
+BUDGET_ERROR_CODE = "budget"
+# 到达截止时间后未处理的股票使用的错误码
+DEADLINE_ERROR_CODE = "deadline"
+
+DEAD_LETTER_DIR = "output/dead_letter"
+
+
+class BaostockError(Exception):
+    """Baostock调用失败（不可重试或重试耗尽）"""
+
+    def __init__(self, api, params, error_code, error_msg, attempts=1):
+        super().__init__(f"{api}失败: [{error_code}] {error_msg}（尝试{attempts}次）")
+        self.api = api
+        self.params = params
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self.attempts = attempts
+
+
+def classify_error(error_code):
+    """错误分类：ok、session（需要重新登录）、network（可重试）、permanent（不可重试）"""
+    if error_code == '0':
+        return "ok"
+    if error_code.startswith(SESSION_ERROR_PREFIX):
+        return "session"
+    if error_code in (EXCEPTION_ERROR_CODE, TIMEOUT_ERROR_CODE) or error_code.startswith(NETWORK_ERROR_PREFIX):
+        return "network"
+    return "permanent"
+
+
+class TimeoutResultData:
+    """调用超时时返回的空结果"""
+
+    fields = []
+
+    def __init__(self, api, timeout):
+        self.error_code = TIMEOUT_ERROR_CODE
+        self.error_msg = f"{api}超过{timeout}秒未返回"
+
+    def next(self):
+        return False
+
+
+def close_connection():
+    """关闭baostock当前的socket连接，使阻塞在该连接上的调用立即出错退出
+    baostock把连接保存在baostock.common.context.default_socket；回放模式等没有该连接时不做处理"""
+    try:
+        from baostock.common import context
+    except ImportError:
+        return
+    sock = getattr(context, "default_socket", None)
+    if sock is not None:
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+
+class WatchdogBaostock:
+    """包装baostock模块，在后台线程中执行query_*和登录登出，超过时限即关闭连接并返回超时结果
+    卡住的线程是守护线程，连接关闭后自行退出，不会阻止进程结束；会话由重试层重新登录"""
+
+    def __init__(self, baostock, timeout, metrics=None):
+        self.baostock = baostock
+        self.timeout = timeout
+        self.metrics = metrics
+        self.hangs = 0
+
+    def call(self, name, func, args, kwargs):
+        """在后台线程中执行func，超时返回TimeoutResultData"""
+        result = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                result["value"] = func(*args, **kwargs)
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name=f"baostock-{name}", daemon=True).start()
+        if not done.wait(self.timeout):
+            self.hangs += 1
+            logger.warning(f"{name}{kwargs}超过{self.timeout}秒未返回，关闭连接后重试")
+            if self.metrics:
+                self.metrics.record_timeout(name)
+            close_connection()
+            return TimeoutResultData(name, self.timeout)
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def __getattr__(self, name):
+        attr = getattr(self.baostock, name)
+        if not (name.startswith("query_") or name in ("login", "logout")) or not callable(attr):
+            return attr
+
+        def query_with_deadline(*args, **kwargs):
+            return self.call(name, attr, args, kwargs)
+
+        return query_with_deadline
+
+
+class RetryingBaostock:
+    """包装baostock模块，query_*调用失败时按指数退避重试，会话或网络错误时先重新登录"""
+
+    def __init__(self, baostock, metrics=None, max_retries=3, backoff=1.0, max_backoff=30.0):
+        self.baostock = baostock
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # 调用预算（query_planner.CallBudget），设置后每次调用（包括重试）前检查，用完时抛出BudgetExhaustedError
+        self.budget = None
+        self.relogins = 0
+        self.lock = threading.Lock()
+
+    def relogin(self):
+        """重新建立会话，登录失败时返回False，等待下一次重试"""
+        with self.lock:
+            self.relogins += 1
+            try:
+                self.baostock.logout()
+            except Exception:
+                pass
+            try:
+                result = self.baostock.login()
+            except Exception as e:
+                logger.warning(f"Baostock重新登录异常: {e}")
+                return False
+        if result.error_code != '0':
+            logger.warning(f"Baostock重新登录失败: {result.error_msg}")
+            return False
+        logger.debug("Baostock已重新登录")
+        return True
+
+    def delay(self, attempt):
+        """第attempt次重试前的等待时间：指数增长，带随机抖动"""
+        return min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+    def __getattr__(self, name):
+        attr = getattr(self.baostock, name)
+        if not name.startswith("query_") or not callable(attr):
+            return attr
+
+        def query_with_retry(*args, **kwargs):
+            attempt = 0
+            while True:
+                attempt += 1
+                if self.budget is not None:
+                    self.budget.check()
+                try:
+                    rs = attr(*args, **kwargs)
+                    error_code, error_msg = rs.error_code, rs.error_msg
+                except Exception as e:
+                    rs, error_code, error_msg = None, EXCEPTION_ERROR_CODE, f"{type(e).__name__}: {e}"
+
+                kind = classify_error(error_code)
+                if kind == "ok":
+                    return rs
+                if kind == "permanent" or attempt > self.max_retries:
+                    raise BaostockError(name, kwargs, error_code, error_msg, attempt)
+
+                logger.debug(f"{name}{kwargs}失败: [{error_code}] {error_msg}，第{attempt}次重试")
+                if self.metrics:
+                    self.metrics.record_retry(name)
+                time.sleep(self.delay(attempt))
+                self.relogin()
+
+        return query_with_retry
+
+
+def with_retry(baostock, metrics=None, max_retries=3, backoff=1.0):
+    """返回带重试的baostock包装对象"""
+    return RetryingBaostock(baostock, metrics, max_retries, backoff)
+
+
+def resilient_baostock(baostock, metrics, max_retries=3, backoff=1.0, timeout=30.0):
+    """组合看门狗、调用统计和重试：超时的调用按超时错误计入统计（耗时即时限），再由重试层重新登录后重试
+    timeout为0时不启用看门狗"""
+    if timeout:
+        baostock = WatchdogBaostock(baostock, timeout, metrics)
+    return with_retry(instrument(baostock, metrics), metrics, max_retries, backoff)
+
+
+def add_retry_arguments(parser):
+    """为命令行添加重试和超时相关参数"""
+    parser.add_argument("--max-retries", type=int, default=3, help="网络或会话错误时的最大重试次数")
+    parser.add_argument("--retry-backoff", type=float, default=1.0, help="首次重试前的等待时间（秒），之后每次翻倍")
+    parser.add_argument("--call-timeout", type=float, default=30.0, help="单次Baostock调用的时限（秒），0表示不限")
+    parser.add_argument("--retry-failed", action="store_true", help="只重新采集失败队列中的股票，结果合并到已有输出")
+    parser.add_argument("--breaker-window", type=int, default=20, help="熔断器统计最近多少只股票的失败率")
+    parser.add_argument("--breaker-threshold", type=float, default=0.5, help="触发熔断暂停的失败率")
+    parser.add_argument("--breaker-cooldown", type=float, default=60.0, help="熔断暂停时长（秒）")
+    parser.add_argument("--breaker-max-trips", type=int, default=3, help="连续熔断多少次后中止采集")
+
+
+def circuit_breaker_from_args(args):
+    """根据命令行参数创建熔断器"""
+    return CircuitBreaker(args.breaker_window, args.breaker_threshold, args.breaker_cooldown, args.breaker_max_trips)
+
+
+class DeadLetterQueue:
+    """失败队列：每只失败的股票一行JSON，记录接口、参数、错误和累计尝试次数
+    每条失败立即追加写入，进程中途退出也不会丢失；--retry-failed只重新采集队列中的股票"""
+
+    def __init__(self, job, dead_letter_dir=DEAD_LETTER_DIR):
+        self.job = job
+        self.path = os.path.join(dead_letter_dir, f"{job}.jsonl")
+        self.entries = []
+        self.previous = {}
+        self.kept = []
+        # 熔断中止了本轮采集，结果不完整，应合并到已有结果而不是覆盖
+        self.aborted = False
+
+    def load(self):
+        """读取上次运行留下的失败队列"""
+        entries = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        return entries
+
+    def start(self, previous=None, keep=()):
+        """开始新一轮采集：清空队列文件，previous为重试的上一轮失败，用于累计尝试次数；
+        keep为本轮不处理的股票的失败记录，原样保留在队列中"""
+        self.previous = {entry["code"]: entry for entry in previous or []}
+        self.entries = []
+        self.kept = list(keep)
+        self.aborted = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        for entry in self.kept:
+            self.write(entry)
+
+    def write(self, entry):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def add(self, code, name, error):
+        """记录一只采集失败的股票"""
+        if isinstance(error, BaostockError):
+            entry = {"api": error.api, "params": error.params, "error_code": error.error_code,
+                     "error_msg": error.error_msg, "attempts": error.attempts}
+        elif isinstance(error, CircuitOpenError):
+            entry = {"api": "", "params": {}, "error_code": CIRCUIT_OPEN_ERROR_CODE,
+                     "error_msg": str(error), "attempts": 0}
+        elif isinstance(error, BudgetExhaustedError):
+            entry = {"api": "", "params": {}, "error_code": BUDGET_ERROR_CODE,
+                     "error_msg": str(error), "attempts": 0}
+        elif isinstance(error, DeadlineReachedError):
+            entry = {"api": "", "params": {}, "error_code": DEADLINE_ERROR_CODE,
+                     "error_msg": str(error), "attempts": 0}
+        else:
+            entry = {"api": "", "params": {}, "error_code": EXCEPTION_ERROR_CODE,
+                     "error_msg": f"{type(error).__name__}: {error}", "attempts": 1}
+        entry["attempts"] += self.previous.get(code, {}).get("attempts", 0)
+        entry = dict({"job": self.job, "code": code, "name": name}, **entry,
+                     failed_at=datetime.now().isoformat(timespec="seconds"))
+
+        self.write(entry)
+        self.entries.append(entry)
+
+    def finish(self):
+        """输出失败汇总"""
+        if self.kept:
+            logger.info(f"失败队列中保留了之前的{len(self.kept)}只股票，可使用--retry-failed重新采集")
+        if not self.entries:
+            logger.info("没有采集失败的股票")
+            return False
+        by_error = {}
+        for entry in self.entries:
+            key = f"{entry['api'] or '-'} [{entry['error_code']}]"
+            by_error[key] = by_error.get(key, 0) + 1
+        summary = "，".join(f"{key} {count}只" for key, count in sorted(by_error.items()))
+        logger.warning(f"{len(self.entries)}只股票采集失败（{summary}），已记录到: {self.path}，"
+                       f"可使用--retry-failed只重新采集这些股票")
+        return True
+
+
+class CircuitOpenError(Exception):
+    """熔断器多次暂停后错误率仍然过高，中止采集"""
+
+
+class BudgetExhaustedError(Exception):
+    """--budget设定的调用次数不足以再处理一只股票，或已经用完"""
+
+
+class DeadlineReachedError(Exception):
+    """--deadline前来不及再处理一只股票"""
+
+
+class CircuitBreaker:
+    """熔断器：最近window只股票中失败比例达到threshold时暂停cooldown秒再继续；
+    连续max_trips次暂停后仍然失败则抛出CircuitOpenError，避免在故障期间把整个股票池都采成失败"""
+
+    def __init__(self, window=20, threshold=0.5, cooldown=60.0, max_trips=3):
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.results = deque(maxlen=window)
+        self.trips = 0
+
+    def record(self, ok):
+        """记录一只股票的采集结果"""
+        self.results.append(ok)
+        if len(self.results) < self.window:
+            return
+        failure_rate = self.results.count(False) / len(self.results)
+        if failure_rate < self.threshold:
+            self.trips = 0
+            return
+
+        self.trips += 1
+        if self.trips > self.max_trips:
+            raise CircuitOpenError(f"熔断{self.max_trips}次暂停后最近{self.window}只股票失败率仍为{failure_rate:.0%}")
+        logger.warning(f"最近{self.window}只股票失败率{failure_rate:.0%}，熔断暂停{self.cooldown:g}秒"
+                       f"（第{self.trips}/{self.max_trips}次）")
+        time.sleep(self.cooldown)
+        self.results.clear()
+
+
+def merge_csv_rows(path, rows, key="股票代码", remove=()):
+    """把重试得到的行合并到已有CSV：相同代码的行原位替换，新的行追加到末尾；remove中的代码从结果中去掉"""
+    if not rows and not remove:
+        return False
+    updated = {row[key]: row for row in rows}
+    removed = set(remove)
+    existing = []
+    fieldnames = list(rows[0].keys()) if rows else []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            existing = list(reader)
+
+    merged = []
+    dropped = 0
+    for row in existing:
+        if row[key] in removed:
+            dropped += 1
+            continue
+        merged.append(updated.pop(row[key], row))
+    merged.extend(updated.values())
+
+    with open(path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(merged)
+    os.replace(path + ".tmp", path)
+    logger.info(f"已将{len(rows)}只股票的结果合并到: {path}"
+                + (f"，去掉{dropped}只" if dropped else ""))
+    return True
+
+
+def record_stock_result(breaker, dead_letter, ok, remaining):
+    """记录一只股票的采集结果；熔断中止时把剩余股票记入失败队列，标记队列为已中止并返回False"""
+    try:
+        breaker.record(ok)
+        return True
+    except CircuitOpenError as e:
+        logger.error(f"{e}，中止采集，剩余{len(remaining)}只股票记入失败队列")
+        dead_letter.aborted = True
+        for code, name in remaining:
+            dead_letter.add(code, name, e)
+        return False
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试：采集器吞吐量（回放后端、不同线程数）、指标与筛选计算、各HTML生成器在不同数据规模下的耗时
+结果追加到历史记录，并与基线比较，超过阈值的性能退化以非零退出码报错
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+
+import baostock_replay
+from synthetic_dataset import generate_dataset
+
+BENCHMARK_DIR = "benchmarks"
+HISTORY_FILE = os.path.join(BENCHMARK_DIR, "history.jsonl")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+REPORT_SIZES = [480, 5170, 50000]
+WORKER_COUNTS = [1, 4, 16]
+
+
+def scale_csv(src, dst, size):
+    """循环复制已有数据行并改写股票代码，生成指定行数的CSV，返回(代码, 名称)列表"""
+    with open(src, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+
+    stocks = []
+    with open(dst, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(size):
+            row = dict(rows[i % len(rows)])
+            if i >= len(rows):
+                row["股票代码"] = f"{row['股票代码']}.{i // len(rows)}"
+            writer.writerow(row)
+            stocks.append((row["股票代码"], row["股票名称"]))
+    return stocks
+
+
+@contextlib.contextmanager
+def working_dir(path):
+    """临时切换工作目录（生成器使用相对路径读写output/）"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def write_stocks_id(path, stocks):
+    """写入stocks.id格式的股票列表"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for code, name in stocks:
+            f.write(f"{code} {name}\n")
+
+
+class Benchmark:
+    def __init__(self, source_dir, repeat=3, latency=0.002, sizes=None, workers=None, synthetic=False):
+        self.source_dir = os.path.abspath(source_dir)
+        self.synthetic = synthetic
+        self.repeat = repeat
+        self.latency = latency
+        self.sizes = sizes or REPORT_SIZES
+        self.workers = workers or WORKER_COUNTS
+        self.results = {}
+
+    def measure(self, name, func, items=None):
+        """重复运行取最短耗时，记录耗时和吞吐量"""
+        best = None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        result = {"seconds": round(best, 6)}
+        if items:
+            result["items"] = items
+            result["per_second"] = round(items / best, 2) if best else None
+        self.results[name] = result
+        rate = f"，{result['per_second']}条/秒" if items else ""
+        print(f"  {name}: {best:.4f}秒{rate}")
+
+    def prepare(self, work_dir):
+        """准备工作目录：各规模的数据集和回放数据"""
+        self.datasets = {}
+        for size in self.sizes:
+            size_dir = os.path.join(work_dir, f"size_{size}")
+            if self.synthetic:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_dataset(size_dir, size, watchlist="all", fixtures=False)
+                self.datasets[size] = size_dir
+                continue
+            os.makedirs(os.path.join(size_dir, "output"), exist_ok=True)
+            stocks = scale_csv(os.path.join(self.source_dir, "output/2020_2025_dividend_data.csv"),
+                               os.path.join(size_dir, "output/2020_2025_dividend_data.csv"), size)
+            scale_csv(os.path.join(self.source_dir, "output/all_dividend_yield_2025.csv"),
+                      os.path.join(size_dir, "output/all_dividend_yield_2025.csv"), size)
+            write_stocks_id(os.path.join(size_dir, "stocks.id"), stocks)
+            self.datasets[size] = size_dir
+
+        store = baostock_replay.FixtureStore(os.path.join(work_dir, "fixtures"))
+        baostock_replay.build_fixtures_from_csv(
+            store,
+            os.path.join(self.source_dir, "output/all_dividend_yield_2025.csv"),
+            os.path.join(self.source_dir, "output/2020_2025_dividend_data.csv"),
+        )
+        self.backend = baostock_replay.install(baostock_replay.ReplayBaostock(store, latency=self.latency))
+
+        with open(os.path.join(self.source_dir, "stocks.id"), 'r', encoding='utf-8') as f:
+            self.watchlist = [tuple(line.strip().split(maxsplit=1)) for line in f if line.strip()]
+
+    def run_threads(self, target, chunks):
+        """每个分块一个线程并发运行"""
+        threads = [threading.Thread(target=target, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def bench_collectors(self, work_dir):
+        """采集器在回放后端上的吞吐量，按线程数拆分股票列表"""
+        from dividend_yield_collector import DividendYieldCollector
+        from get_2020_2025_data import YearlyDataCollector
+        from baostock_retry import DeadLetterQueue
+        from stock_scheduler import RefreshLog
+
+        stocks = self.watchlist
+        # 采集器按相对路径写output/下的临时结果、失败队列和采集记录，在工作目录中运行，不写入仓库；
+        # 各线程使用各自的任务名，互不覆盖对方的文件
+        with working_dir(work_dir):
+            for workers in self.workers:
+                chunks = [stocks[i::workers] for i in range(workers)]
+
+                def isolate(collector, job):
+                    job = f"bench.{job}.{threading.get_ident()}"
+                    collector.request_interval = (0, 0)
+                    collector.baostock = self.backend
+                    collector.dead_letter = DeadLetterQueue(job)
+                    collector.refresh_log = RefreshLog(job)
+                    return job
+
+                def collect_current(chunk):
+                    collector = DividendYieldCollector()
+                    job = isolate(collector, "dividend_yield")
+                    collector.temp_file = f"{job}_temp.csv"
+                    collector.stock_list = chunk
+                    collector.calculate_dividend_yield()
+
+                def collect_yearly(chunk):
+                    collector = YearlyDataCollector()
+                    job = isolate(collector, "yearly")
+                    collector.output_csv = os.path.join("output", f"{job}.csv")
+                    collector.stocks_id_file = f"{job}.id"
+                    write_stocks_id(collector.stocks_id_file, chunk)
+                    collector.collect_yearly_data()
+
+                self.measure(f"collector.dividend_yield.workers_{workers}",
+                             lambda: self.run_threads(collect_current, chunks), len(stocks))
+                self.measure(f"collector.yearly.workers_{workers}",
+                             lambda: self.run_threads(collect_yearly, chunks), len(stocks))
+
+    def bench_metrics(self):
+        """指标与筛选计算"""
+        from report_data import YEARS, load_yearly_data
+        from report_charts import sparkline_svgs, heatmap_svg
+        from report_server import ReportDataset
+        from extract_high_dividend_stocks import extract_high_dividend_stocks
+
+        for size in self.sizes:
+            size_dir = self.datasets[size]
+            yearly_csv = os.path.join(size_dir, "output/2020_2025_dividend_data.csv")
+            self.measure(f"metrics.load_yearly_data.{size}", lambda: load_yearly_data(yearly_csv), size)
+
+            stock_data = load_yearly_data(yearly_csv)
+            series = [[stock[f"{year}年股息率(%)"] for year in YEARS] for stock in stock_data]
+            self.measure(f"metrics.sparklines.{size}", lambda: sparkline_svgs(series), size)
+            self.measure(f"metrics.heatmap.{size}",
+                         lambda: heatmap_svg([s["股票名称"] for s in stock_data], YEARS, series, ""), size)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = ReportDataset(yearly_csv, os.path.join(size_dir, "output/all_dividend_yield_2025.csv"))
+            self.measure(f"metrics.query.{size}",
+                         lambda: dataset.query(sort="variance", min_avg_yield=3, page=2), size)
+
+            with working_dir(size_dir):
+                self.measure(f"screening.extract_high_dividend.{size}", extract_high_dividend_stocks, size)
+
+    def bench_generators(self):
+        """各HTML生成器在不同数据规模下的耗时"""
+        from generate_complete_html import generate_complete_html
+        from generate_simple_html import generate_simple_html
+        from generate_stock_pages import generate_stock_pages
+
+        for size in self.sizes:
+            with working_dir(self.datasets[size]):
+                self.measure(f"report.complete_html.{size}", lambda: generate_complete_html(force=True), size)
+                self.measure(f"report.simple_html.{size}", lambda: generate_simple_html(force=True), size)
+                self.measure(f"report.stock_pages.{size}", lambda: generate_stock_pages(), size)
+
+    def run(self, groups):
+        """运行选定的测试组"""
+        work_dir = tempfile.mkdtemp(prefix="dividend_bench_")
+        try:
+            print(f"准备数据: {work_dir}")
+            self.prepare(work_dir)
+            if "collectors" in groups:
+                print("采集器吞吐量:")
+                self.bench_collectors(work_dir)
+            if "metrics" in groups:
+                print("指标与筛选计算:")
+                self.bench_metrics()
+            if "reports" in groups:
+                print("HTML生成器:")
+                self.bench_generators()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return self.results
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """与基线比较，返回超过阈值的退化项"""
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        marker = ""
+        if ratio > 1 + threshold:
+            regressions.append((name, base["seconds"], result["seconds"], ratio))
+            marker = "  <-- 性能退化"
+        print(f"  {name}: 基线{base['seconds']:.4f}秒 -> 本次{result['seconds']:.4f}秒 ({ratio:.2f}x){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--groups", default="collectors,metrics,reports", help="测试组，逗号分隔")
+    parser.add_argument("--sizes", default=",".join(map(str, REPORT_SIZES)), help="报告数据规模，逗号分隔")
+    parser.add_argument("--workers", default=",".join(map(str, WORKER_COUNTS)), help="采集器线程数，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最短耗时")
+    parser.add_argument("--latency", type=float, default=0.002, help="回放后端每次调用的延迟（秒）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="相对基线允许的耗时增幅，超过即判定为退化")
+    parser.add_argument("--synthetic", action="store_true", help="报告数据使用合成数据集，而不是复制已有数据行")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为新的基线")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(
+        ".",
+        repeat=args.repeat,
+        latency=args.latency,
+        sizes=[int(size) for size in args.sizes.split(",")],
+        workers=[int(workers) for workers in args.workers.split(",")],
+        synthetic=args.synthetic,
+    )
+    results = benchmark.run(set(args.groups.split(",")))
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "latency": args.latency,
+        "synthetic": args.synthetic,
+        "results": results,
+    }
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"结果已追加到: {HISTORY_FILE}")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线: {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("没有基线，跳过比较（使用--save-baseline保存基线）")
+        return 0
+
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"与基线比较（阈值+{args.threshold * 100:.0f}%）:")
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n!!! 发现{len(regressions)}项性能退化超过阈值 !!!")
+        for name, base, current, ratio in regressions:
+            print(f"!!! {name}: {base:.4f}秒 -> {current:.4f}秒 ({ratio:.2f}x)")
+        return 1
+    print("未发现超过阈值的性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片采集与合并：多台机器各自用--shard i/N采集一部分股票，
+股票按代码的稳定哈希分配到分片，每个分片输出按代码排序的CSV和运行元数据；
+merge以流式多路归并把各分片CSV合并为all_dividend_yield_2025.csv（按代码排序），并检查冲突
+"""
+
+import os
+import csv
+import sys
+import glob
+import json
+import heapq
+import socket
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+
+from progress import setup_logging, add_logging_arguments
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIR = "output/shards"
+SHARD_KEY = "股票代码"
+
+
+def parse_shard(value):
+    """解析"i/N"形式的分片参数（i从1开始），返回(i, N)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为i/N，如1/4: {value}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"分片序号应在1到{count}之间: {value}")
+    return index, count
+
+
+def shard_of(code, count):
+    """股票所属的分片序号（从1开始）；使用sha256而不是hash()，不同机器和进程结果一致"""
+    digest = hashlib.sha256(code.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(stock_list, shard):
+    """从(代码, 名称)列表中选出属于shard=(i, N)的股票"""
+    index, count = shard
+    return [(code, name) for code, name in stock_list if shard_of(code, count) == index]
+
+
+def universe_hash(stock_list):
+    """股票池的哈希，合并时用于发现各分片看到的股票池不一致"""
+    codes = "\n".join(sorted(code for code, _ in stock_list))
+    return hashlib.sha256(codes.encode("utf-8")).hexdigest()
+
+
+def shard_name(basename, shard):
+    """分片文件名，如all_dividend_yield_2025.shard-1-of-4.csv"""
+    stem, ext = os.path.splitext(basename)
+    return f"{stem}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+
+def metadata_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".meta.json"
+
+
+def write_metadata(csv_path, shard, **fields):
+    """保存分片的运行元数据（分片号、主机、起止时间、股票数等）"""
+    meta = {"shard": f"{shard[0]}/{shard[1]}", "index": shard[0], "count": shard[1],
+            "host": socket.gethostname(), "pid": os.getpid(), "argv": sys.argv,
+            "finished": datetime.now().isoformat(timespec="seconds")}
+    meta.update(fields)
+    path = metadata_path(csv_path)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_metadata(csv_path):
+    path = metadata_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sort_csv(path, key=SHARD_KEY):
+    """按代码重新排序CSV（重试结果合并到分片后使用）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = sorted(reader, key=lambda row: row[key])
+    with open(path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(path + ".tmp", path)
+
+
+class ShardConflictError(Exception):
+    """分片之间存在冲突（同一代码的数据不同、分片缺失或文件未排序）"""
+
+
+class ShardMerger:
+    """流式多路归并：每个分片CSV只保持一行在内存中，输出按代码排序"""
+
+    def __init__(self, paths, key=SHARD_KEY, on_conflict="error", allow_partial=False):
+        self.paths = sorted(paths)
+        self.key = key
+        self.on_conflict = on_conflict
+        self.allow_partial = allow_partial
+        self.metadata = {path: read_metadata(path) for path in self.paths}
+        self.conflicts = []
+        self.duplicates = 0
+
+    def check_metadata(self):
+        """检查分片是否齐全、分片数一致，股票池不一致时警告"""
+        problems = []
+        counts = {meta["count"] for meta in self.metadata.values() if meta}
+        if len(counts) > 1:
+            problems.append(f"分片总数不一致: {sorted(counts)}")
+        elif counts:
+            count = counts.pop()
+            indexes = [meta["index"] for meta in self.metadata.values() if meta]
+            missing = sorted(set(range(1, count + 1)) - set(indexes))
+            repeated = sorted({index for index in indexes if indexes.count(index) > 1})
+            if missing and not self.allow_partial:
+                problems.append(f"缺少分片: {', '.join(f'{index}/{count}' for index in missing)}")
+            if repeated:
+                problems.append(f"分片重复: {', '.join(f'{index}/{count}' for index in repeated)}")
+        for path, meta in self.metadata.items():
+            if meta is None:
+                logger.warning(f"{path}没有元数据文件，无法检查分片是否齐全")
+
+        universes = {meta.get("universe_hash") for meta in self.metadata.values() if meta}
+        if len(universes) > 1:
+            logger.warning("各分片采集时的股票池不一致（可能在不同时间获取），合并结果可能缺少部分股票")
+        if problems:
+            raise ShardConflictError("；".join(problems))
+
+    def read_shard(self, path, order):
+        """逐行读取分片，检查按代码升序；order用于冲突时判断哪个分片较新"""
+        meta = self.metadata[path] or {}
+        finished = meta.get("finished", "")
+        previous = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = row[self.key]
+                if previous is not None and code < previous:
+                    raise ShardConflictError(f"{path}未按代码排序: {previous}之后出现{code}")
+                if meta.get("count") and shard_of(code, meta["count"]) != meta["index"]:
+                    logger.warning(f"{path}中的{code}不属于分片{meta['shard']}")
+                previous = code
+                yield code, finished, order, path, row
+
+    def fieldnames(self):
+        """所有分片的表头必须一致"""
+        headers = {}
+        for path in self.paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                headers[path] = next(csv.reader(f), [])
+        distinct = {tuple(header) for header in headers.values()}
+        if len(distinct) > 1:
+            raise ShardConflictError(f"分片表头不一致: {headers}")
+        return list(distinct.pop()) if distinct else []
+
+    def merged_rows(self):
+        """按代码归并各分片，同一代码出现多次时内容相同则去重，不同则按on_conflict处理"""
+        streams = [self.read_shard(path, order) for order, path in enumerate(self.paths)]
+        group = []
+        for item in heapq.merge(*streams, key=lambda item: item[0]):
+            if group and item[0] != group[0][0]:
+                yield self.resolve(group)
+                group = []
+            group.append(item)
+        if group:
+            yield self.resolve(group)
+
+    def resolve(self, group):
+        if len(group) == 1:
+            return group[0][4]
+        rows = [item[4] for item in group]
+        if all(row == rows[0] for row in rows):
+            self.duplicates += 1
+            return rows[0]
+        self.conflicts.append((group[0][0], [item[3] for item in group]))
+        if self.on_conflict == "error":
+            return rows[0]
+        # latest：取元数据中完成时间最晚的分片
+        return max(group, key=lambda item: (item[1], item[2]))[4]
+
+    def merge(self, output_path):
+        """合并到output_path；先写临时文件，on_conflict为error且存在冲突时不覆盖原文件"""
+        if not self.paths:
+            raise ShardConflictError("没有找到分片文件")
+        self.check_metadata()
+        fieldnames = self.fieldnames()
+
+        count = 0
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        try:
+            with open(output_path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                for row in self.merged_rows():
+                    writer.writerow(row)
+                    count += 1
+
+            for code, paths in self.conflicts[:20]:
+                logger.warning(f"{code}在多个分片中的数据不一致: {', '.join(paths)}")
+            if self.conflicts and self.on_conflict == "error":
+                raise ShardConflictError(f"{len(self.conflicts)}只股票在分片之间数据不一致，"
+                                         f"未写入{output_path}；可使用--on-conflict latest取最新分片的数据")
+            os.replace(output_path + ".tmp", output_path)
+        finally:
+            if os.path.exists(output_path + ".tmp"):
+                os.remove(output_path + ".tmp")
+
+        logger.info(f"已合并{len(self.paths)}个分片共{count}只股票到{output_path}"
+                    f"（重复{self.duplicates}只，冲突{len(self.conflicts)}只）")
+        return count
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("inputs", nargs="*",
+                        help=f"分片CSV文件，默认{SHARD_DIR}/all_dividend_yield_2025.shard-*.csv")
+    parser.add_argument("--output", default="output/all_dividend_yield_2025.csv", help="合并结果")
+    parser.add_argument("--on-conflict", choices=["error", "latest"], default="error",
+                        help="同一股票在多个分片中数据不同时：error报错且不写入，latest取最新完成的分片")
+    parser.add_argument("--allow-partial", action="store_true", help="允许缺少部分分片")
+    add_logging_arguments(parser)
+
+
+def main(args):
+    """按命令行参数合并分片"""
+    setup_logging(args.log_level, args.log_json)
+    paths = args.inputs or glob.glob(os.path.join(SHARD_DIR, "all_dividend_yield_2025.shard-*.csv"))
+    try:
+        ShardMerger(paths, on_conflict=args.on_conflict, allow_partial=args.allow_partial).merge(args.output)
+    except ShardConflictError as e:
+        logger.error(f"合并失败: {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    sys.exit(0 if main(parser.parse_args()) else 1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dividend-ranker统一命令行入口
+各子命令对应原有脚本，只在选中子命令后才导入对应模块，
+因此`--help`、screen、report等不需要baostock/OpenCV的命令启动很快
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+from datetime import datetime
+
+PROG = "dividend-ranker"
+
+# 子命令 -> (模块, 说明)；模块需提供add_arguments(parser)和main(args)
+COMMANDS = {
+    "collect": ("dividend_yield_collector", "获取2025年全市场股息率"),
+    "merge": ("collector_shards", "合并collect --shard i/N的分片结果"),
+    "universe": ("stock_universe", "查看股票池快照及新上市、退市的股票"),
+    "yearly": ("get_2020_2025_data", "获取stocks.id中股票2020-2025年的分红、收盘价和利润"),
+    "repair": ("update_missing_stocks", "重新采集sz.301528到sz.302132范围内股票的2025年股息率，更新all_dividend_yield_2025.csv"),
+    "screen": ("extract_high_dividend_stocks", "筛选股息率大于3%的股票，生成stocks.id"),
+    "funnel": ("funnel", "两阶段筛选漏斗：全市场股息率筛选后在同一进程中采集2020-2025年数据"),
+    "watch": ("yield_watch", "盯盘模式：定时查询stocks.id中股票的最新收盘价，股息率穿越阈值时产生事件"),
+    "ocr": ("extract_stock_codes", "从stock.jpg或截图目录中识别股票代码"),
+    "pipeline": ("pipeline", "按依赖关系运行整个流水线，跳过输入未变化的阶段"),
+    "gateway": ("baostock_gateway", "本地Baostock网关：常驻会话，脚本通过Unix socket查询"),
+}
+
+# report子命令 -> (模块, 说明)
+REPORTS = {
+    "complete": ("generate_complete_html", "生成2020-2025年完整报告"),
+    "simple": ("generate_simple_html", "生成2025年股息率报告"),
+    "pages": ("generate_stock_pages", "生成股票详情页"),
+    "serve": ("report_server", "启动报告查询服务"),
+}
+
+INSPECT_FILES = [
+    ("2025年全市场股息率", "output/all_dividend_yield_2025.csv", True),
+    ("高股息股票列表", "stocks.id", False),
+    ("2020-2025年数据", "output/2020_2025_dividend_data.csv", True),
+]
+
+
+def format_commands(commands):
+    return "\n".join(f"  {name:<10}{description}" for name, (_, description) in commands.items())
+
+
+def usage():
+    return (f"用法: {PROG} <子命令> [参数]\n\n子命令:\n{format_commands(COMMANDS)}\n"
+            f"  {'report':<10}生成或提供报告: {', '.join(REPORTS)}\n"
+            f"  {'inspect':<10}查看数据文件、失败队列、调用统计和报告清单的状态\n\n"
+            f"使用 `{PROG} <子命令> --help` 查看子命令参数")
+
+
+def run_module(module_name, prog, argv):
+    """导入子命令模块，解析参数并运行，返回退出码"""
+    module = importlib.import_module(module_name)
+    parser = argparse.ArgumentParser(prog=prog, description=(module.__doc__ or "").strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    module.add_arguments(parser)
+    result = module.main(parser.parse_args(argv))
+    if result is False:
+        return 1
+    return result if isinstance(result, int) and not isinstance(result, bool) else 0
+
+
+def count_lines(path, header):
+    with open(path, 'r', encoding='utf-8') as f:
+        count = sum(1 for line in f if line.strip())
+    return max(count - 1, 0) if header else count
+
+
+def format_mtime(path):
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def inspect(argv):
+    """打印数据文件、失败队列、Baostock调用统计和报告清单的概况，只读取文件"""
+    parser = argparse.ArgumentParser(prog=f"{PROG} inspect", description="查看数据文件、失败队列、调用统计和报告清单的状态")
+    parser.parse_args(argv)
+
+    print("数据文件:")
+    for label, path, header in INSPECT_FILES:
+        if os.path.exists(path):
+            print(f"  {label:<14}{path:<40}{count_lines(path, header):>8}行  {format_mtime(path)}")
+        else:
+            print(f"  {label:<14}{path:<40}{'不存在':>8}")
+
+    dead_letter_dir = "output/dead_letter"
+    print("\n失败队列:")
+    queues = sorted(name for name in os.listdir(dead_letter_dir) if name.endswith(".jsonl")) \
+        if os.path.isdir(dead_letter_dir) else []
+    for name in queues:
+        path = os.path.join(dead_letter_dir, name)
+        print(f"  {name[:-len('.jsonl')]:<28}{count_lines(path, False):>6}只股票  {format_mtime(path)}")
+    if not queues:
+        print("  无")
+
+    metrics_dir = "output/metrics"
+    print("\nBaostock调用统计:")
+    jobs = sorted(name for name in os.listdir(metrics_dir) if name.endswith(".json")) \
+        if os.path.isdir(metrics_dir) else []
+    for name in jobs:
+        with open(os.path.join(metrics_dir, name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        apis = data.get("apis", {})
+        calls = sum(api["calls"] for api in apis.values())
+        errors = sum(sum(api["errors"].values()) for api in apis.values())
+        seconds = sum(api["total_seconds"] for api in apis.values())
+        finished = datetime.fromtimestamp(data["finished"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"  {data.get('job', name):<28}{calls:>8}次调用{errors:>6}次错误{seconds:>10.1f}秒  {finished}")
+    if not jobs:
+        print("  无")
+
+    # 只比较清单中记录的输入和代码哈希，不导入生成器模块；生成器版本写在生成器代码中，版本变化时代码哈希也变化
+    from report_manifest import file_hash
+    manifest_dir = "output/.manifest"
+    print("\n报告清单:")
+    manifests = sorted(name for name in os.listdir(manifest_dir) if name.endswith(".json")) \
+        if os.path.isdir(manifest_dir) else []
+    for name in manifests:
+        with open(os.path.join(manifest_dir, name), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        changed = [path for path, digest in manifest.get("inputs", {}).items() if file_hash(path) != digest]
+        changed_code = [os.path.basename(path) for path, digest in manifest.get("code", {}).items()
+                        if file_hash(path) != digest]
+        missing = [path for path in manifest.get("outputs", []) if not os.path.exists(path)]
+        if missing:
+            state = f"输出缺失: {', '.join(missing)}"
+        elif changed:
+            state = f"输入已变化: {', '.join(changed)}"
+        elif changed_code:
+            state = f"生成器代码已变化: {', '.join(changed_code)}"
+        else:
+            state = "最新"
+        print(f"  {name[:-len('.json')]:<28}{state}")
+    if not manifests:
+        print("  无")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+
+    command, rest = argv[0], argv[1:]
+    if command in COMMANDS:
+        return run_module(COMMANDS[command][0], f"{PROG} {command}", rest)
+    if command == "inspect":
+        return inspect(rest)
+    if command == "report":
+        if not rest or rest[0] in ("-h", "--help"):
+            print(f"用法: {PROG} report <类型> [参数]\n\n类型:\n{format_commands(REPORTS)}")
+            return 0 if rest else 2
+        if rest[0] not in REPORTS:
+            print(f"未知报告类型: {rest[0]}，可选: {', '.join(REPORTS)}", file=sys.stderr)
+            return 2
+        return run_module(REPORTS[rest[0]][0], f"{PROG} report {rest[0]}", rest[1:])
+
+    print(f"未知子命令: {command}\n\n{usage()}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
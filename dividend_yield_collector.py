@@ -9,53 +9,142 @@ import os
 import csv
 import time
 import random
+import logging
+import argparse
+from datetime import datetime
+
+from baostock_metrics import BaostockMetrics
+from baostock_retry import (
+    BaostockError, BudgetExhaustedError, resilient_baostock, add_retry_arguments, circuit_breaker_from_args, CircuitBreaker, DeadLetterQueue,
+    record_stock_result, merge_csv_rows,
+)
+from collector_shards import (
+    SHARD_DIR, parse_shard, select_shard, universe_hash, shard_name, write_metadata, read_metadata, sort_csv,
+)
+from query_planner import (
+    COLLECT_CALLS, CallBudget, QueryPlan, add_budget_arguments, max_calls,
+)
+from stock_scheduler import PriorityScheduler, RefreshLog, Deadline, add_schedule_arguments
+from stock_universe import UNIVERSE_MAX_AGE, SnapshotError, add_universe_arguments, latest_snapshot, fetch_snapshot
+from progress import ProgressReporter, setup_logging, add_logging_arguments
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+logger = logging.getLogger(__name__)
 
 class DividendYieldCollector:
-    def __init__(self):
+    # 每只股票处理完后的随机休眠区间（秒），避免API调用过于频繁
+    request_interval = (0.3, 1.0)
+    # 进度汇报间隔（秒）
+    progress_interval = 10.0
+    # 网络或会话错误时的最大重试次数和首次重试前的等待时间（秒）
+    max_retries = 3
+    retry_backoff = 1.0
+    # 单次Baostock调用的时限（秒），超时后关闭连接并重试
+    call_timeout = 30.0
+    
+    def __init__(self, shard=None):
         self.baostock = None
+        self.metrics = BaostockMetrics()
         self.stock_list = []
+        # 分片采集：shard=(i, N)时只采集按代码哈希分到第i片的股票，结果写入output/shards/
+        self.shard = shard
+        self.job = "dividend_yield_collector"
+        self.result_file = "all_dividend_yield_2025.csv"
+        self.temp_file = "all_dividend_yield_2025_temp.csv"
+        if shard:
+            self.job = f"dividend_yield_collector.shard-{shard[0]}-of-{shard[1]}"
+            self.result_file = os.path.relpath(os.path.join(SHARD_DIR, shard_name(self.result_file, shard)), "output")
+            self.temp_file = os.path.relpath(os.path.join(SHARD_DIR, shard_name(self.temp_file, shard)), "output")
+        self.dead_letter = DeadLetterQueue(self.job)
+        self.breaker = CircuitBreaker()
+        # 调用次数上限，None表示不限制
+        self.budget = None
+        self.call_budget = CallBudget(None, self.metrics, max_calls(COLLECT_CALLS))
+        # 截止时间，None表示不限制；设置了预算或截止时间时按优先级顺序采集
+        self.deadline = None
+        self.run_deadline = Deadline(None)
+        self.refresh_log = RefreshLog(self.job)
+        self.scheduler = None
+        # 有已公告但尚未除权除息的分红方案的股票
+        self.pending = set()
+        # 股票池快照未超过该时长（小时）时直接使用；changes_only时只处理股票池与已有结果的差异
+        self.universe_max_age = UNIVERSE_MAX_AGE
+        self.refresh_universe = False
+        self.changes_only = False
+        # 从已有结果中去掉的退市股票，以及更新了名称的行
+        self.removed = []
+        self.renamed = []
         self.output_dir = "output"
-        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(os.path.join(self.output_dir, os.path.dirname(self.result_file)), exist_ok=True)
         
     def init_baostock(self):
         """初始化Baostock API"""
         import baostock as bs
-        self.baostock = bs
+        # 包装baostock：调用超时保护，记录每个接口的耗时、错误码和返回行数，失败时重试
+        self.baostock = resilient_baostock(bs, self.metrics, self.max_retries, self.retry_backoff, self.call_timeout)
         
-        login_result = bs.login()
+        # 登录同样受调用时限保护
+        login_result = self.baostock.login()
         if login_result.error_code != '0':
-            print(f"Baostock登录失败: {login_result.error_msg}")
+            logger.error(f"Baostock登录失败: {login_result.error_msg}")
             return False
-        print("Baostock登录成功")
+        logger.info("Baostock登录成功")
         return True
     
+    def fresh_snapshot(self):
+        """未过期的股票池快照，没有或已过期时返回None"""
+        if self.refresh_universe:
+            return None
+        snapshot = latest_snapshot()
+        if snapshot is None or snapshot.age_hours() > self.universe_max_age:
+            return None
+        return snapshot
+    
     def get_stock_list(self):
-        """获取所有沪深股市股票列表"""
-        print("正在获取股票列表...")
+        """获取所有沪深股市股票列表：快照未过期时直接使用，否则查询并保存新的快照"""
+        snapshot = self.fresh_snapshot()
+        if snapshot is not None:
+            logger.info(f"使用股票池快照{snapshot.path}（{snapshot.age_hours():.1f}小时前）")
+        else:
+            logger.info("正在获取股票列表...")
+            try:
+                snapshot, _ = fetch_snapshot(self.baostock)
+            except (BaostockError, SnapshotError) as e:
+                logger.error(f"获取股票列表失败: {e}")
+                return False
         
-        rs = self.baostock.query_stock_basic()
-        if rs.error_code != '0':
-            print(f"获取股票列表失败: {rs.error_msg}")
+        # 只保留沪深股市的上市股票（类型为1，状态为1）
+        self.stock_list = snapshot.listed()
+        logger.info(f"共获取到{len(self.stock_list)}只上市股票")
+        return True
+    
+    def universe_changes(self, csv_path):
+        """股票池与已有结果的差异：返回(已有结果中没有的股票, 已不在股票池中的代码, 改名后的行)，没有已有结果时返回None"""
+        if not os.path.exists(csv_path):
+            return None
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            existing = {row["股票代码"]: row for row in csv.DictReader(f)}
+        names = dict(self.stock_list)
+        added = [stock for stock in self.stock_list if stock[0] not in existing]
+        removed = [code for code in existing if code not in names]
+        renamed = [dict(row, **{"股票名称": names[code]}) for code, row in existing.items()
+                   if code in names and row["股票名称"] != names[code]]
+        return added, removed, renamed
+    
+    def select_changes(self, csv_path):
+        """只采集已有结果中没有的股票（新上市或之前未采集成功），之后去掉退市的股票并更新改名的股票；
+        没有已有结果时返回False"""
+        changes = self.universe_changes(csv_path)
+        if changes is None:
+            logger.warning(f"没有已有结果{csv_path}，采集全部股票")
             return False
-        
-        stock_list = []
-        while rs.next():
-            row = rs.get_row_data()
-            code = row[0]  # 股票代码，如sh.600000
-            name = row[1]  # 股票名称
-            stock_type = row[4]  # 类型：1为股票，2为指数，3为ETF等
-            status = row[5]  # 上市状态：1为上市，0为退市
-            
-            # 只保留沪深股市的上市股票（类型为1，状态为1）
-            if code.startswith(('sh.', 'sz.')) and stock_type == '1' and status == '1':
-                stock_list.append((code, name))
-        
-        self.stock_list = stock_list
-        print(f"共获取到{len(stock_list)}只上市股票")
+        self.stock_list, self.removed, self.renamed = changes
+        logger.info(f"股票池与已有结果相比: 采集{len(self.stock_list)}只新股票，去掉{len(self.removed)}只退市股票，"
+                    f"更新{len(self.renamed)}只股票的名称")
         return True
     
     def get_2025_dividends(self, code):
-        """获取股票2025年的累计分红金额"""
+        """获取股票2025年的累计分红金额，查询失败时抛出BaostockError"""
         total_dividend = 0.0
         
         # 使用Baostock的分红数据查询接口
@@ -65,12 +154,13 @@ class DividendYieldCollector:
             yearType="report"
         )
         
-        if rs.error_code != '0':
-            # print(f"获取{code}分红数据失败: {rs.error_msg}")
-            return total_dividend
-        
+        today = time.strftime("%Y-%m-%d")
+        self.pending.discard(code)
         while rs.next():
             row = rs.get_row_data()
+            # row[3]为方案公告日，row[6]为除权除息日：已公告但未除权除息的方案之后可能改变股息率
+            if len(row) >= 7 and row[3] and (not row[6] or row[6] > today):
+                self.pending.add(code)
             # row[9]是10派x元的x值
             if len(row) >= 10:
                 dividend = row[9]
@@ -85,7 +175,7 @@ class DividendYieldCollector:
         return total_dividend
     
     def get_2025_close_price(self, code):
-        """获取股票2025年11月28日的收盘价"""
+        """获取股票2025年11月28日的收盘价，当天无数据时返回None，查询失败时抛出BaostockError"""
         rs = self.baostock.query_history_k_data_plus(
             code=code,
             fields="close",
@@ -95,9 +185,6 @@ class DividendYieldCollector:
             adjustflag="3"
         )
         
-        if rs.error_code != '0':
-            return None
-        
         if rs.next():
             row = rs.get_row_data()
             return row[0] if row[0] and row[0] != '' else None
@@ -106,9 +193,16 @@ class DividendYieldCollector:
     def calculate_dividend_yield(self):
         """计算所有股票的股息率，保存所有股票数据"""
         results = []
+        progress = ProgressReporter(len(self.stock_list), "股息率采集", self.progress_interval, logger)
         
         for i, (code, name) in enumerate(self.stock_list):
-            print(f"正在处理第{i+1}/{len(self.stock_list)}只股票: {code} {name}")
+            if not self.call_budget.allows():
+                self.call_budget.stop(self.dead_letter, self.stock_list[i:])
+                break
+            if not self.run_deadline.allows(i):
+                self.run_deadline.stop(self.dead_letter, self.stock_list[i:])
+                break
+            logger.debug(f"正在处理第{i+1}/{len(self.stock_list)}只股票: {code} {name}")
             
             try:
                 # 获取2025年累计分红
@@ -122,7 +216,7 @@ class DividendYieldCollector:
                     dividend_yield = (total_dividend / float(close_price)) * 100
                     
                     # 添加日志
-                    print(f"  2025年累计分红: {total_dividend:.4f}, 2025-11-28收盘价: {close_price}, 股息率: {dividend_yield:.2f}%")
+                    logger.debug(f"2025年累计分红: {total_dividend:.4f}, 2025-11-28收盘价: {close_price}, 股息率: {dividend_yield:.2f}%")
                     
                     # 保存所有股票，不设过滤条件
                     results.append({
@@ -133,7 +227,7 @@ class DividendYieldCollector:
                         "股息率(%)": round(dividend_yield, 2)
                     })
                 else:
-                    print(f"  收盘价数据缺失或为0: {close_price}")
+                    logger.debug(f"收盘价数据缺失或为0: {close_price}")
                     # 即使收盘价缺失，也保存股票信息，股息率设为0
                     results.append({
                         "股票代码": code,
@@ -142,19 +236,39 @@ class DividendYieldCollector:
                         "2025-11-28收盘价": 0.0,
                         "股息率(%)": 0.0
                     })
-                
-                # 每处理100只股票，保存一次中间结果
-                if (i + 1) % 100 == 0:
-                    self.save_to_csv(results, f"all_dividend_yield_2025_temp.csv")
-                    print(f"  已保存中间结果，共{len(results)}条数据")
-                
-                # 随机休眠，避免API调用过于频繁
-                time.sleep(random.uniform(0.3, 1.0))
-                
+            except BudgetExhaustedError as e:
+                # 重试用完了预算：这只股票没有完成，和剩余股票一起记入失败队列
+                self.call_budget.stop(self.dead_letter, self.stock_list[i:], e)
+                break
             except Exception as e:
-                print(f"处理{code}时出错: {e}")
+                # 失败的股票不写入结果，记录到失败队列
+                logger.warning(f"处理{code}时出错: {e}")
+                self.dead_letter.add(code, name, e)
+                progress.advance(errors=1)
+                if not record_stock_result(self.breaker, self.dead_letter, False, self.stock_list[i + 1:]):
+                    break
                 continue
+            
+            # 采集记录和中间结果的读写不属于这只股票的查询，出错时不计为失败
+            self.refresh_log.mark(code, pending=code in self.pending)
+            
+            # 每处理100只股票，保存一次中间结果
+            if (i + 1) % 100 == 0:
+                try:
+                    self.save_to_csv(results, self.temp_file)
+                    self.refresh_log.save()
+                    logger.debug(f"已保存中间结果，共{len(results)}条数据")
+                except OSError as e:
+                    logger.warning(f"保存中间结果失败: {e}")
+            
+            progress.advance()
+            if not record_stock_result(self.breaker, self.dead_letter, True, self.stock_list[i + 1:]):
+                break
+            
+            # 随机休眠，避免API调用过于频繁
+            time.sleep(random.uniform(*self.request_interval))
         
+        progress.finish()
         return results
     
     def save_to_csv(self, data, output_path="all_dividend_yield_2025.csv"):
@@ -162,7 +276,7 @@ class DividendYieldCollector:
         csv_path = os.path.join(self.output_dir, output_path)
         
         if not data:
-            print("没有股票数据")
+            logger.info("没有股票数据")
             return False
         
         # 获取字段名
@@ -174,30 +288,155 @@ class DividendYieldCollector:
             for row in data:
                 writer.writerow(row)
         
-        print(f"已将{len(data)}只股票的股息率数据保存到{csv_path}")
+        logger.info(f"已将{len(data)}只股票的股息率数据保存到{csv_path}")
         return True
     
     def close_baostock(self):
-        """关闭Baostock API"""
+        """关闭Baostock API，输出并导出调用统计"""
         if self.baostock:
             self.baostock.logout()
-            print("Baostock已退出")
+            logger.info("Baostock已退出")
+            self.metrics.print_summary()
+            self.metrics.export(self.job)
+    
+    def prioritize(self):
+        """设置了调用预算或截止时间时按优先级（陈旧程度和重要性）顺序采集"""
+        if self.budget is not None or self.deadline is not None:
+            self.scheduler = PriorityScheduler(self.refresh_log)
+            self.stock_list = self.scheduler.order(self.stock_list)
+        else:
+            self.scheduler = None
+    
+    def plan(self, retry_failed=False):
+        """不登录Baostock，按失败队列或上次的结果估计本次的查询计划"""
+        if retry_failed:
+            self.stock_list = [(entry["code"], entry["name"]) for entry in self.dead_letter.load()]
+        else:
+            csv_path = os.path.join(self.output_dir, "all_dividend_yield_2025.csv")
+            snapshot = latest_snapshot()
+            if snapshot is not None:
+                self.stock_list = snapshot.listed()
+            elif os.path.exists(csv_path):
+                with open(csv_path, 'r', encoding='utf-8') as f:
+                    self.stock_list = [(row["股票代码"], row["股票名称"]) for row in csv.DictReader(f)]
+            if self.shard:
+                self.stock_list = select_shard(self.stock_list, self.shard)
+            changes = self.universe_changes(os.path.join(self.output_dir, self.result_file))
+            if self.changes_only and changes is not None:
+                self.stock_list = changes[0]
+        self.prioritize()
+        fixed = [] if retry_failed or self.fresh_snapshot() else [("query_stock_basic", 1)]
+        return QueryPlan(self.job, self.stock_list, COLLECT_CALLS, self.request_interval, fixed, self.budget,
+                         deadline=self.deadline)
     
-    def run(self):
-        """运行数据收集流程"""
+    def select_shard(self):
+        """分片模式下只保留本分片的股票，返回写入元数据的股票池信息"""
+        universe = {"universe_size": len(self.stock_list), "universe_hash": universe_hash(self.stock_list)}
+        self.stock_list = select_shard(self.stock_list, self.shard)
+        logger.info(f"分片{self.shard[0]}/{self.shard[1]}: 共{universe['universe_size']}只股票，"
+                    f"本分片{len(self.stock_list)}只")
+        return universe
+    
+    def run(self, retry_failed=False):
+        """运行数据收集流程；retry_failed为True时只重新采集失败队列中的股票，结果合并到已有CSV"""
+        started = datetime.now().isoformat(timespec="seconds")
+        csv_path = os.path.join(self.output_dir, self.result_file)
         try:
             if not self.init_baostock():
-                return
+                return False
+            
+            previous = self.dead_letter.load() if retry_failed else []
+            if retry_failed:
+                self.stock_list = [(entry["code"], entry["name"]) for entry in previous]
+                logger.info(f"失败队列中共{len(self.stock_list)}只股票")
+                if not self.stock_list:
+                    return True
+            elif not self.get_stock_list():
+                return False
             
-            if not self.get_stock_list():
-                return
+            if self.shard and retry_failed:
+                # 沿用首次运行记录的股票池信息
+                meta = read_metadata(csv_path) or {}
+                universe = {key: meta[key] for key in ("universe_size", "universe_hash", "assigned", "started")
+                            if key in meta}
+            elif self.shard:
+                universe = dict(self.select_shard(), assigned=len(self.stock_list), started=started)
+            changes = self.changes_only and not retry_failed and self.select_changes(csv_path)
+            keep = []
+            if changes:
+                # 只处理差异时保留其他股票的失败记录，之后仍可用--retry-failed重试
+                processing = {code for code, _ in self.stock_list} | set(self.removed)
+                queued = self.dead_letter.load()
+                previous = [entry for entry in queued if entry["code"] in processing]
+                keep = [entry for entry in queued if entry["code"] not in processing]
             
+            self.prioritize()
+            self.call_budget = CallBudget(self.budget, self.metrics, max_calls(COLLECT_CALLS))
+            self.baostock.budget = self.call_budget
+            self.run_deadline = Deadline(self.deadline)
+            self.dead_letter.start(previous, keep)
             results = self.calculate_dividend_yield()
-            self.save_to_csv(results)
+            self.refresh_log.save()
+            # 重试、预算用完、到达截止时间或熔断中止时合并到已有结果，未处理的股票保留上次的数据
+            stopped = self.call_budget.exhausted or self.run_deadline.exhausted or self.dead_letter.aborted
+            merged = retry_failed or changes or (stopped and os.path.exists(csv_path))
+            if merged:
+                merge_csv_rows(csv_path, results + self.renamed, remove=self.removed)
+            else:
+                # 分片结果按代码排序，合并时可以流式归并
+                if self.shard:
+                    results.sort(key=lambda row: row["股票代码"])
+                self.save_to_csv(results, self.result_file)
+            if self.shard and os.path.exists(csv_path):
+                if merged:
+                    sort_csv(csv_path)
+                write_metadata(csv_path, self.shard, rows=count_rows(csv_path, header=True),
+                               failed=len(self.dead_letter.entries), **universe)
+            self.dead_letter.finish()
+            return True
             
         finally:
             self.close_baostock()
 
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="分片采集，如1/4：只采集按代码哈希分到第1片（共4片）的股票，结果写入output/shards/，"
+                             "全部分片完成后用collector_shards.py合并")
+    add_logging_arguments(parser)
+    add_retry_arguments(parser)
+    add_budget_arguments(parser)
+    add_schedule_arguments(parser)
+    add_universe_arguments(parser)
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
+
+    collector = DividendYieldCollector(args.shard)
+    collector.progress_interval = args.progress_interval
+    collector.max_retries = args.max_retries
+    collector.retry_backoff = args.retry_backoff
+    collector.call_timeout = args.call_timeout
+    collector.breaker = circuit_breaker_from_args(args)
+    collector.budget = args.budget
+    collector.deadline = args.deadline
+    collector.universe_max_age = args.universe_max_age
+    collector.refresh_universe = args.refresh_universe
+    collector.changes_only = args.changes_only
+    if args.dry_run:
+        collector.plan(args.retry_failed).print()
+        if collector.scheduler:
+            collector.scheduler.print(collector.stock_list)
+        return True
+    return run_with_profile(args.profile, collector.job, lambda: collector.run(args.retry_failed),
+                            lambda: len(collector.stock_list), args.profile_top)
+
+
 if __name__ == "__main__":
-    collector = DividendYieldCollector()
-    collector.run()
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -6,9 +6,43 @@
 
 import os
 import csv
+import argparse
 
-def extract_high_dividend_stocks():
-    """提取股息率大于3%的股票"""
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+# 默认筛选阈值：股息率大于3%
+MIN_YIELD = 3.0
+
+
+def screen_stocks(rows, min_yield=MIN_YIELD, top=None):
+    """从2025年股息率数据中筛选股息率大于min_yield的股票，返回(代码, 名称)列表；
+    top不为空时只保留股息率最高的top只，顺序与输入一致"""
+    selected = []
+    for row in rows:
+        try:
+            # 获取股息率
+            dividend_yield = float(row["股息率(%)"])
+            # 筛选股息率大于阈值的股票
+            if dividend_yield > min_yield:
+                selected.append((dividend_yield, row["股票代码"], row["股票名称"]))
+        except (ValueError, KeyError) as e:
+            continue
+    
+    if top is not None and len(selected) > top:
+        keep = {code for _, code, _ in sorted(selected, key=lambda item: -item[0])[:top]}
+        selected = [item for item in selected if item[1] in keep]
+    return [(code, name) for _, code, name in selected]
+
+
+def write_stocks_id(stocks, output_file="stocks.id"):
+    """写入stocks.id，每行股票代码和名称，用空格分隔"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for code, name in stocks:
+            f.write(f"{code} {name}\n")
+
+
+def extract_high_dividend_stocks(min_yield=MIN_YIELD, top=None):
+    """提取股息率大于min_yield（默认3%）的股票"""
     input_file = "output/all_dividend_yield_2025.csv"
     output_file = "stocks.id"
     
@@ -17,34 +51,34 @@ def extract_high_dividend_stocks():
         print(f"输入文件不存在: {input_file}")
         return False
     
-    high_dividend_stocks = []
-    
     # 读取CSV文件
     with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                # 获取股息率
-                dividend_yield = float(row["股息率(%)"])
-                # 筛选股息率大于3%的股票
-                if dividend_yield > 3:
-                    high_dividend_stocks.append({
-                        "股票代码": row["股票代码"],
-                        "股票名称": row["股票名称"]
-                    })
-            except (ValueError, KeyError) as e:
-                continue
+        high_dividend_stocks = screen_stocks(csv.DictReader(f), min_yield, top)
     
-    print(f"共找到{len(high_dividend_stocks)}只股息率大于3%的股票")
+    print(f"共找到{len(high_dividend_stocks)}只股息率大于{min_yield:g}%的股票")
     
     # 写入到stocks.id文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for stock in high_dividend_stocks:
-            # 只写入股票代码和名称，用空格分隔
-            f.write(f"{stock['股票代码']} {stock['股票名称']}\n")
+    write_stocks_id(high_dividend_stocks, output_file)
     
     print(f"已将{len(high_dividend_stocks)}只股票写入到: {output_file}")
     return True
 
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--min-yield", type=float, default=MIN_YIELD, help="股息率阈值(%%)，保留大于该值的股票")
+    parser.add_argument("--top", type=int, default=None, help="只保留股息率最高的N只股票")
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    return run_with_profile(args.profile, "extract_high_dividend_stocks",
+                            lambda: extract_high_dividend_stocks(args.min_yield, args.top),
+                            count_rows("output/all_dividend_yield_2025.csv", header=True), args.profile_top)
+
+
 if __name__ == "__main__":
-    extract_high_dividend_stocks()
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
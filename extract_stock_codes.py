@@ -2,50 +2,303 @@
 # -*- coding: utf-8 -*-
 """
 从stock.jpg中提取第二列的股票代码，保存到stock.txt文件
+也可以批量处理目录或多页TIFF（如券商自选股截图）：先按空白间隔找出代码列并裁剪后再识别，
+各页在进程池中并行识别，结果按图片内容的哈希缓存在output/ocr_cache/，重复导入的截图不再识别（有页面识别失败的图片不缓存）；
+识别结果按本地股票池校验（见stock_universe.py），纠正常见的混淆字符并统一为sh./sz.前缀，无法识别的内容单独列出
 """
 
 import os
-import cv2
-import pytesseract
-from PIL import Image
+import json
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from profiling import add_profile_argument, run_with_profile
+from stock_universe import load_index
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+MULTI_PAGE_EXTENSIONS = (".tif", ".tiff")
+CACHE_DIR = "output/ocr_cache"
+# 识别设置变化后缓存失效
+CACHE_VERSION = 1
+
+
+def find_images(inputs):
+    """展开输入：目录中的图片按文件名排序"""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.append(path)
+    return paths
+
+
+def file_digest(path):
+    """图片内容的sha256，作为缓存键（与文件名、修改时间无关）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_count(path):
+    """多页TIFF的页数，其他图片为1页"""
+    if not path.lower().endswith(MULTI_PAGE_EXTENSIONS):
+        return 1
+    from PIL import Image
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def load_page(path, page):
+    """读取一页并转为灰度图，无法读取时返回None"""
+    import cv2
+    if page == 0 and not path.lower().endswith(MULTI_PAGE_EXTENSIONS):
+        img = cv2.imread(path)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img is not None else None
+
+    import numpy as np
+    from PIL import Image
+    with Image.open(path) as img:
+        img.seek(page)
+        return np.array(img.convert("L"))
+
+
+def text_lines(binary):
+    """按水平方向的墨迹投影找出各文字行的(起, 止)纵坐标，几乎占满整行宽度的横线视为表格线"""
+    width = binary.shape[1]
+    ink = (binary > 0).sum(axis=1)
+    lines = []
+    start = None
+    for y, count in enumerate(ink):
+        if 0 < count < width * 0.9:
+            if start is None:
+                start = y
+        elif start is not None:
+            lines.append((start, y))
+            start = None
+    if start is not None:
+        lines.append((start, len(ink)))
+    return lines
+
+
+def column_bounds(binary, min_gap):
+    """按竖直方向的墨迹投影找出各列的(起, 止)横坐标：连续min_gap列以上没有墨迹视为列间隔，
+    几乎占满整列高度的竖线视为表格线；标题和表头的文字常跨过列间隔，
+    只用分段数等于最常见分段数的文字行（表格主体）做投影"""
+    import numpy as np
+    height = binary.shape[0]
+    rules = (binary > 0).sum(axis=0) >= height * 0.9
+    lines = [(binary[y0:y1] > 0).any(axis=0) & ~rules for y0, y1 in text_lines(binary)]
+    if not lines:
+        return []
+    segments = [len(ink_runs(filled, min_gap)) for filled in lines]
+    # 出现次数相同时取分段多的，表头和标题的分段通常更少
+    counts = Counter(segments)
+    body = max(counts, key=lambda n: (counts[n], n))
+    filled = np.logical_or.reduce([line for line, n in zip(lines, segments) if n == body])
+    return ink_runs(filled, min_gap)
+
+
+def ink_runs(filled, min_gap):
+    """把有墨迹的横坐标连成(起, 止)区间，间隔不足min_gap的合并，宽度不足3的丢弃"""
+    bounds = []
+    start = None
+    gap = 0
+    for x, has_ink in enumerate(filled):
+        if has_ink:
+            if start is None:
+                start = x
+            gap = 0
+            end = x + 1
+        elif start is not None:
+            gap += 1
+            if gap >= min_gap:
+                bounds.append((start, end))
+                start = None
+    if start is not None:
+        bounds.append((start, end))
+    return [(x0, x1) for x0, x1 in bounds if x1 - x0 >= 3]
+
+
+def parse_codes(text, column=None):
+    """解析识别结果：column为None时每行取第一个词（已裁剪为代码列），否则取第column列（从1开始）"""
+    stock_codes = []
+    for line in text.strip().split('\n'):
+        # 分割每行内容，假设使用空格或制表符分隔
+        parts = line.split()
+        index = 0 if column is None else column - 1
+        if len(parts) > index:
+            code = parts[index]
+            # 只保留数字和字母组成的股票代码（允许sh.600000形式）
+            if code.replace('.', '').isalnum():
+                stock_codes.append(code)
+    return stock_codes
+
+
+def ocr_page(path, page, column=2, crop=True):
+    """识别一页中的股票代码；在进程池的子进程中运行，无法读取时返回None（与没有识别到代码区分）"""
+    # OpenCV和Tesseract导入较慢，只在真正识别时导入
+    import cv2
+    import pytesseract
+
+    gray = load_page(path, page)
+    if gray is None:
+        print(f"无法读取图片: {path}")
+        return None
+
+    # 二值化处理
+    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
+
+    if crop:
+        bounds = column_bounds(binary, max(binary.shape[1] // 50, 8))
+        if len(bounds) >= column:
+            x0, x1 = bounds[column - 1]
+            pad = 4
+            cropped = binary[:, max(x0 - pad, 0):x1 + pad]
+            # 代码列只有字母、数字和点，只用英文模型并限定字符，比整图中英文识别快且准
+            text = pytesseract.image_to_string(
+                cropped, lang='eng', config='--psm 6 -c tessedit_char_whitelist=0123456789.shzSHZ')
+            return parse_codes(text)
+        print(f"{path}第{page + 1}页未找到第{column}列，识别整页")
+
+    # 使用OCR识别整页
+    text = pytesseract.image_to_string(binary, lang='chi_sim+eng', config='--psm 6')
+    return parse_codes(text, column)
+
+
+class OcrCache:
+    """按图片内容哈希缓存识别结果，每张图片一个JSON文件，记录各页的股票代码"""
+
+    def __init__(self, cache_dir=CACHE_DIR, column=2, crop=True):
+        self.cache_dir = cache_dir
+        # 识别设置也是键的一部分，改变列号或是否裁剪后重新识别
+        self.settings = f"v{CACHE_VERSION}-col{column}-{'crop' if crop else 'full'}"
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.{self.settings}.json")
+
+    def get(self, digest):
+        """返回{"pages": 页数, "codes": {页号: 代码列表}}，没有缓存时返回None"""
+        if not self.cache_dir or not os.path.exists(self.path(digest)):
+            return None
+        try:
+            with open(self.path(digest), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def put(self, digest, source, pages, codes):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(digest)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"source": source, "pages": pages, "codes": {str(page): page_codes for page, page_codes in codes.items()}},
+                      f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
 
 class StockCodeExtractor:
-    def __init__(self, image_path):
-        self.image_path = image_path
-    
+    def __init__(self, image_path, column=2, crop=True, workers=None, cache_dir=CACHE_DIR):
+        # image_path可以是单个图片、目录或它们的列表
+        inputs = [image_path] if isinstance(image_path, str) else list(image_path)
+        self.image_paths = find_images(inputs)
+        self.column = column
+        self.crop = crop
+        self.workers = workers
+        self.cache = OcrCache(cache_dir, column, crop)
+        self.pages = 0
+        self.cached_pages = 0
+
     def extract_codes(self):
-        """从图片中提取股票代码"""
-        # 读取图片
-        img = cv2.imread(self.image_path)
-        if img is None:
-            print(f"无法读取图片: {self.image_path}")
-            return []
-        
-        # 转换为灰度图
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # 二值化处理
-        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
-        
-        # 使用OCR识别
-        text = pytesseract.image_to_string(binary, lang='chi_sim+eng', config='--psm 6')
-        
-        # 解析文本，提取第二列的股票代码
-        lines = text.strip().split('\n')
+        """从图片中提取股票代码，多张图片中重复的代码只保留第一次出现"""
+        results = {}
+        tasks = []
+        for path in self.image_paths:
+            if not os.path.exists(path):
+                print(f"无法读取图片: {path}")
+                continue
+            digest = file_digest(path)
+            cached = self.cache.get(digest)
+            if cached is not None:
+                pages = cached["pages"]
+                results[path] = (digest, pages, {int(page): codes for page, codes in cached["codes"].items()})
+                self.cached_pages += pages
+            else:
+                pages = page_count(path)
+                results[path] = (digest, pages, {})
+                tasks.extend((path, page) for page in range(pages))
+            self.pages += pages
+
+        if tasks:
+            self.run_tasks(tasks, results)
+        if self.cached_pages:
+            print(f"共{self.pages}页，其中{self.cached_pages}页使用缓存")
+
         stock_codes = []
-        
-        for line in lines:
-            # 分割每行内容，假设使用空格或制表符分隔
-            parts = line.split()
-            if len(parts) >= 2:
-                # 第二列是股票代码
-                code = parts[1]
-                # 只保留数字和字母组成的股票代码
-                if code.isalnum():
-                    stock_codes.append(code)
-        
+        seen = set()
+        for path, (_, pages, codes) in results.items():
+            for page in range(pages):
+                for code in codes.get(page, []):
+                    if code not in seen:
+                        seen.add(code)
+                        stock_codes.append(code)
         return stock_codes
-    
+
+    def run_tasks(self, tasks, results):
+        """识别未缓存的页：多页时在进程池中并行，按完成顺序收集；某页出错不影响其他页，
+        有页面识别失败的图片不写入缓存，下次重新识别"""
+        failed = set()
+        if len(tasks) > 1 and self.workers != 1:
+            # 每个tesseract进程只用一个线程，避免和进程池争抢CPU
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(ocr_page, path, page, self.column, self.crop): (path, page)
+                           for path, page in tasks}
+                for future in as_completed(futures):
+                    self.collect(futures[future], future.result, results, failed)
+        else:
+            for path, page in tasks:
+                self.collect((path, page), lambda: ocr_page(path, page, self.column, self.crop), results, failed)
+
+        for path in dict.fromkeys(path for path, _ in tasks):
+            if path in failed:
+                print(f"{path}有页面识别失败，不写入缓存")
+                continue
+            digest, page_total, codes = results[path]
+            self.cache.put(digest, path, page_total, codes)
+
+    def collect(self, task, result, results, failed):
+        """记录一页的识别结果，result()出错或返回None时记为失败"""
+        path, page = task
+        try:
+            codes = result()
+        except Exception as e:
+            print(f"{path}第{page + 1}页识别失败: {type(e).__name__}: {e}")
+            codes = None
+        if codes is None:
+            failed.add(path)
+        else:
+            results[path][2][page] = codes
+
+    def validate(self, codes, index):
+        """按股票池校验识别结果，返回校验后的代码；股票池为空时原样返回"""
+        if not len(index):
+            print("本地没有股票池数据（需要先运行采集），跳过校验")
+            return codes
+        valid, corrections, rejected = index.validate(codes)
+        for token, code, note in corrections:
+            print(f"  {token} → {code} {index.name(code)}（{note}）")
+        for token, reason in rejected:
+            print(f"  无法识别: {token}（{reason}）")
+        print(f"校验{len(codes)}个识别结果: {len(valid)}只股票，纠正{len(corrections)}个，无法识别{len(rejected)}个")
+        return valid
+
     def save_to_file(self, codes, output_path="stock.txt"):
         """将股票代码保存到文件"""
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -53,7 +306,32 @@ class StockCodeExtractor:
                 f.write(code + '\n')
         print(f"已将{len(codes)}个股票代码保存到{output_path}")
 
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("inputs", nargs="*", default=["stock.jpg"], help="图片、多页TIFF或图片目录，默认stock.jpg")
+    parser.add_argument("--output", default="stock.txt", help="股票代码输出文件")
+    parser.add_argument("--column", type=int, default=2, help="股票代码所在的列（从1开始）")
+    parser.add_argument("--no-crop", action="store_true", help="不裁剪代码列，整页识别")
+    parser.add_argument("--workers", type=int, default=None, help="并行识别的进程数，默认为CPU核数")
+    parser.add_argument("--no-cache", action="store_true", help=f"不使用{CACHE_DIR}中的识别缓存")
+    parser.add_argument("--no-validate", action="store_true", help="不按本地股票池校验，保存原始识别结果")
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    extractor = StockCodeExtractor(args.inputs, args.column, not args.no_crop, args.workers,
+                                   None if args.no_cache else CACHE_DIR)
+    codes = run_with_profile(args.profile, "extract_stock_codes", extractor.extract_codes,
+                             lambda: extractor.pages, args.profile_top)
+    if not args.no_validate:
+        codes = extractor.validate(codes, load_index())
+    extractor.save_to_file(codes, args.output)
+    return bool(codes)
+
+
 if __name__ == "__main__":
-    extractor = StockCodeExtractor("stock.jpg")
-    codes = extractor.extract_codes()
-    extractor.save_to_file(codes)
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
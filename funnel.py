@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两阶段筛选漏斗：在同一进程、同一Baostock会话中完成
+第一阶段：全市场只查2025年分红和一个收盘价（每只股票2次查询），按股息率阈值筛选；
+第二阶段：只对通过的股票查询2020-2025年分红和收盘价（12次查询），
+平均股息率达到阈值的股票再查询利润（6-12次查询）；
+任一阶段被熔断中止时结果不完整，合并到已有结果，第一阶段中止时不改写stocks.id，也不进入第二阶段
+"""
+
+import os
+import logging
+import argparse
+
+from dividend_yield_collector import DividendYieldCollector
+from get_2020_2025_data import YearlyDataCollector
+from extract_high_dividend_stocks import MIN_YIELD, screen_stocks, write_stocks_id
+from baostock_retry import add_retry_arguments, circuit_breaker_from_args, merge_csv_rows
+from progress import setup_logging, add_logging_arguments
+from profiling import add_profile_argument, run_with_profile
+
+logger = logging.getLogger(__name__)
+
+
+class ScreeningFunnel:
+    def __init__(self, min_yield=MIN_YIELD, top=None, min_avg_yield=0.0):
+        # 第一阶段阈值：2025年股息率大于min_yield，最多保留top只
+        self.min_yield = min_yield
+        self.top = top
+        # 第二阶段阈值：2020-2025年平均股息率低于min_avg_yield的股票不查询利润、不写入结果
+        self.min_avg_yield = min_avg_yield
+        self.current = DividendYieldCollector()
+        self.yearly = YearlyDataCollector()
+        # 两个阶段共用一份调用统计
+        self.yearly.metrics = self.current.metrics
+        self.stocks_id_file = "stocks.id"
+        self.phase_calls = {}
+
+    def passes_gate(self, yearly_data):
+        return self.yearly.average_yield(yearly_data) >= self.min_avg_yield
+
+    def screen(self):
+        """第一阶段：全市场股息率，筛选出进入第二阶段的股票；熔断中止时返回None"""
+        if not self.current.get_stock_list():
+            return None
+        self.current.dead_letter.start()
+        results = self.current.calculate_dividend_yield()
+        self.current.refresh_log.save()
+        csv_path = os.path.join(self.current.output_dir, self.current.result_file)
+        if self.current.dead_letter.aborted:
+            # 只处理了部分股票：合并到已有结果，不据此筛选，保留原有的stocks.id
+            if os.path.exists(csv_path):
+                merge_csv_rows(csv_path, results)
+            else:
+                self.current.save_to_csv(results, self.current.result_file)
+            self.current.dead_letter.finish()
+            logger.error(f"第一阶段被熔断中止，未改写{self.stocks_id_file}，不进入第二阶段；"
+                         f"可用dividend_yield_collector.py --retry-failed续采")
+            return None
+        self.current.save_to_csv(results, self.current.result_file)
+        self.current.dead_letter.finish()
+
+        survivors = screen_stocks(results, self.min_yield, self.top)
+        write_stocks_id(survivors, self.stocks_id_file)
+        self.phase_calls["第一阶段"] = self.current.metrics.total_calls()
+        logger.info(f"第一阶段: {len(self.current.stock_list)}只股票中{len(survivors)}只股息率大于{self.min_yield:g}%"
+                    + (f"（最多保留{self.top}只）" if self.top is not None else "")
+                    + f"，已写入{self.stocks_id_file}")
+        return survivors
+
+    def collect(self, survivors):
+        """第二阶段：在同一会话中采集通过筛选的股票的2020-2025年数据"""
+        self.yearly.baostock = self.current.baostock
+        self.yearly.dead_letter.start()
+        gate = self.passes_gate if self.min_avg_yield > 0 else None
+        data = self.yearly.collect_yearly_data(survivors, gate)
+        self.yearly.refresh_log.save()
+        if data:
+            # 熔断中止时未处理的股票保留上次的数据
+            if self.yearly.dead_letter.aborted and os.path.exists(self.yearly.output_csv):
+                merge_csv_rows(self.yearly.output_csv, data)
+            else:
+                self.yearly.save_to_csv(data)
+        self.yearly.dead_letter.finish()
+
+        if self.yearly.gated_out:
+            # 未通过第二阶段的股票从stocks.id中去掉，与报告数据保持一致
+            dropped = set(self.yearly.gated_out)
+            write_stocks_id([stock for stock in survivors if stock not in dropped], self.stocks_id_file)
+            logger.info(f"第二阶段: {len(dropped)}只股票2020-2025年平均股息率低于{self.min_avg_yield:g}%，"
+                        f"未查询利润，已从{self.stocks_id_file}中去掉")
+        self.phase_calls["第二阶段"] = self.current.metrics.total_calls() - self.phase_calls["第一阶段"]
+        return data
+
+    def run(self):
+        try:
+            if not self.current.init_baostock():
+                return False
+            survivors = self.screen()
+            if survivors is None:
+                return False
+            if survivors:
+                self.collect(survivors)
+
+            universe = len(self.current.stock_list)
+            logger.info(f"漏斗完成: 全市场{universe}只 → 第一阶段{len(survivors)}只 → "
+                        f"第二阶段{len(survivors) - len(self.yearly.gated_out)}只；Baostock调用 "
+                        + "，".join(f"{phase}{calls}次" for phase, calls in self.phase_calls.items()))
+            if self.yearly.dead_letter.aborted:
+                logger.error("第二阶段被熔断中止，已采集的结果合并到已有数据，可用get_2020_2025_data.py --retry-failed续采")
+                return False
+            return True
+        finally:
+            if self.current.baostock:
+                self.current.baostock.logout()
+                logger.info("Baostock已退出")
+                self.current.metrics.print_summary()
+                self.current.metrics.export("funnel")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--min-yield", type=float, default=MIN_YIELD,
+                        help="第一阶段阈值：2025年股息率(%%)大于该值的股票进入第二阶段")
+    parser.add_argument("--top", type=int, default=None, help="第一阶段最多保留股息率最高的N只股票")
+    parser.add_argument("--min-avg-yield", type=float, default=0.0,
+                        help="第二阶段阈值：2020-2025年平均股息率(%%)低于该值的股票不查询利润，默认不限制")
+    add_logging_arguments(parser)
+    add_retry_arguments(parser)
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
+    if args.retry_failed:
+        logger.error("漏斗模式不支持--retry-failed，请分别使用dividend_yield_collector.py和get_2020_2025_data.py重试")
+        return False
+
+    funnel = ScreeningFunnel(args.min_yield, args.top, args.min_avg_yield)
+    for collector in (funnel.current, funnel.yearly):
+        collector.progress_interval = args.progress_interval
+        collector.max_retries = args.max_retries
+        collector.retry_backoff = args.retry_backoff
+        collector.call_timeout = args.call_timeout
+        collector.breaker = circuit_breaker_from_args(args)
+    return run_with_profile(args.profile, "funnel", funnel.run, lambda: len(funnel.current.stock_list),
+                            args.profile_top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -5,87 +5,97 @@
 """
 
 import os
-import csv
+import argparse
 
-def generate_complete_html():
-    """生成完整的HTML文件"""
+from report_data import YEARS, load_yearly_data
+from report_charts import sparkline_svgs, heatmap_svg
+from report_manifest import ReportManifest, code_files, rows_hash
+from report_assets import build_report_assets, precompress, remove_precompressed
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+# 生成逻辑或页面模板变化时递增，使已有清单失效
+GENERATOR_VERSION = "3"
+
+# 逐年明细列：(字段, 显示控制分类, 格式, 单元格样式)，年份从近到远
+YEAR_FIELDS = [
+    ("分红", "dividend", "{:.4f}", ""),
+    ("收盘价", "close_price", "{:.2f}", "price "),
+    ("股息率(%)", "dividend_yield", "{:.2f}%", "dividend-yield "),
+    ("利润(亿元)", "profit", "{:.2f}", ""),
+]
+# 迷你图之前的固定列数，逐年明细列的排序序号从这里开始
+FIXED_COLUMNS = 7
+
+DATA_CONTROLS = """        <div class="section" style="background-color: #e3f2fd; border-radius: 5px;">
+            <h2>数据显示控制</h2>
+            <div class="tag-container">
+                <span class="tag" onclick="toggleData('close_price')">收盘价</span>
+                <span class="tag" onclick="toggleData('dividend_yield')">股息率</span>
+                <span class="tag" onclick="toggleData('profit')">利润</span>
+                <span class="tag" onclick="toggleData('dividend')">分红</span>
+            </div>
+        </div>
+        
+"""
+
+
+def year_headers():
+    """逐年明细列的表头"""
+    headers = []
+    for year in reversed(YEARS):
+        for label, data_type, _, _ in YEAR_FIELDS:
+            headers.append(f'                        <th onclick="sortTable({FIXED_COLUMNS + len(headers)})" '
+                           f'class="data-column {data_type}">{year}年{label} <span class="sort-indicator"></span></th>\n')
+    return "".join(headers)
+
+
+def year_cells(stock):
+    """一只股票的逐年明细单元格"""
+    return "".join(f'                        <td class="{style}data-column {data_type}">{fmt.format(stock[f"{year}年{label}"])}</td>\n'
+                   for year in reversed(YEARS) for label, data_type, fmt, style in YEAR_FIELDS)
+
+
+def generate_complete_html(build_assets=False, shard_size=0, force=False, year_columns=False):
+    """生成完整的HTML文件；year_columns为False时只显示股息率趋势迷你图，逐年明细见股票详情页"""
     csv_file = "output/2020_2025_dividend_data.csv"
     output_html = "output/dividend_rankings_2020_2025.html"
+    heatmap_file = "output/dividend_yield_heatmap.svg"
     
-    # 导入math模块用于计算方差
-    import math
-    
-    def calculate_variance(values):
-        """计算样本方差"""
-        if len(values) < 2:
-            return 0.0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
-        return variance
+    # 输入数据、生成器版本和生成选项都未变化时跳过生成
+    manifest = ReportManifest("generate_complete_html", GENERATOR_VERSION)
+    fingerprint = manifest.fingerprint(
+        [csv_file],
+        {"build_assets": build_assets, "shard_size": shard_size, "year_columns": year_columns},
+        code_files(__file__)
+    )
+    if not force and manifest.is_fresh(fingerprint):
+        print(f"输入数据未变化，跳过生成: {output_html}")
+        return True
     
     # 读取CSV文件
-    stock_data = []
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # 转换数值类型
-            try:
-                # 获取最近6年的股息率
-                recent_years = [
-                    float(row["2020年股息率(%)"]),
-                    float(row["2021年股息率(%)"]),
-                    float(row["2022年股息率(%)"]),
-                    float(row["2023年股息率(%)"]),
-                    float(row["2024年股息率(%)"]),
-                    float(row["2025年股息率(%)"])
-                ]
-                
-                # 计算最近6年的方差
-                variance = calculate_variance(recent_years)
-                
-                stock_data.append({
-                    "股票代码": row["股票代码"],
-                    "股票名称": row["股票名称"],
-                    "2020-2025年累计分红": float(row["2020-2025年累计分红"]),
-                    "2020-2025年平均股息率(%)": float(row["2020-2025年平均股息率(%)"]),
-                    "2020-2025年平均利润(亿元)": float(row["2020-2025年平均利润(亿元)"]),
-                    "最近6年股息率方差": variance,
-                    # 按2025年到2020年的顺序
-                    "2025年分红": float(row["2025年分红"]),
-                    "2025年收盘价": float(row["2025年收盘价"]),
-                    "2025年股息率(%)": float(row["2025年股息率(%)"]),
-                    "2025年利润(亿元)": float(row["2025年利润(亿元)"]),
-                    "2024年分红": float(row["2024年分红"]),
-                    "2024年收盘价": float(row["2024年收盘价"]),
-                    "2024年股息率(%)": float(row["2024年股息率(%)"]),
-                    "2024年利润(亿元)": float(row["2024年利润(亿元)"]),
-                    "2023年分红": float(row["2023年分红"]),
-                    "2023年收盘价": float(row["2023年收盘价"]),
-                    "2023年股息率(%)": float(row["2023年股息率(%)"]),
-                    "2023年利润(亿元)": float(row["2023年利润(亿元)"]),
-                    "2022年分红": float(row["2022年分红"]),
-                    "2022年收盘价": float(row["2022年收盘价"]),
-                    "2022年股息率(%)": float(row["2022年股息率(%)"]),
-                    "2022年利润(亿元)": float(row["2022年利润(亿元)"]),
-                    "2021年分红": float(row["2021年分红"]),
-                    "2021年收盘价": float(row["2021年收盘价"]),
-                    "2021年股息率(%)": float(row["2021年股息率(%)"]),
-                    "2021年利润(亿元)": float(row["2021年利润(亿元)"]),
-                    "2020年分红": float(row["2020年分红"]),
-                    "2020年收盘价": float(row["2020年收盘价"]),
-                    "2020年股息率(%)": float(row["2020年股息率(%)"]),
-                    "2020年利润(亿元)": float(row["2020年利润(亿元)"])
-                })
-            except (ValueError, KeyError) as e:
-                continue
+    stock_data = load_yearly_data(csv_file)
     
     print(f"共读取到{len(stock_data)}只股票的数据")
     
     # 按2020-2025年平均股息率降序排序
     stock_data.sort(key=lambda x: x["2020-2025年平均股息率(%)"], reverse=True)
     
-    # 生成HTML内容
-    html_content = """<!DOCTYPE html>
+    # 预先批量生成每行的股息率趋势迷你图，代替逐年数字展示趋势
+    yield_series = [[stock[f"{year}年股息率(%)"] for year in YEARS] for stock in stock_data]
+    for stock, sparkline in zip(stock_data, sparkline_svgs(yield_series)):
+        stock["股息率趋势"] = sparkline
+    
+    # 生成股票×年份的股息率热力图，作为单独的图片文件引用
+    with open(heatmap_file, 'w', encoding='utf-8') as f:
+        f.write(heatmap_svg([stock["股票名称"] for stock in stock_data], YEARS, yield_series, "2020-2025年股息率热力图(%)"))
+    # 热力图同样是报告的输出，预压缩副本随之更新，不构建资源时删除旧副本
+    if build_assets:
+        precompress(heatmap_file)
+    else:
+        remove_precompressed(heatmap_file)
+    
+    # 生成HTML头部
+    html_header = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -274,9 +284,19 @@ def generate_complete_html():
             text-align: center;
         }
         
+        /* 股息率趋势列 */
+        .stock-table th:nth-child(7),
+        .stock-table td:nth-child(7) {
+            width: 100px;
+            min-width: 100px;
+            text-align: center;
+        }
+        
         /* 年份相关列的宽度 */
-        .stock-table th:nth-child(n+6):nth-child(-n+29),
-        .stock-table td:nth-child(n+6):nth-child(-n+29) {
+        .stock-table th:nth-child(6),
+        .stock-table td:nth-child(6),
+        .stock-table th:nth-child(n+8):nth-child(-n+31),
+        .stock-table td:nth-child(n+8):nth-child(-n+31) {
             width: 80px;
             min-width: 80px;
             text-align: right;
@@ -437,6 +457,8 @@ def generate_complete_html():
                 <li>股票代码和名称列固定，方便浏览时参考</li>
                 <li>股息率以百分比形式显示，颜色标识为绿色</li>
                 <li>收盘价以红色显示，方便区分不同数据类型</li>
+                <li>股息率趋势列为2020-2025年股息率迷你折线图，按2020到2025年股息率的变化排序，点击查看该股票的逐年明细</li>
+                <li>热力图汇总全部股票各年股息率</li>
             </ul>
         </div>
         
@@ -462,13 +484,10 @@ def generate_complete_html():
             </div>
         </div>
         
-        <div class="section" style="background-color: #e3f2fd; border-radius: 5px;">
-            <h2>数据显示控制</h2>
-            <div class="tag-container">
-                <span class="tag" onclick="toggleData('close_price')">收盘价</span>
-                <span class="tag" onclick="toggleData('dividend_yield')">股息率</span>
-                <span class="tag" onclick="toggleData('profit')">利润</span>
-                <span class="tag" onclick="toggleData('dividend')">分红</span>
+{data_controls}        <div class="section">
+            <h2>股息率热力图</h2>
+            <div style="max-height: 400px; overflow-y: auto;">
+                <img src="dividend_yield_heatmap.svg" alt="2020-2025年股息率热力图" loading="lazy">
             </div>
         </div>
         
@@ -483,39 +502,20 @@ def generate_complete_html():
                         <th onclick="sortTable(3)">2020-2025年平均股息率(%) <span class="sort-indicator"></span></th>
                         <th onclick="sortTable(4)">2020-2025年平均利润(亿元) <span class="sort-indicator"></span></th>
                         <th onclick="sortTable(5)">最近6年股息率方差 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(6)" class="data-column dividend">2025年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(7)" class="data-column close_price">2025年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(8)" class="data-column dividend_yield">2025年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(9)" class="data-column profit">2025年利润(亿元) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(10)" class="data-column dividend">2024年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(11)" class="data-column close_price">2024年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(12)" class="data-column dividend_yield">2024年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(13)" class="data-column profit">2024年利润(亿元) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(14)" class="data-column dividend">2023年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(15)" class="data-column close_price">2023年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(16)" class="data-column dividend_yield">2023年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(17)" class="data-column profit">2023年利润(亿元) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(18)" class="data-column dividend">2022年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(19)" class="data-column close_price">2022年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(20)" class="data-column dividend_yield">2022年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(21)" class="data-column profit">2022年利润(亿元) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(22)" class="data-column dividend">2021年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(23)" class="data-column close_price">2021年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(24)" class="data-column dividend_yield">2021年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(25)" class="data-column profit">2021年利润(亿元) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(26)" class="data-column dividend">2020年分红 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(27)" class="data-column close_price">2020年收盘价 <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(28)" class="data-column dividend_yield">2020年股息率(%) <span class="sort-indicator"></span></th>
-                        <th onclick="sortTable(29)" class="data-column profit">2020年利润(亿元) <span class="sort-indicator"></span></th>
-
+                        <th onclick="sortTable(6)">股息率趋势 <span class="sort-indicator"></span></th>
+{year_headers}
                     </tr>
                 </thead>
                 <tbody>
 """
     
-    # 添加股票数据行
-    for i, stock in enumerate(stock_data, 1):
-        html_content += f"""
+    # 逐年明细列和对应的显示控制只在year_columns时生成
+    html_header = (html_header.replace("{data_controls}", DATA_CONTROLS if year_columns else "")
+                   .replace("{year_headers}", year_headers() if year_columns else ""))
+    
+    def render_row(i, stock):
+        """生成单只股票的数据行"""
+        return f"""
                     <tr>
                         <td>{i}</td>
                         <td class="stock-info">{stock['股票名称']}</td>
@@ -523,36 +523,13 @@ def generate_complete_html():
                         <td class="dividend-yield"><strong>{stock['2020-2025年平均股息率(%)']:.2f}%</strong></td>
                         <td>{stock['2020-2025年平均利润(亿元)']:.2f}</td>
                         <td>{stock['最近6年股息率方差']:.4f}</td>
-                        <td class="data-column dividend">{stock['2025年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2025年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2025年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2025年利润(亿元)']:.2f}</td>
-                        <td class="data-column dividend">{stock['2024年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2024年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2024年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2024年利润(亿元)']:.2f}</td>
-                        <td class="data-column dividend">{stock['2023年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2023年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2023年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2023年利润(亿元)']:.2f}</td>
-                        <td class="data-column dividend">{stock['2022年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2022年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2022年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2022年利润(亿元)']:.2f}</td>
-                        <td class="data-column dividend">{stock['2021年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2021年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2021年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2021年利润(亿元)']:.2f}</td>
-                        <td class="data-column dividend">{stock['2020年分红']:.4f}</td>
-                        <td class="price data-column close_price">{stock['2020年收盘价']:.2f}</td>
-                        <td class="dividend-yield data-column dividend_yield">{stock['2020年股息率(%)']:.2f}%</td>
-                        <td class="data-column profit">{stock['2020年利润(亿元)']:.2f}</td>
-
+                        <td data-sort="{stock[f'{YEARS[-1]}年股息率(%)'] - stock[f'{YEARS[0]}年股息率(%)']:.2f}"><a href="stocks/{stock['股票代码']}.html" title="查看逐年明细">{stock['股息率趋势']}</a></td>
+{year_cells(stock) if year_columns else ""}
                     </tr>
 """
     
     # 生成HTML尾部，包含排序脚本
-    html_content += """
+    html_footer = """
                 </tbody>
             </table>
         </div>
@@ -595,8 +572,9 @@ def generate_complete_html():
             
             // Sort rows
             rows.sort((a, b) => {
-                const aVal = a.cells[n].textContent;
-                const bVal = b.cells[n].textContent;
+                // 迷你图列按data-sort（2020到2025年股息率的变化）排序
+                const aVal = a.cells[n].dataset.sort ?? a.cells[n].textContent;
+                const bVal = b.cells[n].dataset.sort ?? b.cells[n].textContent;
                 
                 // Handle numeric values (remove % sign if present)
                 const aNum = parseFloat(aVal.replace('%', ''));
@@ -789,12 +767,75 @@ def generate_complete_html():
 </body>
 </html>"""
     
-    # 写入HTML文件
-    with open(output_html, 'w', encoding='utf-8') as f:
-        f.write(html_content.replace("{total_stocks}", str(len(stock_data))))
+    def write_html(path, ranked_rows):
+        """写入包含指定(排名, 数据行)的HTML文件，页头的股票总数为全部股票数"""
+        table_content = "".join(render_row(rank, stock) for rank, stock in ranked_rows)
+        html_content = html_header + table_content + html_footer
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html_content.replace("{total_stocks}", str(len(stock_data))))
+        
+        # 拆分内联CSS/JS为资源文件，并生成预压缩副本；不构建资源时删除旧的预压缩副本
+        if build_assets:
+            build_report_assets(path)
+        else:
+            remove_precompressed(path)
+    
+    if not shard_size:
+        # 写入HTML文件
+        write_html(output_html, list(enumerate(stock_data, 1)))
+        print(f"HTML文件已生成: {output_html}")
+        manifest.save(fingerprint, [output_html, heatmap_file])
+        return True
+    
+    # 分片模式：按排名顺序每shard_size只股票一个HTML文件，分片的哈希只取该分片的数据行、起始排名和股票总数，
+    # 排名不变时一只股票的数据变化只重建它所在的分片；排名变化只影响其新旧位置之间的分片
+    base, ext = os.path.splitext(output_html)
+    shard_rows = {}
+    shard_hashes = {}
+    for index, start in enumerate(range(0, len(stock_data), shard_size)):
+        shard_path = f"{base}_part{index:03d}{ext}"
+        rows = stock_data[start:start + shard_size]
+        shard_rows[shard_path] = list(enumerate(rows, start + 1))
+        shard_hashes[shard_path] = rows_hash({"offset": start, "total": len(stock_data), "rows": rows})
+    
+    changed = manifest.changed_shards(fingerprint, shard_hashes)
+    for shard_path in sorted(changed):
+        write_html(shard_path, shard_rows[shard_path])
     
-    print(f"HTML文件已生成: {output_html}")
+    # 删除分片数减少后遗留的旧分片
+    for shard_path in manifest.previous.get("shards", {}):
+        if shard_path not in shard_hashes and os.path.exists(shard_path):
+            os.remove(shard_path)
+            remove_precompressed(shard_path)
+    
+    print(f"共{len(shard_hashes)}个分片，重建{len(changed)}个，跳过{len(shard_hashes) - len(changed)}个")
+    manifest.save(fingerprint, sorted(shard_hashes) + [heatmap_file], shard_hashes)
     return True
 
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--assets", action="store_true",
+                        help="拆分CSS/JS为带哈希的资源文件，并生成.gz/.br预压缩副本")
+    parser.add_argument("--shard-size", type=int, default=0,
+                        help="分片模式：每个HTML文件包含的股票数，只重建数据有变化的分片")
+    parser.add_argument("--year-columns", action="store_true",
+                        help="同时输出逐年分红、收盘价、股息率和利润列（每只股票24列），默认只显示股息率趋势迷你图")
+    parser.add_argument("--force", action="store_true", help="忽略清单，强制重新生成")
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    return run_with_profile(
+        args.profile, "generate_complete_html",
+        lambda: generate_complete_html(build_assets=args.assets, shard_size=args.shard_size, force=args.force,
+                                       year_columns=args.year_columns),
+        count_rows("output/2020_2025_dividend_data.csv", header=True), args.profile_top
+    )
+
+
 if __name__ == "__main__":
-    generate_complete_html()
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
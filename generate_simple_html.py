@@ -6,13 +6,32 @@
 
 import os
 import csv
+import argparse
 
-def generate_simple_html():
+from report_manifest import ReportManifest, code_files
+from report_assets import build_report_assets, remove_precompressed
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+# 生成逻辑或页面模板变化时递增，使已有清单失效
+GENERATOR_VERSION = "1"
+
+def generate_simple_html(build_assets=False, force=False):
     """生成HTML文件"""
     stocks_id_file = "stocks.id"
     csv_file = "output/all_dividend_yield_2025.csv"
     output_html = "output/dividend_ranker.html"
     
+    # 输入数据、生成器版本和生成选项都未变化时跳过生成
+    manifest = ReportManifest("generate_simple_html", GENERATOR_VERSION)
+    fingerprint = manifest.fingerprint(
+        [stocks_id_file, csv_file],
+        {"build_assets": build_assets},
+        code_files(__file__)
+    )
+    if not force and manifest.is_fresh(fingerprint):
+        print(f"输入数据未变化，跳过生成: {output_html}")
+        return True
+    
     # 读取stocks.id中的股票列表
     selected_stocks = {}  # 股票代码 -> 股票名称
     with open(stocks_id_file, 'r', encoding='utf-8') as f:
@@ -222,7 +241,35 @@ def generate_simple_html():
         f.write(html_content)
     
     print(f"HTML文件已生成: {output_html}")
+    
+    # 拆分内联CSS/JS为资源文件，并生成预压缩副本；不构建资源时删除旧的预压缩副本
+    if build_assets:
+        build_report_assets(output_html)
+    else:
+        remove_precompressed(output_html)
+    
+    manifest.save(fingerprint, [output_html])
     return True
 
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--assets", action="store_true",
+                        help="拆分CSS/JS为带哈希的资源文件，并生成.gz/.br预压缩副本")
+    parser.add_argument("--force", action="store_true", help="忽略清单，强制重新生成")
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    return run_with_profile(
+        args.profile, "generate_simple_html",
+        lambda: generate_simple_html(build_assets=args.assets, force=args.force),
+        count_rows("stocks.id"), args.profile_top
+    )
+
+
 if __name__ == "__main__":
-    generate_simple_html()
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+为stocks.id中的每只股票生成详情页，包含2020-2025年分红、收盘价、股息率和利润的内嵌SVG图表
+数据只加载一次，页面在进程池中并行生成
+"""
+
+import os
+import csv
+import time
+import argparse
+from html import escape
+from concurrent.futures import ProcessPoolExecutor
+
+from report_data import YEARS, load_yearly_data
+from report_charts import bar_chart_svg, line_chart_svg
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+STOCK_PAGE_CSS = """body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+    background-color: #f5f7fa;
+    color: #333;
+    margin: 0;
+    padding: 20px;
+}
+.container { max-width: 1200px; margin: 0 auto; }
+h1 { color: #2c3e50; }
+.summary, .charts { background: white; border-radius: 8px; box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1); padding: 20px; margin-bottom: 20px; }
+.summary td { padding: 4px 16px 4px 0; }
+.charts { display: flex; flex-wrap: wrap; gap: 20px; }
+a { color: #3498db; text-decoration: none; }
+"""
+
+# 工作进程中共享的数据，由进程池初始化函数设置
+_dataset = None
+
+
+def load_dataset(stocks_id_file, yearly_csv, current_csv):
+    """读取股票列表、2020-2025年数据和2025年数据"""
+    stock_list = []
+    with open(stocks_id_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                stock_code, stock_name = line.split(maxsplit=1)
+                stock_list.append((stock_code, stock_name))
+
+    yearly = {stock["股票代码"]: stock for stock in load_yearly_data(yearly_csv)}
+
+    current = {}
+    if os.path.exists(current_csv):
+        with open(current_csv, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                current[row["股票代码"]] = row
+
+    return {"stock_list": stock_list, "yearly": yearly, "current": current}
+
+
+def init_worker(dataset):
+    """进程池初始化：保存共享数据"""
+    global _dataset
+    _dataset = dataset
+
+
+def render_stock_page(code, name, stock, current):
+    """生成单只股票的详情页HTML"""
+    summary_rows = []
+    if current:
+        summary_rows.append(("2025年累计分红", current["2025年累计分红"]))
+        summary_rows.append(("2025-11-28收盘价", current["2025-11-28收盘价"]))
+        summary_rows.append(("2025年股息率(%)", current["股息率(%)"]))
+    if stock:
+        summary_rows.append(("2020-2025年累计分红", f"{stock['2020-2025年累计分红']:.4f}"))
+        summary_rows.append(("2020-2025年平均股息率(%)", f"{stock['2020-2025年平均股息率(%)']:.2f}"))
+        summary_rows.append(("2020-2025年平均利润(亿元)", f"{stock['2020-2025年平均利润(亿元)']:.2f}"))
+        summary_rows.append(("最近6年股息率方差", f"{stock['最近6年股息率方差']:.4f}"))
+
+    summary = "".join(f"<tr><td>{escape(label)}</td><td><strong>{escape(str(value))}</strong></td></tr>"
+                      for label, value in summary_rows)
+
+    if stock:
+        def series(field):
+            return [stock[f"{year}年{field}"] for year in YEARS]
+
+        charts = "".join([
+            bar_chart_svg(YEARS, series("分红"), "每股分红(元)", color="#3498db", digits=3),
+            line_chart_svg(YEARS, series("收盘价"), "年末收盘价(元)", color="#e74c3c"),
+            bar_chart_svg(YEARS, series("股息率(%)"), "股息率(%)", color="#27ae60"),
+            bar_chart_svg(YEARS, series("利润(亿元)"), "净利润(亿元)", color="#8e44ad"),
+        ])
+    else:
+        charts = "<p>暂无2020-2025年数据</p>"
+
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{escape(name)} ({escape(code)}) - 股息率详情</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+    <div class="container">
+        <p><a href="index.html">返回列表</a></p>
+        <h1>{escape(name)} <small>{escape(code)}</small></h1>
+        <div class="summary"><table>{summary}</table></div>
+        <div class="charts">{charts}</div>
+    </div>
+</body>
+</html>"""
+
+
+def write_stock_pages(args):
+    """在工作进程中生成一批详情页，返回生成的页数"""
+    output_dir, stocks = args
+    for code, name in stocks:
+        html_content = render_stock_page(code, name, _dataset["yearly"].get(code), _dataset["current"].get(code))
+        with open(os.path.join(output_dir, f"{code}.html"), 'w', encoding='utf-8') as f:
+            f.write(html_content)
+    return len(stocks)
+
+
+def write_index(output_dir, stock_list):
+    """生成详情页列表和共享样式文件"""
+    links = "".join(f'<li><a href="{escape(code)}.html">{escape(code)} {escape(name)}</a></li>'
+                    for code, name in stock_list)
+    with open(os.path.join(output_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>股票详情列表</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+    <div class="container">
+        <h1>股票详情列表（共{len(stock_list)}只）</h1>
+        <ul>{links}</ul>
+    </div>
+</body>
+</html>""")
+    with open(os.path.join(output_dir, "style.css"), 'w', encoding='utf-8') as f:
+        f.write(STOCK_PAGE_CSS)
+
+
+def generate_stock_pages(stocks_id_file="stocks.id", yearly_csv="output/2020_2025_dividend_data.csv",
+                         current_csv="output/all_dividend_yield_2025.csv", output_dir="output/stocks",
+                         workers=None, batch_size=50):
+    """生成所有股票的详情页"""
+    start_time = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+
+    dataset = load_dataset(stocks_id_file, yearly_csv, current_csv)
+    stock_list = dataset["stock_list"]
+    print(f"共读取到{len(stock_list)}只股票")
+
+    batches = [(output_dir, stock_list[i:i + batch_size]) for i in range(0, len(stock_list), batch_size)]
+
+    if workers == 1:
+        init_worker(dataset)
+        total = sum(map(write_stock_pages, batches))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(dataset,)) as executor:
+            total = sum(executor.map(write_stock_pages, batches))
+
+    write_index(output_dir, stock_list)
+
+    elapsed = time.time() - start_time
+    print(f"已生成{total}个股票详情页到{output_dir}，耗时{elapsed:.2f}秒")
+    return True
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--stocks-file", default="stocks.id", help="股票列表文件")
+    parser.add_argument("--yearly-csv", default="output/2020_2025_dividend_data.csv", help="2020-2025年数据CSV")
+    parser.add_argument("--current-csv", default="output/all_dividend_yield_2025.csv", help="2025年全市场股息率CSV")
+    parser.add_argument("--output-dir", default="output/stocks", help="详情页输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认使用全部CPU核心")
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    return run_with_profile(
+        args.profile, "generate_stock_pages",
+        lambda: generate_stock_pages(args.stocks_file, args.yearly_csv, args.current_csv, args.output_dir, args.workers),
+        count_rows(args.stocks_file), args.profile_top
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
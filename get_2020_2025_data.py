@@ -7,24 +7,65 @@
 import os
 import time
 import random
+import logging
+import argparse
 import csv
-import baostock as bs
+
+from baostock_metrics import BaostockMetrics
+from baostock_retry import (
+    BudgetExhaustedError, resilient_baostock, add_retry_arguments, circuit_breaker_from_args, CircuitBreaker, DeadLetterQueue,
+    record_stock_result, merge_csv_rows,
+)
+from query_planner import (
+    YEARLY_CALLS, CallBudget, QueryPlan, add_budget_arguments, max_calls,
+)
+from stock_scheduler import PriorityScheduler, RefreshLog, Deadline, add_schedule_arguments
+from progress import ProgressReporter, setup_logging, add_logging_arguments
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+logger = logging.getLogger(__name__)
 
 class YearlyDataCollector:
+    # 每只股票处理完后的随机休眠区间（秒），避免API调用过于频繁
+    request_interval = (0.3, 1.0)
+    # 进度汇报间隔（秒）
+    progress_interval = 10.0
+    # 网络或会话错误时的最大重试次数和首次重试前的等待时间（秒）
+    max_retries = 3
+    retry_backoff = 1.0
+    # 单次Baostock调用的时限（秒），超时后关闭连接并重试
+    call_timeout = 30.0
+    
     def __init__(self):
         self.baostock = None
+        self.metrics = BaostockMetrics()
+        self.dead_letter = DeadLetterQueue("get_2020_2025_data")
+        self.breaker = CircuitBreaker()
+        # 调用次数上限，None表示不限制
+        self.budget = None
+        self.call_budget = CallBudget(None, self.metrics, max_calls(YEARLY_CALLS))
+        # 截止时间，None表示不限制；设置了预算或截止时间时按优先级顺序采集
+        self.deadline = None
+        self.run_deadline = Deadline(None)
+        self.refresh_log = RefreshLog("get_2020_2025_data")
+        self.scheduler = None
         self.stocks_id_file = "stocks.id"
         self.output_csv = "output/2020_2025_dividend_data.csv"
         self.years = [2020, 2021, 2022, 2023, 2024, 2025]
+        self.gated_out = []
         
     def init_baostock(self):
         """初始化Baostock API"""
-        login_result = bs.login()
+        import baostock as bs
+        # 包装baostock：调用超时保护，记录每个接口的耗时、错误码和返回行数，失败时重试
+        self.baostock = resilient_baostock(bs, self.metrics, self.max_retries, self.retry_backoff, self.call_timeout)
+        
+        # 登录同样受调用时限保护
+        login_result = self.baostock.login()
         if login_result.error_code != '0':
-            print(f"Baostock登录失败: {login_result.error_msg}")
+            logger.error(f"Baostock登录失败: {login_result.error_msg}")
             return False
-        print("Baostock登录成功")
-        self.baostock = bs
+        logger.info("Baostock登录成功")
         return True
     
     def get_stock_list(self):
@@ -36,11 +77,11 @@ class YearlyDataCollector:
                 if line:
                     stock_code, stock_name = line.split(maxsplit=1)
                     stock_list.append((stock_code, stock_name))
-        print(f"共读取到{len(stock_list)}只股票")
+        logger.info(f"共读取到{len(stock_list)}只股票")
         return stock_list
     
     def get_yearly_dividend(self, code, year):
-        """获取单只股票单年度的分红金额"""
+        """获取单只股票单年度的分红金额，查询失败时抛出BaostockError"""
         total_dividend = 0.0
         
         rs = self.baostock.query_dividend_data(
@@ -49,10 +90,6 @@ class YearlyDataCollector:
             yearType="report"
         )
         
-        if rs.error_code != '0':
-            # print(f"  获取{code} {year}年分红数据失败: {rs.error_msg}")
-            return total_dividend
-        
         while rs.next():
             row = rs.get_row_data()
             if len(row) >= 10:
@@ -67,7 +104,7 @@ class YearlyDataCollector:
         return total_dividend
     
     def get_yearly_close_price(self, code, year):
-        """获取单只股票单年度最后一个交易日的收盘价"""
+        """获取单只股票单年度最后一个交易日的收盘价，没有交易数据时返回None，查询失败时抛出BaostockError"""
         # 构建查询日期范围
         start_date = f"{year}-01-01"
         end_date = f"{year}-12-31"
@@ -81,10 +118,6 @@ class YearlyDataCollector:
             adjustflag="3"  # 3表示不复权
         )
         
-        if rs.error_code != '0':
-            # print(f"  获取{code} {year}年收盘价数据失败: {rs.error_msg}")
-            return None
-        
         close_price = None
         while rs.next():
             row = rs.get_row_data()
@@ -93,127 +126,144 @@ class YearlyDataCollector:
         return close_price
     
     def get_yearly_profit(self, code, year):
-        """获取单只股票单年度的净利润数据"""
+        """获取单只股票单年度的净利润数据，年报和三季报都没有数据时返回0，查询失败时抛出BaostockError"""
         # 使用baostock的query_profit_data方法获取利润表数据
-        try:
-            # 查询利润表数据（使用年报，第四季度）
-            rs = self.baostock.query_profit_data(
-                code=code,
-                year=year,
-                quarter=4
-            )
-            
-            if rs.error_code == '0':
-                while rs.next():
-                    row = rs.get_row_data()
-                    fields = rs.fields
-                    
-                    # 查找netProfit字段的索引
-                    if 'netProfit' in fields:
-                        net_profit_index = fields.index('netProfit')
-                        if net_profit_index < len(row):
-                            net_profit_val = row[net_profit_index]
-                            if net_profit_val and net_profit_val != '' and net_profit_val != '0':
-                                try:
-                                    # netProfit字段值的单位是元，需要转换为亿元
-                                    # 1亿元 = 100,000,000元
-                                    profit = float(net_profit_val) / 100000000
-                                    return round(profit, 4)
-                                except (ValueError, TypeError):
-                                    continue
-            
-            # 如果年报数据获取失败，尝试获取第三季度数据
+        # 优先使用年报（第四季度），没有数据时使用第三季度数据
+        for quarter in (4, 3):
             rs = self.baostock.query_profit_data(
                 code=code,
                 year=year,
-                quarter=3
+                quarter=quarter
             )
             
-            if rs.error_code == '0':
-                while rs.next():
-                    row = rs.get_row_data()
-                    fields = rs.fields
-                    
-                    if 'netProfit' in fields:
-                        net_profit_index = fields.index('netProfit')
-                        if net_profit_index < len(row):
-                            net_profit_val = row[net_profit_index]
-                            if net_profit_val and net_profit_val != '' and net_profit_val != '0':
-                                try:
-                                    # netProfit字段值的单位是元，转换为亿元
-                                    profit = float(net_profit_val) / 100000000
-                                    return round(profit, 4)
-                                except (ValueError, TypeError):
-                                    continue
-        except Exception as e:
-            # 打印详细错误信息以便调试
-            # print(f"  获取{code} {year}年利润数据异常: {e}")
-            pass
+            while rs.next():
+                row = rs.get_row_data()
+                fields = rs.fields
+                
+                # 查找netProfit字段的索引
+                if 'netProfit' in fields:
+                    net_profit_index = fields.index('netProfit')
+                    if net_profit_index < len(row):
+                        net_profit_val = row[net_profit_index]
+                        if net_profit_val and net_profit_val != '' and net_profit_val != '0':
+                            try:
+                                # netProfit字段值的单位是元，需要转换为亿元
+                                # 1亿元 = 100,000,000元
+                                profit = float(net_profit_val) / 100000000
+                                return round(profit, 4)
+                            except (ValueError, TypeError):
+                                continue
         
-        # 如果所有方法都失败，返回默认值0
+        # 年报和三季报都没有数据
         return 0.0
     
-    def collect_yearly_data(self):
-        """收集2020-2025年的数据"""
-        stock_list = self.get_stock_list()
+    def fetch_prices(self, code, name):
+        """获取各年度的分红、收盘价并计算股息率，查询失败时抛出BaostockError"""
+        yearly_data = {
+            "股票代码": code,
+            "股票名称": name
+        }
+        for year in self.years:
+            # 获取分红
+            dividend = self.get_yearly_dividend(code, year)
+            yearly_data[f"{year}年分红"] = round(dividend, 4)
+            
+            # 获取收盘价
+            close_price = self.get_yearly_close_price(code, year)
+            yearly_data[f"{year}年收盘价"] = close_price if close_price is not None else 0.0
+            
+            # 计算股息率
+            if close_price and close_price > 0:
+                dividend_yield = (dividend / close_price) * 100
+                yearly_data[f"{year}年股息率(%)"] = round(dividend_yield, 2)
+            else:
+                yearly_data[f"{year}年股息率(%)"] = 0.0
+        return yearly_data
+    
+    def average_yield(self, yearly_data):
+        """有股息率的年份的平均股息率"""
+        valid_yields = [yearly_data[f"{year}年股息率(%)"] for year in self.years if yearly_data[f"{year}年股息率(%)"] > 0]
+        return sum(valid_yields) / len(valid_yields) if valid_yields else 0.0
+    
+    def collect_yearly_data(self, stock_list=None, gate=None):
+        """收集2020-2025年的数据，stock_list默认读取stocks.id；
+        gate(yearly_data)在取得分红和收盘价后调用，返回False的股票不再查询利润，也不写入结果"""
+        if stock_list is None:
+            stock_list = self.get_stock_list()
         if not stock_list:
             return []
         
         all_data = []
+        self.gated_out = []
+        progress = ProgressReporter(len(stock_list), "2020-2025年数据采集", self.progress_interval, logger)
         
         for i, (code, name) in enumerate(stock_list):
-            print(f"正在处理第{i+1}/{len(stock_list)}只股票: {code} {name}")
-            
-            # 收集每年的数据
-            yearly_data = {
-                "股票代码": code,
-                "股票名称": name
-            }
+            if not self.call_budget.allows():
+                self.call_budget.stop(self.dead_letter, stock_list[i:])
+                break
+            if not self.run_deadline.allows(i):
+                self.run_deadline.stop(self.dead_letter, stock_list[i:])
+                break
+            logger.debug(f"正在处理第{i+1}/{len(stock_list)}只股票: {code} {name}")
             
-            for year in self.years:
-                # 获取分红
-                dividend = self.get_yearly_dividend(code, year)
-                yearly_data[f"{year}年分红"] = round(dividend, 4)
+            try:
+                # 收集每年的分红和收盘价
+                yearly_data = self.fetch_prices(code, name)
+                passed = gate is None or gate(yearly_data)
                 
-                # 获取收盘价
-                close_price = self.get_yearly_close_price(code, year)
-                yearly_data[f"{year}年收盘价"] = close_price if close_price is not None else 0.0
-                
-                # 计算股息率
-                if close_price and close_price > 0:
-                    dividend_yield = (dividend / close_price) * 100
-                    yearly_data[f"{year}年股息率(%)"] = round(dividend_yield, 2)
-                else:
-                    yearly_data[f"{year}年股息率(%)"] = 0.0
-                
-                # 获取利润
-                profit = self.get_yearly_profit(code, year)
-                yearly_data[f"{year}年利润(亿元)"] = round(profit, 4)
-            
-            # 计算2020-2025年累计分红和平均股息率
-            total_dividend = sum(yearly_data[f"{year}年分红"] for year in self.years)
-            valid_yields = [yearly_data[f"{year}年股息率(%)"] for year in self.years if yearly_data[f"{year}年股息率(%)"] > 0]
-            avg_yield = sum(valid_yields) / len(valid_yields) if valid_yields else 0.0
-            
-            # 计算2020-2025年平均利润
-            total_profit = sum(yearly_data[f"{year}年利润(亿元)"] for year in self.years)
-            avg_profit = total_profit / len(self.years)
+                # 获取利润（未通过筛选的股票跳过，节省查询）
+                if passed:
+                    for year in self.years:
+                        profit = self.get_yearly_profit(code, year)
+                        yearly_data[f"{year}年利润(亿元)"] = round(profit, 4)
+            except BudgetExhaustedError as e:
+                # 重试用完了预算：这只股票没有完成，和剩余股票一起记入失败队列
+                self.call_budget.stop(self.dead_letter, stock_list[i:], e)
+                break
+            except Exception as e:
+                # 任一年份查询失败时整只股票不写入结果，记录到失败队列，避免把失败当作0
+                logger.warning(f"处理{code}时出错: {e}")
+                self.dead_letter.add(code, name, e)
+                progress.advance(errors=1)
+                if not record_stock_result(self.breaker, self.dead_letter, False, stock_list[i + 1:]):
+                    break
+                continue
             
-            yearly_data["2020-2025年累计分红"] = round(total_dividend, 4)
-            yearly_data["2020-2025年平均股息率(%)"] = round(avg_yield, 2)
-            yearly_data["2020-2025年平均利润(亿元)"] = round(avg_profit, 4)
-            
-            all_data.append(yearly_data)
+            self.refresh_log.mark(code)
+            if passed:
+                self.summarize(yearly_data)
+                all_data.append(yearly_data)
+            else:
+                logger.debug(f"{code}未通过筛选，不查询利润")
+                self.gated_out.append((code, name))
+            progress.advance()
+            if not record_stock_result(self.breaker, self.dead_letter, True, stock_list[i + 1:]):
+                break
             
             # 随机休眠，避免API调用过于频繁
-            time.sleep(random.uniform(0.3, 1.0))
+            time.sleep(random.uniform(*self.request_interval))
         
+        progress.finish()
         return all_data
     
+    def summarize(self, yearly_data):
+        """计算2020-2025年累计分红、平均股息率和平均利润"""
+        # 计算2020-2025年累计分红和平均股息率
+        total_dividend = sum(yearly_data[f"{year}年分红"] for year in self.years)
+        avg_yield = self.average_yield(yearly_data)
+        
+        # 计算2020-2025年平均利润
+        total_profit = sum(yearly_data[f"{year}年利润(亿元)"] for year in self.years)
+        avg_profit = total_profit / len(self.years)
+        
+        yearly_data["2020-2025年累计分红"] = round(total_dividend, 4)
+        yearly_data["2020-2025年平均股息率(%)"] = round(avg_yield, 2)
+        yearly_data["2020-2025年平均利润(亿元)"] = round(avg_profit, 4)
+    
     def save_to_csv(self, data):
         """保存数据到CSV文件"""
         if not data:
-            print("没有数据可保存")
+            logger.info("没有数据可保存")
             return False
         
         # 构建字段名
@@ -229,30 +279,97 @@ class YearlyDataCollector:
             for row in data:
                 writer.writerow(row)
         
-        print(f"已将{len(data)}只股票的2020-2025年数据保存到: {self.output_csv}")
+        logger.info(f"已将{len(data)}只股票的2020-2025年数据保存到: {self.output_csv}")
         return True
     
-    def run(self):
-        """运行数据收集流程"""
+    def plan_stock_list(self, retry_failed=False):
+        """本次要采集的股票：失败队列或stocks.id，设置了调用预算或截止时间时按优先级排序"""
+        if retry_failed:
+            stock_list = [(entry["code"], entry["name"]) for entry in self.dead_letter.load()]
+        else:
+            stock_list = self.get_stock_list()
+        if self.budget is not None or self.deadline is not None:
+            # 分红方案状态来自2025年股息率采集的记录
+            self.scheduler = PriorityScheduler(self.refresh_log, announcements=RefreshLog("dividend_yield_collector"))
+            stock_list = self.scheduler.order(stock_list)
+        return stock_list
+    
+    def plan(self, retry_failed=False):
+        """不登录Baostock，估计本次的查询计划"""
+        return QueryPlan("get_2020_2025_data", self.plan_stock_list(retry_failed), YEARLY_CALLS,
+                         self.request_interval, budget=self.budget, deadline=self.deadline)
+    
+    def run(self, retry_failed=False):
+        """运行数据收集流程；retry_failed为True时只重新采集失败队列中的股票，结果合并到已有CSV"""
         try:
             if not self.init_baostock():
                 return False
             
+            previous = self.dead_letter.load() if retry_failed else []
+            stock_list = self.plan_stock_list(retry_failed)
+            if retry_failed:
+                logger.info(f"失败队列中共{len(stock_list)}只股票")
+            
             # 收集数据
-            data = self.collect_yearly_data()
+            self.call_budget = CallBudget(self.budget, self.metrics, max_calls(YEARLY_CALLS))
+            self.baostock.budget = self.call_budget
+            self.run_deadline = Deadline(self.deadline)
+            self.dead_letter.start(previous)
+            data = self.collect_yearly_data(stock_list)
+            self.refresh_log.save()
             
-            # 保存到CSV
+            # 保存到CSV；重试、预算用完、到达截止时间或熔断中止时合并到已有结果，未处理的股票保留上次的数据
+            stopped = self.call_budget.exhausted or self.run_deadline.exhausted or self.dead_letter.aborted
             if data:
-                self.save_to_csv(data)
+                if retry_failed or (stopped and os.path.exists(self.output_csv)):
+                    merge_csv_rows(self.output_csv, data)
+                else:
+                    self.save_to_csv(data)
+            self.dead_letter.finish()
             
             return True
             
         finally:
             # 登出Baostock
             if self.baostock:
-                bs.logout()
-                print("Baostock已退出")
+                self.baostock.logout()
+                logger.info("Baostock已退出")
+                # 输出并导出调用统计
+                self.metrics.print_summary()
+                self.metrics.export("get_2020_2025_data")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    add_logging_arguments(parser)
+    add_retry_arguments(parser)
+    add_budget_arguments(parser)
+    add_schedule_arguments(parser)
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
 
-if __name__ == "__main__":
     collector = YearlyDataCollector()
-    collector.run()
+    collector.progress_interval = args.progress_interval
+    collector.max_retries = args.max_retries
+    collector.retry_backoff = args.retry_backoff
+    collector.call_timeout = args.call_timeout
+    collector.breaker = circuit_breaker_from_args(args)
+    collector.budget = args.budget
+    collector.deadline = args.deadline
+    if args.dry_run:
+        plan = collector.plan(args.retry_failed)
+        plan.print()
+        if collector.scheduler:
+            collector.scheduler.print(plan.stocks)
+        return True
+    return run_with_profile(args.profile, "get_2020_2025_data", lambda: collector.run(args.retry_failed), count_rows(collector.stocks_id_file), args.profile_top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线编排：把采集、筛选、年度数据和各报告生成器建模为有向无环图
+每个阶段声明输入和输出文件，依赖关系由“某阶段的输入是另一阶段的输出”自动推导；
+阶段的输入文件、代码和选项都未变化时跳过（指纹记录在output/.manifest/），互不依赖的阶段并发运行；
+从Baostock采集的阶段另有有效时长，超过后即使输入未变化也重新运行
+"""
+
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from report_manifest import ReportManifest, code_files
+from progress import setup_logging, add_logging_arguments
+
+logger = logging.getLogger(__name__)
+
+# 编排逻辑变化时递增，使所有阶段的指纹失效
+PIPELINE_VERSION = "1"
+
+CURRENT_CSV = "output/all_dividend_yield_2025.csv"
+STOCKS_ID = "stocks.id"
+YEARLY_CSV = "output/2020_2025_dividend_data.csv"
+# 采集阶段结果的有效时长（小时）：代码和股票列表不变时Baostock中的行情和分红数据也会更新
+COLLECT_MAX_AGE = 24.0
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def script_files(script):
+    """脚本及其直接或间接导入的全部本地模块，作为阶段的代码输入"""
+    return code_files(os.path.join(CODE_DIR, script))
+
+
+def run_collect():
+    from dividend_yield_collector import DividendYieldCollector
+    return DividendYieldCollector().run()
+
+
+def plan_collect():
+    from dividend_yield_collector import DividendYieldCollector
+    return DividendYieldCollector().plan()
+
+
+def plan_yearly():
+    from get_2020_2025_data import YearlyDataCollector
+    return YearlyDataCollector().plan()
+
+
+def run_screen():
+    from extract_high_dividend_stocks import extract_high_dividend_stocks
+    return extract_high_dividend_stocks()
+
+
+def run_yearly():
+    from get_2020_2025_data import YearlyDataCollector
+    return YearlyDataCollector().run()
+
+
+def run_complete_report():
+    from generate_complete_html import generate_complete_html
+    return generate_complete_html()
+
+
+def run_simple_report():
+    from generate_simple_html import generate_simple_html
+    return generate_simple_html()
+
+
+def run_stock_pages():
+    from generate_stock_pages import generate_stock_pages
+    return generate_stock_pages()
+
+
+class Stage:
+    """流水线中的一个阶段：inputs包括数据文件和决定输出的代码文件（由script_files按导入关系推导）；
+    plan返回Baostock查询计划（QueryPlan），用于--dry-run时估计调用次数和耗时；
+    max_age为结果的有效时长（小时），超过后即使输入未变化也重新运行，None表示不过期"""
+
+    def __init__(self, name, run, inputs, outputs, description="", plan=None, max_age=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.description = description
+        self.plan = plan
+        self.max_age = max_age
+        self.deps = []
+
+
+STAGES = [
+    Stage("collect", run_collect, script_files("dividend_yield_collector.py"), [CURRENT_CSV],
+          "获取2025年全市场股息率", plan_collect, COLLECT_MAX_AGE),
+    Stage("screen", run_screen, [CURRENT_CSV] + script_files("extract_high_dividend_stocks.py"), [STOCKS_ID],
+          "筛选股息率大于3%的股票"),
+    Stage("yearly", run_yearly, [STOCKS_ID] + script_files("get_2020_2025_data.py"), [YEARLY_CSV],
+          "获取2020-2025年数据", plan_yearly, COLLECT_MAX_AGE),
+    Stage("report_complete", run_complete_report, [YEARLY_CSV] + script_files("generate_complete_html.py"),
+          ["output/dividend_rankings_2020_2025.html", "output/dividend_yield_heatmap.svg"],
+          "生成2020-2025年完整报告"),
+    Stage("report_simple", run_simple_report, [STOCKS_ID, CURRENT_CSV] + script_files("generate_simple_html.py"),
+          ["output/dividend_ranker.html"], "生成2025年股息率报告"),
+    Stage("report_pages", run_stock_pages,
+          [STOCKS_ID, YEARLY_CSV, CURRENT_CSV] + script_files("generate_stock_pages.py"),
+          ["output/stocks/index.html"], "生成股票详情页"),
+]
+
+
+class Pipeline:
+    def __init__(self, stages=STAGES, workers=4, force=(), dry_run=False, max_age=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.workers = workers
+        self.force = set(force)
+        self.dry_run = dry_run
+        # 覆盖采集阶段的有效时长（小时）
+        self.max_age = max_age
+        self.status = {}
+        self.elapsed = {}
+        self.resolve_dependencies()
+
+    def resolve_dependencies(self):
+        """由输入输出推导依赖关系，并检查是否有环"""
+        producers = {}
+        for stage in self.stages.values():
+            for path in stage.outputs:
+                if path in producers:
+                    raise ValueError(f"{path}同时由{producers[path]}和{stage.name}生成")
+                producers[path] = stage.name
+        for stage in self.stages.values():
+            stage.deps = sorted({producers[path] for path in stage.inputs if path in producers} - {stage.name})
+
+        visiting, visited = set(), set()
+
+        def visit(name, path):
+            if name in visiting:
+                raise ValueError(f"阶段之间存在循环依赖: {' -> '.join(path + [name])}")
+            if name in visited:
+                return
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+    def select(self, targets, only=False):
+        """返回运行targets所需的全部阶段（包括上游依赖），targets为空时返回全部阶段；
+        only为True时只返回targets本身，上游阶段的输出按现有文件使用"""
+        if not targets:
+            return set(self.stages)
+        unknown = [name for name in targets if name not in self.stages]
+        if unknown:
+            raise ValueError(f"未知阶段: {', '.join(unknown)}，可选: {', '.join(self.stages)}")
+        if only:
+            return set(targets)
+        selected = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.stages[name].deps)
+        return selected
+
+    def manifest(self, stage):
+        return ReportManifest(f"pipeline_{stage.name}", PIPELINE_VERSION)
+
+    def check(self, stage):
+        """计算阶段的输入指纹，并判断是否与上次成功运行时一致、输出都存在且未过期"""
+        manifest = self.manifest(stage)
+        fingerprint = manifest.fingerprint(stage.inputs)
+        return manifest, fingerprint, manifest.is_fresh(fingerprint) and not self.expired(stage, manifest)
+
+    def expired(self, stage, manifest):
+        """上次成功运行距今超过阶段的有效时长；没有记录运行时间的旧清单视为过期"""
+        max_age = stage.max_age if self.max_age is None or stage.max_age is None else self.max_age
+        if max_age is None:
+            return False
+        saved = manifest.previous.get("saved")
+        if not saved:
+            return True
+        return (datetime.now() - datetime.fromisoformat(saved)).total_seconds() >= max_age * 3600
+
+    def run_stage(self, stage):
+        """运行单个阶段（在线程池中执行）"""
+        manifest, fingerprint, fresh = self.check(stage)
+        # 只检查时，上游需要运行则下游的输入也会变化
+        if self.dry_run and any(self.status.get(dep) == "planned" for dep in stage.deps):
+            fresh = False
+        if fresh and stage.name not in self.force:
+            logger.info(f"[{stage.name}] 输入未变化，跳过")
+            return "skipped"
+
+        if self.dry_run:
+            # 查询计划按当前文件估计，上游阶段运行后股票列表可能变化
+            plan = f"，{stage.plan().summary()}" if stage.plan else ""
+            logger.info(f"[{stage.name}] 需要运行: {stage.description}{plan}")
+            return "planned"
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            logger.error(f"[{stage.name}] 缺少输入文件: {', '.join(missing)}")
+            return "failed"
+
+        logger.info(f"[{stage.name}] 开始: {stage.description}")
+        if stage.run() is False:
+            logger.error(f"[{stage.name}] 运行失败")
+            return "failed"
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            logger.error(f"[{stage.name}] 运行后缺少输出文件: {', '.join(missing)}")
+            return "failed"
+
+        manifest.save(fingerprint, stage.outputs)
+        return "ran"
+
+    def run(self, targets=None, only=False):
+        """按依赖顺序运行，依赖都完成的阶段并发执行；失败阶段的下游标记为blocked"""
+        selected = self.select(targets, only)
+        pending = set(selected)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for name in sorted(pending):
+                    deps = [dep for dep in self.stages[name].deps if dep in selected]
+                    if any(self.status.get(dep) in ("failed", "blocked") for dep in deps):
+                        self.status[name] = "blocked"
+                        pending.discard(name)
+                        logger.warning(f"[{name}] 上游阶段失败，不运行")
+                    elif all(dep in self.status for dep in deps):
+                        pending.discard(name)
+                        running[executor.submit(self.timed_run, self.stages[name])] = name
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        self.status[name] = future.result()
+                    except Exception:
+                        logger.exception(f"[{name}] 运行出错")
+                        self.status[name] = "failed"
+
+        self.print_summary(selected)
+        return all(self.status[name] in ("ran", "skipped", "planned") for name in selected)
+
+    def timed_run(self, stage):
+        start = time.time()
+        try:
+            return self.run_stage(stage)
+        finally:
+            self.elapsed[stage.name] = time.time() - start
+
+    def print_summary(self, selected):
+        """打印各阶段的运行结果"""
+        labels = {"ran": "已运行", "skipped": "跳过（未变化）", "planned": "需要运行",
+                  "failed": "失败", "blocked": "未运行（上游失败）"}
+        print("\n流水线运行结果:")
+        for name in self.stages:
+            if name in selected:
+                status = self.status.get(name, "blocked")
+                print(f"  {name:<18}{labels[status]:<14}{self.elapsed.get(name, 0):>8.2f}秒")
+
+    def describe(self):
+        """打印阶段、依赖和当前是否需要运行"""
+        for stage in self.stages.values():
+            manifest, _, fresh = self.check(stage)
+            deps = ", ".join(stage.deps) or "-"
+            state = "未变化" if fresh else "已过期" if manifest.previous and self.expired(stage, manifest) else "需要运行"
+            print(f"{stage.name:<18}依赖: {deps:<28}{state:<8}{stage.description}")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("targets", nargs="*", help="要运行的阶段（会连同上游依赖一起运行），默认运行全部阶段")
+    parser.add_argument("--only", action="store_true", help="只运行指定的阶段，不运行上游依赖")
+    parser.add_argument("--force", default="", help="强制重新运行的阶段，逗号分隔；all表示全部")
+    parser.add_argument("--workers", type=int, default=4, help="并发运行的阶段数")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help=f"采集阶段结果的有效时长（小时），超过后重新采集，默认{COLLECT_MAX_AGE:g}；0表示总是重新采集")
+    parser.add_argument("--dry-run", action="store_true", help="只检查哪些阶段需要运行")
+    parser.add_argument("--list", action="store_true", help="列出阶段、依赖关系和当前状态")
+    add_logging_arguments(parser)
+
+
+def main(args):
+    """按命令行参数运行，返回退出码"""
+    setup_logging(args.log_level, args.log_json)
+
+    force = [name for name in args.force.split(",") if name]
+    if force == ["all"]:
+        force = [stage.name for stage in STAGES]
+    pipeline = Pipeline(STAGES, args.workers, force, args.dry_run, args.max_age)
+    if args.list:
+        pipeline.describe()
+        return 0
+    return 0 if pipeline.run(args.targets, args.only) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    raise SystemExit(main(parser.parse_args()))
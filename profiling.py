@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本性能分析开关
+--profile cpu：cProfile，保存.prof文件和按累计耗时排序的前N项
+--profile mem：tracemalloc，保存内存分配最多的前N行和峰值
+--profile wall：采样式墙钟分析，定时采集主线程调用栈（包括等待网络的时间），保存热点函数和折叠栈
+结果保存在output/profiles/下，文件名带上脚本名、数据规模和时间
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+
+from progress import console
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "output/profiles"
+PROFILE_MODES = ["cpu", "mem", "wall"]
+
+
+def add_profile_argument(parser):
+    """为命令行添加--profile参数"""
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="性能分析：cpu(cProfile)、mem(tracemalloc)、wall(采样式墙钟分析)")
+    parser.add_argument("--profile-top", type=int, default=30, help="性能分析汇总中保留的前N项")
+
+
+def count_rows(path, header=False):
+    """统计输入文件的数据行数，作为数据规模标签"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as f:
+        count = sum(1 for line in f if line.strip())
+    return max(count - 1, 0) if header else count
+
+
+class WallClockSampler:
+    """采样式墙钟分析：后台线程定时采集目标线程的调用栈"""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """折叠栈格式，可直接用flamegraph.pl等工具生成火焰图"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self, top):
+        """按包含时间统计的热点函数"""
+        inclusive = {}
+        for stack, count in self.stacks.items():
+            # 同一调用栈中重复出现的函数（递归）只计一次
+            for func in set(entry.rsplit(":", 1)[0] for entry in stack.split(";")):
+                inclusive[func] = inclusive.get(func, 0) + count
+        lines = [f"采样间隔{self.interval * 1000:.1f}毫秒，共{self.samples}个样本", f"{'占比':>8}{'样本':>8}  函数"]
+        for func, count in sorted(inclusive.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"{count / max(self.samples, 1) * 100:>7.1f}%{count:>8}  {func}")
+        return "\n".join(lines) + "\n"
+
+
+def run_with_profile(mode, name, func, dataset_size=None, top=30, profile_dir=PROFILE_DIR):
+    """按指定模式运行func并保存分析结果；mode为None时直接运行。dataset_size可以是数值或运行后调用的函数"""
+    if not mode:
+        return func()
+
+    # 分析模块只在开启分析时导入，不拖慢普通运行的启动
+    import pstats
+    import cProfile
+    import tracemalloc
+
+    started = time.time()
+    result = None
+    profiler = cProfile.Profile() if mode == "cpu" else None
+    sampler = WallClockSampler() if mode == "wall" else None
+    if mode == "mem":
+        tracemalloc.start(25)
+    try:
+        if profiler:
+            result = profiler.runcall(func)
+        else:
+            if sampler:
+                sampler.start()
+            result = func()
+    finally:
+        elapsed = time.time() - started
+        if sampler:
+            sampler.stop()
+
+        size = dataset_size() if callable(dataset_size) else dataset_size
+        os.makedirs(profile_dir, exist_ok=True)
+        tag = f"{name}-n{size if size is not None else 'na'}-{datetime.now():%Y%m%d-%H%M%S}-{mode}"
+        base = os.path.join(profile_dir, tag)
+        files = []
+
+        if profiler:
+            profiler.dump_stats(base + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(stream.getvalue())
+            files += [base + ".prof", base + ".txt"]
+        elif mode == "mem":
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(f"当前{current / 1024 / 1024:.2f}MB，峰值{peak / 1024 / 1024:.2f}MB\n")
+                for stat in snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
+            files.append(base + ".txt")
+        else:
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(sampler.summary(top))
+            with open(base + ".collapsed", 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+            files += [base + ".txt", base + ".collapsed"]
+
+        with open(base + ".json", 'w', encoding='utf-8') as f:
+            json.dump({"script": name, "mode": mode, "dataset_size": size, "elapsed": round(elapsed, 3),
+                       "argv": sys.argv, "started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+                       "files": files}, f, ensure_ascii=False, indent=2)
+        console(f"性能分析结果已保存: {base}.*", logger)
+    return result
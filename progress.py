@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化日志与进度汇报
+按固定间隔输出处理速度、预计剩余时间、错误数和队列深度，代替逐只股票打印；
+逐只股票的明细使用DEBUG级别，按需开启；支持JSON格式日志，便于日志系统采集
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+
+# 标准LogRecord自带的属性，其余属性视为通过extra传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，extra中的字段原样保留"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level="INFO", json_output=False):
+    """配置根日志：输出到标准输出，可选JSON格式"""
+    handler = logging.StreamHandler(sys.stdout)
+    if json_output:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+
+def json_logging():
+    """根日志是否以JSON格式输出"""
+    return any(isinstance(handler.formatter, JsonFormatter) for handler in logging.getLogger().handlers)
+
+
+def console(message, logger=None):
+    """面向人的输出：JSON日志时作为一条日志输出，使标准输出每行都是JSON；否则直接打印"""
+    if json_logging():
+        (logger or logging.getLogger(__name__)).info(message)
+    else:
+        print(message)
+
+
+def add_logging_arguments(parser):
+    """为命令行添加日志相关参数"""
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="日志级别，DEBUG输出逐只股票的明细")
+    parser.add_argument("--log-json", action="store_true", help="以JSON格式输出日志")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="进度汇报间隔（秒）")
+
+
+def format_duration(seconds):
+    """把秒数格式化为时:分:秒"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    """统计处理进度，每隔interval秒输出一次速度、预计剩余时间、错误数和队列深度"""
+
+    def __init__(self, total, name="处理", interval=10.0, logger=None):
+        self.total = total
+        self.name = name
+        self.interval = interval
+        self.logger = logger or logging.getLogger("progress")
+        self.done = 0
+        self.errors = 0
+        self.queues = {}
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.lock = threading.Lock()
+
+    def advance(self, count=1, errors=0):
+        """记录处理完成的数量和其中出错的数量"""
+        with self.lock:
+            self.done += count
+            self.errors += errors
+            now = time.monotonic()
+            if now - self.last_report < self.interval:
+                return
+            self.last_report = now
+        self.report()
+
+    def set_queue(self, name, depth):
+        """更新队列深度"""
+        with self.lock:
+            self.queues[name] = depth
+
+    def snapshot(self):
+        """返回当前进度数据"""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            remaining = self.total - self.done
+            return {
+                "task": self.name,
+                "done": self.done,
+                "total": self.total,
+                "errors": self.errors,
+                "rate": round(rate, 3),
+                "elapsed": round(elapsed, 1),
+                "eta": round(remaining / rate, 1) if rate > 0 else None,
+                "queues": dict(self.queues, pending=remaining),
+            }
+
+    def report(self, final=False):
+        """输出一条进度日志"""
+        data = self.snapshot()
+        percent = data["done"] / data["total"] * 100 if data["total"] else 100.0
+        eta = format_duration(data["eta"]) if data["eta"] is not None else "--"
+        queues = " ".join(f"{key}={value}" for key, value in data["queues"].items())
+        prefix = "完成" if final else "进度"
+        self.logger.info(
+            f"{self.name}{prefix}: {data['done']}/{data['total']} ({percent:.1f}%) "
+            f"速度{data['rate']:.2f}/秒 已用{format_duration(data['elapsed'])} 剩余{eta} "
+            f"错误{data['errors']} 队列[{queues}]",
+            extra={"progress": data},
+        )
+
+    def finish(self):
+        """输出最终进度"""
+        self.report(final=True)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Baostock调用预算与预估：
+--dry-run在不登录的情况下列出计划的查询次数，按output/metrics/下历史统计的各接口平均耗时
+和采集器的请求间隔估计运行时间；--budget N限制调用次数（包括重试），
+按优先级（见stock_scheduler.py）处理股票，预算不足以再处理一只股票时停止，剩余股票记入失败队列，之后用--retry-failed续采
+"""
+
+import os
+import csv
+import glob
+import json
+import logging
+from datetime import datetime
+
+from baostock_metrics import METRICS_DIR
+from baostock_retry import BudgetExhaustedError
+
+logger = logging.getLogger(__name__)
+
+# 没有历史统计时使用的单次调用耗时（秒）
+DEFAULT_LATENCY = 0.2
+
+# 每只股票的查询：(接口, 最少次数, 最多次数)
+COLLECT_CALLS = [("query_dividend_data", 1, 1), ("query_history_k_data_plus", 1, 1)]
+# 利润先查年报，没有数据时再查三季报，每年1-2次
+YEARLY_CALLS = [("query_dividend_data", 6, 6), ("query_history_k_data_plus", 6, 6), ("query_profit_data", 6, 12)]
+
+
+def max_calls(calls_per_stock):
+    """一只股票最多需要的查询次数"""
+    return sum(most for _, _, most in calls_per_stock)
+
+
+def add_budget_arguments(parser):
+    """为采集脚本添加--dry-run和--budget参数"""
+    parser.add_argument("--dry-run", action="store_true", help="只列出计划的查询次数和预计耗时，不登录Baostock")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="最多调用Baostock的次数（包括重试），按优先级处理股票，剩余股票记入失败队列")
+
+
+def load_history(metrics_dir=METRICS_DIR):
+    """读取历史调用统计，返回{任务: {接口: 汇总}}"""
+    history = {}
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "*.json"))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            continue
+        history[data.get("job", os.path.basename(path)[:-len(".json")])] = data.get("apis", {})
+    return history
+
+
+def api_latencies(history):
+    """各接口在所有历史任务中的平均耗时（按调用次数加权）"""
+    totals = {}
+    for apis in history.values():
+        for api, summary in apis.items():
+            calls, seconds = totals.get(api, (0, 0.0))
+            totals[api] = (calls + summary.get("calls", 0), seconds + summary.get("total_seconds", 0.0))
+    return {api: seconds / calls for api, (calls, seconds) in totals.items() if calls}
+
+
+def profit_fallback_rate(history):
+    """历史上需要查三季报的比例：每个股票年份查1次K线，利润查1-2次"""
+    apis = history.get("get_2020_2025_data", {})
+    k_calls = apis.get("query_history_k_data_plus", {}).get("calls", 0)
+    profit_calls = apis.get("query_profit_data", {}).get("calls", 0)
+    if not k_calls:
+        return 1.0
+    return min(max(profit_calls / k_calls - 1, 0.0), 1.0)
+
+
+def current_yields(path="output/all_dividend_yield_2025.csv"):
+    """上次采集的2025年股息率，{代码: 股息率}"""
+    yields = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    yields[row["股票代码"]] = float(row["股息率(%)"])
+                except (ValueError, KeyError):
+                    continue
+    return yields
+
+
+class CallBudget:
+    """运行时的调用预算：已调用次数加上一只股票最多需要的次数超过上限时停止；
+    重试不计入一只股票最多需要的次数，由重试层在每次调用前用check()保证不超过上限"""
+
+    def __init__(self, limit, metrics, worst_per_stock):
+        self.limit = limit
+        self.metrics = metrics
+        self.worst_per_stock = worst_per_stock
+        self.exhausted = False
+
+    def allows(self):
+        if self.limit is None:
+            return True
+        return self.metrics.total_calls() + self.worst_per_stock <= self.limit
+
+    def check(self):
+        """每次调用前检查，已达到上限时抛出BudgetExhaustedError"""
+        if self.limit is not None and self.metrics.total_calls() >= self.limit:
+            self.exhausted = True
+            raise BudgetExhaustedError(f"已调用{self.metrics.total_calls()}次，达到预算{self.limit}次")
+
+    def stop(self, dead_letter, remaining, error=None):
+        """预算用完：剩余股票（包括处理到一半的股票）记入失败队列"""
+        self.exhausted = True
+        error = error or BudgetExhaustedError(f"已调用{self.metrics.total_calls()}次，预算{self.limit}次不足以再处理一只股票"
+                                              f"（最多{self.worst_per_stock}次）")
+        logger.warning(f"{error}，剩余{len(remaining)}只股票记入失败队列，可用--retry-failed续采")
+        for code, name in remaining:
+            dead_letter.add(code, name, error)
+
+
+class QueryPlan:
+    """一次采集计划的查询次数和预计耗时"""
+
+    def __init__(self, job, stocks, calls_per_stock, request_interval, fixed_calls=(), budget=None, history=None,
+                 deadline=None):
+        self.job = job
+        self.stocks = list(stocks)
+        self.calls_per_stock = calls_per_stock
+        self.request_interval = request_interval
+        self.fixed_calls = list(fixed_calls)
+        self.budget = budget
+        self.deadline = deadline
+        self.history = load_history() if history is None else history
+        self.latencies = api_latencies(self.history)
+        self.fallback = profit_fallback_rate(self.history)
+
+    def worst_per_stock(self):
+        return max_calls(self.calls_per_stock)
+
+    def expected_per_stock(self):
+        """各接口每只股票的预计调用次数，可变部分按历史比例估计"""
+        return {api: least + (most - least) * self.fallback for api, least, most in self.calls_per_stock}
+
+    def selected(self):
+        """预算和截止时间内能处理的股票（按已排好的优先顺序）"""
+        stocks = self.stocks
+        if self.budget is not None:
+            available = self.budget - sum(count for _, count in self.fixed_calls)
+            stocks = stocks[:max(available // self.worst_per_stock(), 0)]
+        if self.deadline is not None:
+            available = (self.deadline - datetime.now()).total_seconds() - sum(
+                count * self.latency(api) for api, count in self.fixed_calls)
+            stocks = stocks[:max(int(available // self.seconds_per_stock()), 0)]
+        return stocks
+
+    def seconds_per_stock(self):
+        """一只股票的预计耗时：查询加上之后的随机休眠"""
+        return (sum(count * self.latency(api) for api, count in self.expected_per_stock().items())
+                + sum(self.request_interval) / 2)
+
+    def calls(self):
+        """{接口: 预计调用次数}"""
+        count = len(self.selected())
+        calls = {api: float(fixed) for api, fixed in self.fixed_calls}
+        for api, per_stock in self.expected_per_stock().items():
+            calls[api] = calls.get(api, 0.0) + per_stock * count
+        return calls
+
+    def latency(self, api):
+        return self.latencies.get(api, DEFAULT_LATENCY)
+
+    def estimate_seconds(self):
+        """查询耗时加上每只股票之后的随机休眠"""
+        query_seconds = sum(count * self.latency(api) for api, count in self.calls().items())
+        return query_seconds + len(self.selected()) * sum(self.request_interval) / 2
+
+    def summary(self):
+        calls = sum(self.calls().values())
+        return f"{len(self.selected())}只股票，预计{calls:.0f}次调用，约{format_seconds(self.estimate_seconds())}"
+
+    def print(self):
+        """打印计划明细"""
+        selected = self.selected()
+        print(f"\n{self.job}调用计划:")
+        limits = []
+        if self.budget is not None:
+            limits.append(f"预算{self.budget}次调用")
+        if self.deadline is not None:
+            limits.append(f"截止{self.deadline:%m-%d %H:%M}")
+        print(f"  股票: {len(self.stocks)}只" + (f"，{'、'.join(limits)}前可处理{len(selected)}只" if limits else ""))
+        print(f"  {'接口':<28}{'预计调用':>10}{'平均耗时(s)':>12}{'预计耗时(s)':>12}")
+        for api, count in self.calls().items():
+            source = "" if api in self.latencies else "  (无历史统计，按默认值)"
+            print(f"  {api:<28}{count:>10.0f}{self.latency(api):>12.3f}{count * self.latency(api):>12.1f}{source}")
+        sleep = len(selected) * sum(self.request_interval) / 2
+        print(f"  {'请求间隔休眠':<24}{'':>10}{sum(self.request_interval) / 2:>12.3f}{sleep:>12.1f}")
+        if any(most != least for _, least, most in self.calls_per_stock):
+            print(f"  可变次数按历史比例{self.fallback:.0%}估计，每只股票最多{self.worst_per_stock()}次")
+        print(f"  合计: {self.summary()}")
+        if selected and len(selected) < len(self.stocks):
+            print(f"  可处理的最后一只: {selected[-1][0]} {selected[-1][1]}")
+
+
+def format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}分钟"
+    return f"{seconds / 3600:.1f}小时"
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML报告静态资源构建
+将报告中的内联CSS/JS抽取为带内容哈希的资源文件，压缩HTML和资源，
+同时为所有输出文件生成.gz和.br预压缩副本；不构建资源时删除旧的预压缩副本，以免服务器返回过期内容
+"""
+
+import os
+import re
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSETS_DIR = "assets"
+PRECOMPRESSED_EXTENSIONS = (".gz", ".br")
+
+STYLE_PATTERN = re.compile(r"<style>(.*?)</style>", re.S)
+SCRIPT_PATTERN = re.compile(r"<script>(.*?)</script>", re.S)
+
+
+def minify_css(css):
+    """压缩CSS：去掉注释和多余空白"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def minify_js(js):
+    """压缩JS：去掉整行注释、缩进和空行，保留换行以免影响自动分号插入"""
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if not line or line.startswith("//"):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def minify_html(html):
+    """压缩HTML：去掉每行缩进和空行（报告中没有<pre>等对空白敏感的标签）"""
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+def content_hash(data):
+    """计算内容哈希，用于资源文件名"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_asset(assets_dir, prefix, ext, content):
+    """写入带内容哈希的资源文件，返回文件路径"""
+    data = content.encode("utf-8")
+    filename = f"{prefix}.{content_hash(data)}.{ext}"
+    path = os.path.join(assets_dir, filename)
+    # 内容相同则文件名相同，已存在时无需重复写入
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return path
+
+
+def precompress(path):
+    """为文件生成.gz和.br预压缩副本，返回各版本的字节数"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    sizes = {"raw": len(data)}
+
+    # mtime固定为0，保证相同内容生成相同的.gz文件
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + ".gz", "wb") as f:
+        f.write(gz_data)
+    sizes["gz"] = len(gz_data)
+
+    if brotli is not None:
+        br_data = brotli.compress(data, quality=11)
+        with open(path + ".br", "wb") as f:
+            f.write(br_data)
+        sizes["br"] = len(br_data)
+    elif os.path.exists(path + ".br"):
+        # 未安装brotli时，之前生成的.br已与文件内容不一致
+        os.remove(path + ".br")
+
+    return sizes
+
+
+def remove_precompressed(path):
+    """删除文件旁边的.gz和.br预压缩副本，文件重新生成但不预压缩时调用"""
+    for ext in PRECOMPRESSED_EXTENSIONS:
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+
+def build_report_assets(html_path, prefix="report"):
+    """将HTML报告的内联CSS/JS拆分为资源文件，并生成预压缩副本"""
+    with open(html_path, "r", encoding="utf-8") as f:
+        html = f.read()
+    original_size = len(html.encode("utf-8"))
+
+    output_dir = os.path.dirname(html_path)
+    assets_dir = os.path.join(output_dir, ASSETS_DIR)
+    os.makedirs(assets_dir, exist_ok=True)
+
+    asset_paths = []
+
+    def replace_style(match):
+        path = write_asset(assets_dir, prefix, "css", minify_css(match.group(1)))
+        asset_paths.append(path)
+        href = os.path.relpath(path, output_dir).replace(os.sep, "/")
+        return f'<link rel="stylesheet" href="{href}">'
+
+    def replace_script(match):
+        path = write_asset(assets_dir, prefix, "js", minify_js(match.group(1)))
+        asset_paths.append(path)
+        src = os.path.relpath(path, output_dir).replace(os.sep, "/")
+        return f'<script src="{src}"></script>'
+
+    html = STYLE_PATTERN.sub(replace_style, html)
+    html = minify_html(SCRIPT_PATTERN.sub(replace_script, html))
+
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    stats = {"original": original_size, "raw": 0, "gz": 0, "br": 0}
+    for path in [html_path] + asset_paths:
+        sizes = precompress(path)
+        stats["raw"] += sizes["raw"]
+        stats["gz"] += sizes["gz"]
+        # 未安装brotli时按gzip大小计算
+        stats["br"] += sizes.get("br", sizes["gz"])
+
+    print_savings(html_path, stats, len(asset_paths))
+    return stats
+
+
+def print_savings(html_path, stats, asset_count):
+    """打印资源拆分与压缩后的字节节省情况"""
+    original = stats["original"]
+
+    def saved(size):
+        return f"{size}字节 (节省{(1 - size / original) * 100:.1f}%)" if original else f"{size}字节"
+
+    print(f"已为{html_path}生成{asset_count}个资源文件")
+    print(f"  原始内联HTML: {original}字节")
+    print(f"  拆分压缩后HTML+资源: {saved(stats['raw'])}")
+    print(f"  gzip预压缩: {saved(stats['gz'])}")
+    if brotli is not None:
+        print(f"  brotli预压缩: {saved(stats['br'])}")
+    else:
+        print("  未安装brotli，跳过.br预压缩")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务端生成的SVG图表，直接内嵌到HTML中，不依赖JS图表库
+"""
+
+from html import escape
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def format_value(value, digits=2):
+    """格式化图表中的数值标签"""
+    return f"{value:.{digits}f}"
+
+
+def bar_chart_svg(labels, values, title, color="#3498db", digits=2, width=360, height=200):
+    """生成柱状图，支持负值（以0为基线）"""
+    pad_left, pad_right, pad_top, pad_bottom = 10, 10, 30, 24
+    plot_w = width - pad_left - pad_right
+    plot_h = height - pad_top - pad_bottom
+
+    top = max(max(values, default=0), 0)
+    bottom = min(min(values, default=0), 0)
+    span = (top - bottom) or 1.0
+    baseline = pad_top + plot_h * top / span
+
+    slot = plot_w / max(len(values), 1)
+    bar_w = slot * 0.6
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" role="img">',
+        f'<title>{escape(title)}</title>',
+        f'<text x="{width / 2:.1f}" y="18" text-anchor="middle" font-size="13" fill="#2c3e50">{escape(title)}</text>',
+        f'<line x1="{pad_left}" y1="{baseline:.1f}" x2="{width - pad_right}" y2="{baseline:.1f}" stroke="#bbb"/>',
+    ]
+    for i, (label, value) in enumerate(zip(labels, values)):
+        x = pad_left + slot * i + (slot - bar_w) / 2
+        bar_h = plot_h * abs(value) / span
+        y = baseline - bar_h if value >= 0 else baseline
+        fill = color if value >= 0 else "#e74c3c"
+        label_y = y - 3 if value >= 0 else y + bar_h + 11
+        parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{bar_w:.1f}" height="{bar_h:.1f}" fill="{fill}"/>')
+        parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{label_y:.1f}" text-anchor="middle" font-size="10" fill="#333">{format_value(value, digits)}</text>')
+        parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{height - 6}" text-anchor="middle" font-size="11" fill="#666">{escape(str(label))}</text>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def line_chart_svg(labels, values, title, color="#e74c3c", digits=2, width=360, height=200):
+    """生成折线图，纵轴范围取数据的最小值到最大值"""
+    pad_left, pad_right, pad_top, pad_bottom = 24, 24, 30, 24
+    plot_w = width - pad_left - pad_right
+    plot_h = height - pad_top - pad_bottom
+
+    low = min(values, default=0)
+    high = max(values, default=0)
+    span = (high - low) or 1.0
+    step = plot_w / max(len(values) - 1, 1)
+
+    points = [
+        (pad_left + step * i, pad_top + plot_h * (high - value) / span)
+        for i, value in enumerate(values)
+    ]
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" role="img">',
+        f'<title>{escape(title)}</title>',
+        f'<text x="{width / 2:.1f}" y="18" text-anchor="middle" font-size="13" fill="#2c3e50">{escape(title)}</text>',
+        '<polyline fill="none" stroke="{}" stroke-width="2" points="{}"/>'.format(
+            color, " ".join(f"{x:.1f},{y:.1f}" for x, y in points)),
+    ]
+    for label, value, (x, y) in zip(labels, values, points):
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{color}"/>')
+        parts.append(f'<text x="{x:.1f}" y="{y - 6:.1f}" text-anchor="middle" font-size="10" fill="#333">{format_value(value, digits)}</text>')
+        parts.append(f'<text x="{x:.1f}" y="{height - 6}" text-anchor="middle" font-size="11" fill="#666">{escape(str(label))}</text>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def sparkline_points(series_list, height, pad):
+    """全部序列的纵坐标：每条序列按自身的最小值到最大值缩放以突出趋势；
+    安装了numpy时所有行一次性按矩阵计算，否则逐行计算，两者结果相同"""
+    top = height - pad
+    if np is not None and len({len(values) for values in series_list}) == 1:
+        matrix = np.asarray(series_list, dtype=float)
+        low = matrix.min(axis=1, keepdims=True)
+        span = matrix.max(axis=1, keepdims=True) - low
+        scale = (height - 2 * pad) / np.where(span == 0, 1.0, span)
+        return (top - (matrix - low) * scale).tolist()
+
+    rows = []
+    for values in series_list:
+        low = min(values)
+        scale = (height - 2 * pad) / ((max(values) - low) or 1.0)
+        rows.append([top - (value - low) * scale for value in values])
+    return rows
+
+
+def sparkline_svgs(series_list, width=90, height=22, color="#27ae60"):
+    """批量生成迷你折线图：横坐标只计算一次，纵坐标由sparkline_points批量计算，每行只做字符串格式化"""
+    if not series_list:
+        return []
+
+    pad = 2
+    length = max(len(values) for values in series_list)
+    step = (width - 2 * pad) / max(length - 1, 1)
+    xs = [f"{pad + step * i:.1f}" for i in range(length)]
+
+    head = f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}"><polyline points="'
+    tail = f'" fill="none" stroke="{color}" stroke-width="1.5"/></svg>'
+
+    return [head + " ".join(f"{x},{y:.1f}" for x, y in zip(xs, ys)) + tail
+            for ys in sparkline_points(series_list, height, pad)]
+
+
+def heatmap_color(value, high):
+    """按数值在0到high之间的位置，从白色渐变到深绿色"""
+    ratio = min(max(value / high, 0.0), 1.0) if high > 0 else 0.0
+    r = round(255 - (255 - 30) * ratio)
+    g = round(255 - (255 - 132) * ratio)
+    b = round(255 - (255 - 73) * ratio)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def heatmap_svg(row_labels, col_labels, matrix, title, cell_w=48, cell_h=14, label_w=90):
+    """生成行×列热力图，颜色上限取全部数值的95分位，避免个别极端值压暗其余格子"""
+    values = sorted(value for row in matrix for value in row)
+    high = values[int(len(values) * 0.95)] if values else 0.0
+
+    header_h = 40
+    width = label_w + cell_w * len(col_labels) + 10
+    height = header_h + cell_h * len(row_labels) + 10
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" font-family="sans-serif">',
+        f'<text x="{width / 2:.1f}" y="16" text-anchor="middle" font-size="13" fill="#2c3e50">{escape(title)}（颜色上限{high:.2f}）</text>',
+    ]
+    for j, label in enumerate(col_labels):
+        parts.append(f'<text x="{label_w + cell_w * j + cell_w / 2:.1f}" y="{header_h - 6}" text-anchor="middle" font-size="11" fill="#666">{escape(str(label))}</text>')
+    for i, (label, row) in enumerate(zip(row_labels, matrix)):
+        y = header_h + cell_h * i
+        parts.append(f'<text x="{label_w - 4}" y="{y + cell_h - 3}" text-anchor="end" font-size="10" fill="#333">{escape(str(label))}</text>')
+        for j, value in enumerate(row):
+            parts.append(f'<rect x="{label_w + cell_w * j}" y="{y}" width="{cell_w - 1}" height="{cell_h - 1}" fill="{heatmap_color(value, high)}"/>')
+    parts.append('</svg>')
+    return "".join(parts)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读取2020-2025年股息率数据，供HTML报告和报告服务使用
+"""
+
+import csv
+
+YEARS = [2020, 2021, 2022, 2023, 2024, 2025]
+
+# 每年的数据字段，顺序与HTML报告中的列顺序一致
+YEARLY_FIELDS = ["分红", "收盘价", "股息率(%)", "利润(亿元)"]
+
+
+def calculate_variance(values):
+    """计算样本方差"""
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+    return variance
+
+
+def load_yearly_data(csv_file):
+    """读取2020-2025年数据CSV，转换数值类型并计算最近6年股息率方差"""
+    stock_data = []
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # 转换数值类型
+            try:
+                # 获取最近6年的股息率
+                recent_years = [float(row[f"{year}年股息率(%)"]) for year in YEARS]
+
+                stock = {
+                    "股票代码": row["股票代码"],
+                    "股票名称": row["股票名称"],
+                    "2020-2025年累计分红": float(row["2020-2025年累计分红"]),
+                    "2020-2025年平均股息率(%)": float(row["2020-2025年平均股息率(%)"]),
+                    "2020-2025年平均利润(亿元)": float(row["2020-2025年平均利润(亿元)"]),
+                    # 计算最近6年的方差
+                    "最近6年股息率方差": calculate_variance(recent_years),
+                }
+                # 按2025年到2020年的顺序
+                for year in reversed(YEARS):
+                    for field in YEARLY_FIELDS:
+                        stock[f"{year}年{field}"] = float(row[f"{year}年{field}"])
+                stock_data.append(stock)
+            except (ValueError, KeyError) as e:
+                continue
+
+    return stock_data
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告生成清单：记录输入文件哈希、生成器代码哈希和生成器版本，
+输入未变化时跳过生成，分片模式下只重建数据有变化的分片
+"""
+
+import os
+import ast
+import json
+import hashlib
+from datetime import datetime
+
+MANIFEST_DIR = "output/.manifest"
+
+
+def file_hash(path):
+    """计算文件内容的sha256哈希，文件不存在时返回None"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_imports(path):
+    """脚本导入的同目录模块（包括函数内的延迟导入）的路径"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    directory = os.path.dirname(path)
+    paths = (os.path.join(directory, f"{name}.py") for name in names)
+    return sorted(path for path in paths if os.path.exists(path))
+
+
+def code_files(generator):
+    """生成器脚本及其直接或间接导入的全部同目录模块的路径，作为清单中的代码输入"""
+    files = {generator}
+    pending = [generator]
+    while pending:
+        for path in local_imports(pending.pop()):
+            if path not in files:
+                files.add(path)
+                pending.append(path)
+    return [generator] + sorted(files - {generator})
+
+
+def rows_hash(rows):
+    """计算一组数据的哈希（可为列表或字典），用于判断分片内容是否变化"""
+    data = json.dumps(rows, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ReportManifest:
+    def __init__(self, name, version, manifest_dir=MANIFEST_DIR):
+        self.name = name
+        self.version = version
+        self.path = os.path.join(manifest_dir, f"{name}.json")
+        self.previous = self.load()
+
+    def load(self):
+        """读取上一次生成时保存的清单"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def fingerprint(self, inputs, options=None, code=()):
+        """根据输入文件、生成器代码、生成器版本和生成选项计算指纹；
+        code中的文件变化时分片模式也全部重建，inputs中的数据文件变化时只重建内容变化的分片"""
+        return {
+            "version": self.version,
+            "inputs": {path: file_hash(path) for path in inputs},
+            "code": {path: file_hash(path) for path in code},
+            "options": options or {},
+        }
+
+    def is_fresh(self, fingerprint):
+        """指纹与上次一致且上次的输出文件都存在时，认为无需重新生成"""
+        outputs = self.previous.get("outputs")
+        if not outputs:
+            return False
+        for key in ("version", "inputs", "code", "options"):
+            if self.previous.get(key) != fingerprint[key]:
+                return False
+        return all(os.path.exists(path) for path in outputs)
+
+    def changed_shards(self, fingerprint, shard_hashes):
+        """返回需要重建的分片名：版本、生成器代码或选项变化时全部重建，否则只重建哈希变化或文件缺失的分片"""
+        previous_shards = self.previous.get("shards", {})
+        if any(self.previous.get(key) != fingerprint[key] for key in ("version", "code", "options")):
+            return set(shard_hashes)
+        return {
+            name for name, digest in shard_hashes.items()
+            if previous_shards.get(name) != digest or not os.path.exists(name)
+        }
+
+    def save(self, fingerprint, outputs, shards=None):
+        """保存本次生成的清单"""
+        manifest = dict(fingerprint)
+        manifest["generator"] = self.name
+        manifest["outputs"] = list(outputs)
+        manifest["saved"] = datetime.now().isoformat(timespec="seconds")
+        if shards is not None:
+            manifest["shards"] = shards
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        self.previous = manifest
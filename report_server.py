@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地报告服务：启动时一次性加载股息率数据，通过JSON接口提供排序、筛选、分页和单只股票查询，
+浏览器只拉取当前查看的一页数据，完全离线运行
+"""
+
+import os
+import csv
+import json
+import hashlib
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from report_data import YEARS, load_yearly_data
+from report_manifest import file_hash
+
+# 接口字段名 -> 数据字段名，与generate_complete_html生成的列一致
+COLUMNS = [
+    ("code", "股票代码"),
+    ("name", "股票名称"),
+    ("total_dividend", "2020-2025年累计分红"),
+    ("avg_yield", "2020-2025年平均股息率(%)"),
+    ("avg_profit", "2020-2025年平均利润(亿元)"),
+    ("variance", "最近6年股息率方差"),
+]
+for _year in reversed(YEARS):
+    COLUMNS.extend([
+        (f"dividend_{_year}", f"{_year}年分红"),
+        (f"close_{_year}", f"{_year}年收盘价"),
+        (f"yield_{_year}", f"{_year}年股息率(%)"),
+        (f"profit_{_year}", f"{_year}年利润(亿元)"),
+    ])
+
+TEXT_COLUMNS = {"code", "name"}
+
+MAX_PAGE_SIZE = 500
+
+
+class ReportDataset:
+    def __init__(self, yearly_csv="output/2020_2025_dividend_data.csv",
+                 current_csv="output/all_dividend_yield_2025.csv"):
+        stock_data = load_yearly_data(yearly_csv)
+
+        # 按列存储，便于排序和筛选
+        self.size = len(stock_data)
+        self.columns = {key: [stock[field] for stock in stock_data] for key, field in COLUMNS}
+        self.code_index = {code: i for i, code in enumerate(self.columns["code"])}
+
+        # 2025年全市场股息率数据，用于单只股票查询
+        self.current = {}
+        if os.path.exists(current_csv):
+            with open(current_csv, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    self.current[row["股票代码"]] = row
+
+        # 数据版本由输入文件哈希决定，用于生成ETag
+        digest = hashlib.sha256()
+        for path in (yearly_csv, current_csv):
+            digest.update(str(file_hash(path)).encode("utf-8"))
+        self.version = digest.hexdigest()[:16]
+
+        self._orders = {}
+        print(f"已加载{self.size}只股票的2020-2025年数据，{len(self.current)}只股票的2025年数据")
+
+    def order(self, key):
+        """返回按指定列升序排列的行号，结果缓存复用"""
+        if key not in self._orders:
+            values = self.columns[key]
+            self._orders[key] = sorted(range(self.size), key=values.__getitem__)
+        return self._orders[key]
+
+    def row(self, i):
+        """返回第i行的全部字段"""
+        return {key: self.columns[key][i] for key, _ in COLUMNS}
+
+    def query(self, sort="avg_yield", descending=True, min_avg_yield=None,
+              min_avg_profit=None, max_variance=None, keyword=None, page=1, page_size=50):
+        """排序、筛选并分页，筛选条件与HTML报告中的筛选一致"""
+        order = self.order(sort)
+        if descending:
+            order = reversed(order)
+
+        avg_yield = self.columns["avg_yield"]
+        avg_profit = self.columns["avg_profit"]
+        variance = self.columns["variance"]
+        codes = self.columns["code"]
+        names = self.columns["name"]
+
+        matched = []
+        for i in order:
+            if min_avg_yield is not None and not avg_yield[i] > min_avg_yield:
+                continue
+            if min_avg_profit is not None and not avg_profit[i] > min_avg_profit:
+                continue
+            if max_variance is not None and not variance[i] < max_variance:
+                continue
+            if keyword and keyword not in codes[i] and keyword not in names[i]:
+                continue
+            matched.append(i)
+
+        start = (page - 1) * page_size
+        rows = []
+        for rank, i in enumerate(matched[start:start + page_size], start + 1):
+            row = self.row(i)
+            row["rank"] = rank
+            rows.append(row)
+
+        return {
+            "total": len(matched),
+            "page": page,
+            "page_size": page_size,
+            "sort": sort,
+            "order": "desc" if descending else "asc",
+            "rows": rows,
+        }
+
+    def stock(self, code):
+        """返回单只股票的2020-2025年数据和2025年数据，不存在时返回None"""
+        i = self.code_index.get(code)
+        current = self.current.get(code)
+        if i is None and current is None:
+            return None
+        return {
+            "code": code,
+            "yearly": self.row(i) if i is not None else None,
+            "current": current,
+        }
+
+
+class QueryError(ValueError):
+    """查询参数错误"""
+
+
+def parse_float(params, name):
+    """读取可选的浮点数参数"""
+    value = params.get(name, [""])[0]
+    if value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"参数{name}不是有效数字: {value}")
+
+
+def parse_int(params, name, default, minimum, maximum):
+    """读取整数参数并限制范围"""
+    value = params.get(name, [""])[0]
+    if value == "":
+        return default
+    try:
+        return max(minimum, min(maximum, int(value)))
+    except ValueError:
+        raise QueryError(f"参数{name}不是有效整数: {value}")
+
+
+def etag_matches(header, etag):
+    """If-None-Match是否命中：可为逗号分隔的多个ETag或*，按弱比较忽略W/前缀"""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    dataset = None
+
+    def do_GET(self):
+        """处理GET请求"""
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+
+        # 数据不变时同一请求的结果不变，先比较ETag，命中时不做查询
+        etag = '"' + hashlib.sha1(f"{self.dataset.version}|{url.path}|{url.query}".encode("utf-8")).hexdigest() + '"'
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            if url.path in ("/", "/index.html"):
+                self.send_body(INDEX_HTML.encode("utf-8"), "text/html; charset=utf-8", etag)
+            elif url.path == "/api/columns":
+                self.send_json({key: field for key, field in COLUMNS}, etag)
+            elif url.path == "/api/stocks":
+                self.send_json(self.query_stocks(params), etag)
+            elif url.path.startswith("/api/stocks/"):
+                stock = self.dataset.stock(url.path[len("/api/stocks/"):])
+                if stock is None:
+                    self.send_error_json(404, "股票不存在")
+                else:
+                    self.send_json(stock, etag)
+            else:
+                self.send_error_json(404, "接口不存在")
+        except QueryError as e:
+            self.send_error_json(400, str(e))
+
+    def query_stocks(self, params):
+        """解析列表查询参数并执行查询"""
+        sort = params.get("sort", ["avg_yield"])[0]
+        if sort not in self.dataset.columns:
+            raise QueryError(f"不支持的排序列: {sort}")
+        order = params.get("order", ["desc"])[0]
+        if order not in ("asc", "desc"):
+            raise QueryError(f"排序方向只能是asc或desc: {order}")
+
+        return self.dataset.query(
+            sort=sort,
+            descending=order == "desc",
+            min_avg_yield=parse_float(params, "min_avg_yield"),
+            min_avg_profit=parse_float(params, "min_avg_profit"),
+            max_variance=parse_float(params, "max_variance"),
+            keyword=params.get("q", [""])[0].strip(),
+            page=parse_int(params, "page", 1, 1, 1 << 30),
+            page_size=parse_int(params, "page_size", 50, 1, MAX_PAGE_SIZE),
+        )
+
+    def send_json(self, data, etag):
+        """发送JSON响应"""
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_body(body, "application/json; charset=utf-8", etag)
+
+    def send_error_json(self, status, message):
+        """发送JSON格式的错误信息"""
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_body(self, body, content_type, etag):
+        """发送带ETag的响应，浏览器每次使用前需重新验证"""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+INDEX_HTML = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>股票股息率排名 (2020-2025)</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f5f7fa; margin: 20px; }
+        table { border-collapse: collapse; background: white; width: 100%; }
+        th, td { padding: 6px 10px; border-bottom: 1px solid #e0e0e0; font-size: 13px; text-align: right; }
+        th { background: #3498db; color: white; cursor: pointer; }
+        .filters { margin-bottom: 10px; }
+        .filters input { width: 80px; }
+    </style>
+</head>
+<body>
+    <h1>股票股息率排名 (2020-2025)</h1>
+    <div class="filters">
+        平均股息率 &gt; <input id="min_avg_yield" type="number" step="0.1">
+        平均利润 &gt; <input id="min_avg_profit" type="number" step="0.1">
+        方差 &lt; <input id="max_variance" type="number" step="0.1">
+        代码/名称 <input id="q">
+        <button onclick="state.page = 1; load()">应用筛选</button>
+        <button onclick="state.page = Math.max(1, state.page - 1); load()">上一页</button>
+        <button onclick="state.page += 1; load()">下一页</button>
+        <span id="info"></span>
+    </div>
+    <table><thead><tr id="head"></tr></thead><tbody id="body"></tbody></table>
+    <script>
+        const columns = [['rank', '排名'], ['name', '股票名称'], ['code', '股票代码'],
+            ['avg_yield', '平均股息率(%)'], ['avg_profit', '平均利润(亿元)'], ['variance', '股息率方差'],
+            ['yield_2025', '2025年股息率(%)'], ['yield_2024', '2024年股息率(%)'], ['yield_2023', '2023年股息率(%)']];
+        const state = {sort: 'avg_yield', order: 'desc', page: 1};
+
+        function sortBy(key) {
+            if (key === 'rank') return;
+            state.order = state.sort === key && state.order === 'desc' ? 'asc' : 'desc';
+            state.sort = key;
+            state.page = 1;
+            load();
+        }
+
+        async function load() {
+            const params = new URLSearchParams({sort: state.sort, order: state.order, page: state.page, page_size: 50});
+            for (const id of ['min_avg_yield', 'min_avg_profit', 'max_variance', 'q']) {
+                const value = document.getElementById(id).value;
+                if (value !== '') params.set(id, value);
+            }
+            const data = await (await fetch('/api/stocks?' + params)).json();
+            document.getElementById('info').textContent = `共${data.total}只股票，第${data.page}页`;
+            // 股票名称等来自CSV，用textContent写入，不作为HTML解析
+            const body = document.getElementById('body');
+            body.replaceChildren(...data.rows.map(row => {
+                const tr = document.createElement('tr');
+                for (const [key] of columns) {
+                    const td = document.createElement('td');
+                    td.textContent = row[key];
+                    tr.appendChild(td);
+                }
+                return tr;
+            }));
+        }
+
+        document.getElementById('head').replaceChildren(...columns.map(([key, label]) => {
+            const th = document.createElement('th');
+            th.textContent = label;
+            th.addEventListener('click', () => sortBy(key));
+            return th;
+        }));
+        load();
+    </script>
+</body>
+</html>"""
+
+
+def serve(host="127.0.0.1", port=8000, yearly_csv="output/2020_2025_dividend_data.csv",
+          current_csv="output/all_dividend_yield_2025.csv"):
+    """加载数据并启动报告服务"""
+    ReportRequestHandler.dataset = ReportDataset(yearly_csv, current_csv)
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    print(f"报告服务已启动: http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("报告服务已停止")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--yearly-csv", default="output/2020_2025_dividend_data.csv", help="2020-2025年数据CSV")
+    parser.add_argument("--current-csv", default="output/all_dividend_yield_2025.csv", help="2025年全市场股息率CSV")
+
+
+def main(args):
+    """按命令行参数运行"""
+    return serve(args.host, args.port, args.yearly_csv, args.current_csv)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集优先级调度：按数据陈旧程度和重要性排序股票，使--budget或--deadline提前结束的运行先刷新最影响决策的股票
+重要性包括2025年股息率排名、股息率是否接近筛选阈值、是否有已公告但尚未除权除息的分红方案；
+每只股票最近一次成功采集的时间记录在output/schedule/<任务>.json
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+from baostock_retry import DeadlineReachedError
+from extract_high_dividend_stocks import MIN_YIELD
+from query_planner import current_yields
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_DIR = "output/schedule"
+
+
+def parse_deadline(value):
+    """解析--deadline：HH:MM[:SS]表示下一个该时刻（已过则为明天），也可以是完整的日期时间"""
+    for clock_format in ("%H:%M", "%H:%M:%S"):
+        try:
+            clock = datetime.strptime(value, clock_format)
+            break
+        except ValueError:
+            continue
+    else:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"截止时间格式应为HH:MM或YYYY-MM-DDTHH:MM: {value}")
+    now = datetime.now()
+    deadline = now.replace(hour=clock.hour, minute=clock.minute, second=clock.second, microsecond=0)
+    return deadline if deadline > now else deadline + timedelta(days=1)
+
+
+def add_schedule_arguments(parser):
+    """为采集脚本添加--deadline参数"""
+    parser.add_argument("--deadline", type=parse_deadline, default=None,
+                        help="截止时间（如08:00），预计来不及再处理一只股票时停止，剩余股票记入失败队列；"
+                             "设置--deadline或--budget时按优先级顺序采集")
+
+
+class RefreshLog:
+    """每只股票最近一次成功采集的时间，以及是否有待实施的分红方案"""
+
+    def __init__(self, job, schedule_dir=SCHEDULE_DIR):
+        self.path = os.path.join(schedule_dir, f"{job}.json")
+        self.entries = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def mark(self, code, pending=None):
+        """记录一只股票采集成功；pending为None时保留原有的分红方案状态"""
+        entry = self.entries.setdefault(code, {})
+        entry["refreshed"] = datetime.now().isoformat(timespec="seconds")
+        if pending is not None:
+            entry["pending"] = pending
+
+    def refreshed(self, code):
+        value = self.entries.get(code, {}).get("refreshed")
+        return datetime.fromisoformat(value) if value else None
+
+    def pending(self, code):
+        return self.entries.get(code, {}).get("pending", False)
+
+    def save(self):
+        """写入同目录下的唯一临时文件后替换，多个进程同时保存同一记录时不会互相截断临时文件"""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class PriorityScheduler:
+    """优先级 = 陈旧程度 × (1 + 重要性)，重要性为排名、接近阈值、待实施分红方案按权重相加，各项在0-1之间；
+    刚刷新过的股票优先级接近0，同样陈旧时越重要越先处理"""
+
+    # 超过该时长（小时）未刷新的股票陈旧程度为1，从未采集过的股票也为1
+    stale_hours = 24.0
+    # 股息率与阈值相差不超过该值(%)时认为接近阈值，越接近分数越高
+    threshold_band = 1.0
+    weights = {"rank": 1.0, "threshold": 1.0, "pending": 0.5}
+
+    def __init__(self, refresh_log, yields=None, threshold=MIN_YIELD, announcements=None, now=None):
+        self.refresh_log = refresh_log
+        self.yields = current_yields() if yields is None else yields
+        self.threshold = threshold
+        # 分红方案状态来自2025年股息率采集的记录
+        self.announcements = announcements or refresh_log
+        self.now = now or datetime.now()
+        ranked = sorted(self.yields, key=lambda code: -self.yields[code])
+        self.ranks = {code: rank for rank, code in enumerate(ranked)}
+
+    def components(self, code):
+        refreshed = self.refresh_log.refreshed(code)
+        if refreshed is None:
+            stale = 1.0
+        else:
+            stale = min(max((self.now - refreshed).total_seconds() / 3600 / self.stale_hours, 0.0), 1.0)
+        scores = {"stale": stale, "rank": 0.0, "threshold": 0.0,
+                  "pending": 1.0 if self.announcements.pending(code) else 0.0}
+        if code in self.yields:
+            scores["rank"] = 1 - self.ranks[code] / len(self.ranks)
+            scores["threshold"] = max(1 - abs(self.yields[code] - self.threshold) / self.threshold_band, 0.0)
+        return scores
+
+    def score(self, code):
+        components = self.components(code)
+        importance = sum(weight * components[name] for name, weight in self.weights.items())
+        return components["stale"] * (1 + importance)
+
+    def order(self, stock_list):
+        """按优先级从高到低排序(代码, 名称)列表，优先级相同时保持原顺序"""
+        return sorted(stock_list, key=lambda stock: -self.score(stock[0]))
+
+    def print(self, stock_list, top=10):
+        """打印优先级最高的top只股票及各项分数"""
+        print(f"\n优先级最高的{min(top, len(stock_list))}只股票:")
+        print(f"  {'代码':<12}{'名称':<10}{'优先级':>8}{'陈旧':>6}{'排名':>6}{'阈值':>6}{'方案':>6}")
+        for code, name in stock_list[:top]:
+            c = self.components(code)
+            print(f"  {code:<12}{name:<10}{self.score(code):>8.2f}{c['stale']:>6.2f}{c['rank']:>6.2f}"
+                  f"{c['threshold']:>6.2f}{c['pending']:>6.0f}")
+
+
+class Deadline:
+    """运行截止时间：按已处理股票的平均耗时判断是否来得及再处理一只"""
+
+    def __init__(self, at):
+        self.at = at
+        self.started = time.time()
+        self.exhausted = False
+
+    def allows(self, processed):
+        if self.at is None:
+            return True
+        now = time.time()
+        per_stock = (now - self.started) / processed if processed else 0.0
+        return now + per_stock <= self.at.timestamp()
+
+    def stop(self, dead_letter, remaining):
+        """到达截止时间：剩余股票记入失败队列"""
+        self.exhausted = True
+        error = DeadlineReachedError(f"截止时间{self.at:%Y-%m-%d %H:%M}前来不及再处理一只股票")
+        logger.warning(f"{error}，剩余{len(remaining)}只股票记入失败队列，可用--retry-failed续采")
+        for code, name in remaining:
+            dead_letter.add(code, name, error)
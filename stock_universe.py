@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+股票池快照与索引：
+query_stock_basic的结果按日期保存为output/universe/universe-YYYY-MM-DD.csv，采集时快照未过期就直接使用，
+重新查询时与上一份快照比较，新上市、退市和改名的股票记录在同名的.diff.json中；
+--changes-only按快照与已有结果的差异只处理新增、退市和改名的股票；
+OCR识别出的股票代码按快照和本地已有的数据校验（不需要联网）：纠正O/0、I/1等常见混淆，补全sh./sz.前缀，
+无法精确匹配时查找编辑距离为1的唯一代码或名称
+"""
+
+import os
+import csv
+import glob
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+UNIVERSE_DIR = "output/universe"
+# 快照超过该时长（小时）视为过期，采集时重新查询
+UNIVERSE_MAX_AGE = 24.0
+# 新快照的上市股票数少于上一份快照的该比例时视为查询结果不完整，不保存
+MIN_SNAPSHOT_RATIO = 0.9
+SNAPSHOT_FIELDS = ["code", "code_name", "ipoDate", "outDate", "type", "status"]
+
+# 按顺序读取，先读到的名称优先
+UNIVERSE_SOURCES = ["output/all_dividend_yield_2025.csv", "output/2020_2025_dividend_data.csv", "stocks.id"]
+
+# OCR常见的字母、数字混淆，只用于代码的6位数字部分
+DIGIT_CONFUSIONS = str.maketrans({
+    "O": "0", "o": "0", "D": "0", "Q": "0",
+    "I": "1", "l": "1", "i": "1", "|": "1", "!": "1",
+    "Z": "2", "z": "2",
+    "S": "5", "s": "5",
+    "G": "6", "b": "6",
+    "T": "7",
+    "B": "8",
+    "g": "9", "q": "9",
+})
+EXCHANGES = ("sh", "sz")
+
+
+def levenshtein(a, b):
+    """编辑距离（插入、删除、替换各计1）"""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class DeletionIndex:
+    """编辑距离为1的近似查找：每个字符串按删掉一个字符后的所有变体建索引，
+    查询时只需查找自身及其删除变体，再用编辑距离确认，建索引和查询都不需要遍历全部字符串"""
+
+    def __init__(self, words=()):
+        self.variants = {}
+        for word in words:
+            self.add(word)
+
+    @staticmethod
+    def deletions(word):
+        return {word[:i] + word[i + 1:] for i in range(len(word))} | {word}
+
+    def add(self, word):
+        for variant in self.deletions(word):
+            self.variants.setdefault(variant, set()).add(word)
+
+    def search(self, word):
+        """返回编辑距离为1的字符串（不含word本身），按字符串排序"""
+        candidates = set()
+        for variant in self.deletions(word):
+            candidates |= self.variants.get(variant, set())
+        return sorted(candidate for candidate in candidates
+                      if candidate != word and levenshtein(word, candidate) == 1)
+
+
+def split_code(token):
+    """把sh.600000、SH600000、600000.SH、600000等写法拆成(交易所或None, 6位代码部分)"""
+    token = token.strip().replace(" ", "")
+    lower = token.lower()
+    for exchange in EXCHANGES:
+        if lower.startswith(exchange) and len(token) > 6:
+            return exchange, token[len(exchange):].lstrip(".")
+        if lower.endswith(exchange) and len(token) > 6:
+            return exchange, token[:-len(exchange)].rstrip(".")
+    return None, token
+
+
+def add_universe_arguments(parser):
+    """为采集脚本添加股票池快照参数"""
+    parser.add_argument("--universe-max-age", type=float, default=UNIVERSE_MAX_AGE,
+                        help=f"股票池快照（{UNIVERSE_DIR}/）未超过该时长（小时）时直接使用，不再查询query_stock_basic")
+    parser.add_argument("--refresh-universe", action="store_true", help="忽略已有快照，重新查询股票池")
+    parser.add_argument("--changes-only", action="store_true",
+                        help="只采集股票池中有、已有结果中没有的股票（新上市或之前未采集成功），"
+                             "并从已有结果中去掉已不在股票池中的股票、更新改名的股票")
+
+
+class SnapshotError(Exception):
+    """查询到的股票池为空或比上一份快照少得不合理，不能作为快照保存"""
+
+
+class UniverseSnapshot:
+    """某一天的股票池：query_stock_basic返回的全部行（含指数、退市股票），按代码索引"""
+
+    def __init__(self, rows, path=None, taken=None):
+        # 代码 -> {code, code_name, ipoDate, outDate, type, status}，保持查询返回的顺序
+        self.stocks = {row["code"]: row for row in rows}
+        self.path = path
+        self.taken = taken or time.time()
+
+    @classmethod
+    def from_result(cls, rs):
+        """由query_stock_basic的结果建立快照"""
+        rows = []
+        while rs.next():
+            rows.append(dict(zip(SNAPSHOT_FIELDS, rs.get_row_data())))
+        return cls(rows)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(list(csv.DictReader(f)), path, os.path.getmtime(path))
+
+    def save(self, universe_dir=UNIVERSE_DIR):
+        """保存为当天的快照，同一天多次查询时覆盖"""
+        os.makedirs(universe_dir, exist_ok=True)
+        self.path = os.path.join(universe_dir, f"universe-{datetime.fromtimestamp(self.taken):%Y-%m-%d}.csv")
+        with open(self.path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SNAPSHOT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.stocks.values())
+        os.replace(self.path + ".tmp", self.path)
+        return self.path
+
+    def age_hours(self):
+        return (time.time() - self.taken) / 3600
+
+    def info(self, code):
+        """代码对应的名称、类型、状态和上市日期，没有时返回None"""
+        return self.stocks.get(code)
+
+    def is_listed(self, code):
+        """沪深股市的上市股票（类型为1，状态为1）"""
+        row = self.stocks.get(code)
+        return (row is not None and code.startswith(('sh.', 'sz.'))
+                and row["type"] == '1' and row["status"] == '1')
+
+    def listed(self):
+        """上市股票的(代码, 名称)列表"""
+        return [(code, row["code_name"]) for code, row in self.stocks.items() if self.is_listed(code)]
+
+
+def snapshot_paths(universe_dir=UNIVERSE_DIR):
+    """按日期排序的快照文件"""
+    return sorted(glob.glob(os.path.join(universe_dir, "universe-*.csv")))
+
+
+def latest_snapshot(universe_dir=UNIVERSE_DIR):
+    paths = snapshot_paths(universe_dir)
+    return UniverseSnapshot.load(paths[-1]) if paths else None
+
+
+class UniverseDiff:
+    """两份快照之间上市股票的变化"""
+
+    def __init__(self, old, new):
+        self.old_path = old.path
+        self.new_path = new.path
+        self.listed = [(code, name) for code, name in new.listed() if not old.is_listed(code)]
+        self.delisted = [(code, old.info(code)["code_name"]) for code, _ in old.listed() if not new.is_listed(code)]
+        self.renamed = [(code, old.info(code)["code_name"], name) for code, name in new.listed()
+                        if old.is_listed(code) and old.info(code)["code_name"] != name]
+
+    def __bool__(self):
+        return bool(self.listed or self.delisted or self.renamed)
+
+    def summary(self):
+        return f"新上市{len(self.listed)}只，退市{len(self.delisted)}只，改名{len(self.renamed)}只"
+
+    def save(self):
+        """保存在新快照旁边，如universe-2025-11-28.diff.json"""
+        path = os.path.splitext(self.new_path)[0] + ".diff.json"
+        data = {"from": os.path.basename(self.old_path or ""), "to": os.path.basename(self.new_path),
+                "listed": self.listed, "delisted": self.delisted, "renamed": self.renamed}
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+        return path
+
+
+def latest_diff(universe_dir=UNIVERSE_DIR):
+    """最新一份快照对应的变化，没有时返回None"""
+    paths = snapshot_paths(universe_dir)
+    if not paths:
+        return None
+    path = os.path.splitext(paths[-1])[0] + ".diff.json"
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fetch_snapshot(baostock, universe_dir=UNIVERSE_DIR):
+    """查询股票池并保存为快照；与上一份快照比较，返回(快照, 变化)，没有上一份快照时变化为None。
+    查询结果中没有上市股票，或上市股票数少于上一份快照的MIN_SNAPSHOT_RATIO时抛出SnapshotError，不保存快照，
+    以免把不完整的结果当作大批股票退市"""
+    previous = latest_snapshot(universe_dir)
+    snapshot = UniverseSnapshot.from_result(baostock.query_stock_basic())
+    count = len(snapshot.listed())
+    if count == 0:
+        raise SnapshotError("查询到的股票池中没有上市股票")
+    if previous is not None:
+        previous_count = len(previous.listed())
+        if count < previous_count * MIN_SNAPSHOT_RATIO:
+            raise SnapshotError(f"查询到{count}只上市股票，比{os.path.basename(previous.path)}的"
+                                f"{previous_count}只少得不合理")
+    snapshot.save(universe_dir)
+    diff = None
+    if previous is not None:
+        diff = UniverseDiff(previous, snapshot)
+        diff.save()
+        logger.info(f"股票池与{os.path.basename(previous.path)}相比: {diff.summary()}")
+    return snapshot, diff
+
+
+def load_universe(sources=UNIVERSE_SOURCES, universe_dir=UNIVERSE_DIR):
+    """从最新的股票池快照和本地文件读取{代码: 名称}，只保留sh./sz.代码"""
+    stocks = {}
+    snapshot = latest_snapshot(universe_dir)
+    if snapshot is not None:
+        stocks.update(snapshot.listed())
+    for path in sources:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith(".csv"):
+                rows = ((row.get("股票代码", ""), row.get("股票名称", "")) for row in csv.DictReader(f))
+            else:
+                rows = (tuple(line.split(None, 1)) + ("",) for line in f if line.strip())
+            for code, name, *_ in rows:
+                if code.startswith(("sh.", "sz.")):
+                    stocks.setdefault(code, name.strip())
+    return stocks
+
+
+class UniverseIndex:
+    """股票池的内存索引：精确查找代码和名称，删除变体索引查找编辑距离为1的代码和名称"""
+
+    def __init__(self, stocks):
+        self.stocks = dict(stocks)
+        # 6位代码 -> 带前缀的代码；沪深代码不重复，重复时保留全部供前缀区分
+        self.by_digits = {}
+        for code in self.stocks:
+            self.by_digits.setdefault(code[3:], []).append(code)
+        self.by_name = {}
+        for code, name in self.stocks.items():
+            if name:
+                self.by_name.setdefault(name, code)
+        self.digit_index = DeletionIndex(self.by_digits)
+        self.name_index = DeletionIndex(self.by_name)
+
+    def __len__(self):
+        return len(self.stocks)
+
+    def __contains__(self, code):
+        return code in self.stocks
+
+    def name(self, code):
+        return self.stocks.get(code, "")
+
+    def pick(self, codes, exchange):
+        """同一6位代码对应多个交易所时按识别出的前缀选择，无法区分时返回None"""
+        if len(codes) == 1:
+            return codes[0]
+        matched = [code for code in codes if code.startswith(f"{exchange}.")]
+        return matched[0] if len(matched) == 1 else None
+
+    def resolve(self, token):
+        """校验一个识别结果，返回(代码, 说明)；无法确定时代码为None，说明给出原因"""
+        exchange, digits = split_code(token)
+        if digits in self.by_digits:
+            code = self.pick(self.by_digits[digits], exchange)
+            if code:
+                return code, "" if code == token else "补全前缀"
+
+        fixed = digits.translate(DIGIT_CONFUSIONS)
+        if fixed.isdigit() and fixed in self.by_digits:
+            code = self.pick(self.by_digits[fixed], exchange)
+            if code:
+                return code, f"纠正混淆字符{digits}→{fixed}"
+
+        if token in self.by_name:
+            return self.by_name[token], "按名称匹配"
+
+        if fixed.isdigit():
+            if abs(len(fixed) - 6) > 1:
+                return None, "不是6位代码"
+            matches = self.digit_index.search(fixed)
+            if len(matches) == 1:
+                code = self.pick(self.by_digits[matches[0]], exchange)
+                if code:
+                    return code, f"按编辑距离纠正{fixed}→{matches[0]}"
+            if len(matches) > 1:
+                return None, f"有{len(matches)}个相近的代码: {', '.join(matches[:5])}"
+            return None, "股票池中没有该代码"
+
+        if len(token) >= 3 and not token.isascii():
+            matches = self.name_index.search(token)
+            if len(matches) == 1:
+                return self.by_name[matches[0]], f"按相近名称{matches[0]}匹配"
+            if len(matches) > 1:
+                return None, f"有{len(matches)}个相近的名称: {', '.join(matches[:5])}"
+        return None, "无法识别为股票代码或名称"
+
+    def validate(self, tokens):
+        """校验一组识别结果，返回(代码列表, 纠正列表[(原文, 代码, 说明)], 无法识别列表[(原文, 原因)])，代码去重"""
+        codes, corrections, rejected = [], [], []
+        seen = set()
+        for token in tokens:
+            code, note = self.resolve(token)
+            if code is None:
+                rejected.append((token, note))
+                continue
+            if note:
+                corrections.append((token, code, note))
+            if code not in seen:
+                seen.add(code)
+                codes.append(code)
+        return codes, corrections, rejected
+
+
+def load_index(sources=UNIVERSE_SOURCES, universe_dir=UNIVERSE_DIR):
+    """读取本地股票池并建立索引"""
+    return UniverseIndex(load_universe(sources, universe_dir))
+
+
+def print_diff(diff, limit=20):
+    print(f"{diff['from']} → {diff['to']}: 新上市{len(diff['listed'])}只，退市{len(diff['delisted'])}只，"
+          f"改名{len(diff['renamed'])}只")
+    for title, rows in (("新上市", diff["listed"]), ("退市", diff["delisted"]), ("改名", diff["renamed"])):
+        for row in rows[:limit]:
+            print(f"  {title}: {' '.join(row)}")
+        if len(rows) > limit:
+            print(f"  {title}: ……另有{len(rows) - limit}只")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("snapshots", nargs="*", help="比较两份快照（旧 新），默认显示最新快照及其变化")
+    parser.add_argument("--universe-dir", default=UNIVERSE_DIR, help="快照目录")
+
+
+def main(args):
+    """显示股票池快照或比较两份快照"""
+    if len(args.snapshots) == 2:
+        diff = UniverseDiff(*(UniverseSnapshot.load(path) for path in args.snapshots))
+        print_diff({"from": os.path.basename(diff.old_path), "to": os.path.basename(diff.new_path),
+                    "listed": diff.listed, "delisted": diff.delisted, "renamed": diff.renamed})
+        return True
+    if args.snapshots:
+        print("需要指定两份快照：旧 新")
+        return False
+
+    paths = snapshot_paths(args.universe_dir)
+    if not paths:
+        print(f"{args.universe_dir}中还没有股票池快照，运行dividend_yield_collector.py后生成")
+        return False
+    snapshot = UniverseSnapshot.load(paths[-1])
+    print(f"共{len(paths)}份快照，最新: {paths[-1]}（{snapshot.age_hours():.1f}小时前），"
+          f"{len(snapshot.stocks)}条记录，其中上市股票{len(snapshot.listed())}只")
+    diff = latest_diff(args.universe_dir)
+    if diff:
+        print_diff(diff)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
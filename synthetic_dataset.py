@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成合成市场数据，用于大规模测试
+输出与真实数据完全相同格式的all_dividend_yield_2025.csv、2020_2025_dividend_data.csv和stocks.id，
+以及对应的Baostock回放数据，回放运行采集脚本可以得到相同的CSV
+分布参数按2025年5170只股票的真实数据估计；逐只股票流式生成，10万只股票×20年也只占用少量内存
+"""
+
+import os
+import csv
+import json
+import math
+import time
+import random
+import argparse
+
+from baostock_replay import (
+    stock_basic_record, dividend_record, close_record, yearly_close_record, profit_record,
+)
+
+CURRENT_YEAR = 2025
+CURRENT_DATE = "2025-11-28"
+
+# 板块：(交易所前缀, 代码起始值, 占比)
+BOARDS = [("sh.", 600000, 0.33), ("sz.", 0, 0.29), ("sz.", 300000, 0.27), ("sh.", 688000, 0.11)]
+
+NAME_PREFIXES = [
+    "华能", "中国", "上海", "深圳", "北京", "浙江", "江苏", "广东", "山东", "四川", "湖南", "福建",
+    "长江", "黄河", "东方", "南方", "西部", "北方", "中原", "海南", "天津", "重庆", "安徽", "河北",
+    "新华", "国泰", "华夏", "招商", "平安", "金地", "万科", "恒生", "宏达", "瑞丰", "永安", "泰山",
+]
+NAME_SUFFIXES = [
+    "银行", "证券", "保险", "电力", "能源", "煤业", "钢铁", "有色", "化工", "建材", "建设", "地产",
+    "高速", "港口", "机场", "航空", "汽车", "电子", "科技", "软件", "通信", "医药", "生物", "食品",
+    "酒业", "农业", "传媒", "环保", "燃气", "水务", "股份", "控股", "实业", "集团",
+]
+
+# 有分红的股票占比
+PAYER_RATIO = 0.75
+# 有分红股票中某一年不分红的概率
+SKIP_DIVIDEND_RATIO = 0.1
+# 一年内分两次派息的概率
+INTERIM_RATIO = 0.3
+# 各项指标的对数 = 股票自身水平 + 逐年均值回归的波动，年数再多分布也保持稳定
+# 年度波动的自相关系数
+MEAN_REVERSION = 0.8
+# 收盘价（对数均值2.78，标准差0.92）
+LOG_CLOSE_MEAN, CLOSE_STOCK_SD, CLOSE_YEAR_SD = 2.78, 0.77, 0.3
+# 股息率(%)（对数均值-0.10，标准差1.08，相邻年份相关系数约0.5），上限与真实数据接近
+LOG_YIELD_MEAN, YIELD_STOCK_SD, YIELD_YEAR_SD = -0.10, 0.9, 0.35
+MAX_YIELD = 15.0
+# 净利润(亿元)（对数均值2.46，标准差1.69）和亏损概率
+LOG_PROFIT_MEAN, PROFIT_STOCK_SD, PROFIT_YEAR_SD = 2.46, 1.65, 0.25
+LOSS_RATIO = 0.02
+# 首个年份之前已上市的股票占比，其余在年份范围内上市
+LISTED_RATIO = 0.8
+# 某年收盘价缺失（停牌等）的概率
+MISSING_CLOSE_RATIO = 0.0005
+
+
+def yearly_csv_name(years):
+    """年度数据文件名，默认年份范围为2020_2025_dividend_data.csv"""
+    return f"{years[0]}_{years[-1]}_dividend_data.csv"
+
+
+class SyntheticMarket:
+    """按固定种子逐只生成股票数据，相同参数得到相同结果"""
+
+    def __init__(self, stocks=5170, years=6, seed=0):
+        self.stocks = stocks
+        self.years = list(range(CURRENT_YEAR - years + 1, CURRENT_YEAR + 1))
+        self.seed = seed
+
+    def codes(self):
+        """按板块占比分配股票代码，每个板块内连续编号"""
+        rng = random.Random(f"{self.seed}:codes")
+        counters = [0] * len(BOARDS)
+        weights = [ratio for _, _, ratio in BOARDS]
+        for _ in range(self.stocks):
+            board = rng.choices(range(len(BOARDS)), weights)[0]
+            prefix, start, _ = BOARDS[board]
+            yield f"{prefix}{start + counters[board]:06d}"
+            counters[board] += 1
+
+    def stock(self, index, code):
+        """生成单只股票各年度的分红、收盘价和利润"""
+        rng = random.Random(f"{self.seed}:{index}")
+        name = rng.choice(NAME_PREFIXES) + rng.choice(NAME_SUFFIXES)
+        if rng.random() < LISTED_RATIO:
+            ipo_year = self.years[0] - rng.randint(1, 20)
+        else:
+            ipo_year = rng.choice(self.years)
+
+        payer = rng.random() < PAYER_RATIO
+        levels = [rng.gauss(LOG_CLOSE_MEAN, CLOSE_STOCK_SD), rng.gauss(LOG_YIELD_MEAN, YIELD_STOCK_SD),
+                  rng.gauss(LOG_PROFIT_MEAN, PROFIT_STOCK_SD)]
+        year_sds = [CLOSE_YEAR_SD, YIELD_YEAR_SD, PROFIT_YEAR_SD]
+        # 从平稳分布开始，使首年与后续年份的分布一致
+        noises = [rng.gauss(0, sd / math.sqrt(1 - MEAN_REVERSION ** 2)) for sd in year_sds]
+
+        yearly = {}
+        for year in self.years:
+            noises = [MEAN_REVERSION * noise + rng.gauss(0, sd) for noise, sd in zip(noises, year_sds)]
+            log_close, log_yield, log_profit = (level + noise for level, noise in zip(levels, noises))
+            if year < ipo_year:
+                yearly[year] = ([], None, 0.0)
+                continue
+
+            close = round(math.exp(log_close), 2) or 0.01
+            if rng.random() < MISSING_CLOSE_RATIO:
+                close = None
+
+            amounts = []
+            if payer and rng.random() >= SKIP_DIVIDEND_RATIO:
+                dividend = round(min(math.exp(log_yield), MAX_YIELD) / 100 * close if close else 0.0, 3)
+                if dividend > 0:
+                    if rng.random() < INTERIM_RATIO and dividend >= 0.002:
+                        interim = round(dividend * rng.uniform(0.3, 0.6), 3)
+                        amounts = [interim, round(dividend - interim, 3)]
+                    else:
+                        amounts = [dividend]
+
+            profit = round(math.exp(log_profit), 4)
+            if rng.random() < LOSS_RATIO:
+                profit = -round(profit * rng.uniform(0.1, 1.0), 4)
+            yearly[year] = (amounts, close, profit)
+
+        # 当前收盘价取最后一年收盘价附近的价格
+        last_close = yearly[CURRENT_YEAR][1]
+        current_close = (round(last_close * math.exp(rng.gauss(0, 0.03)), 2) or 0.01) if last_close else None
+        return {"code": code, "name": name, "ipo_year": ipo_year, "yearly": yearly, "current_close": current_close}
+
+    def __iter__(self):
+        for index, code in enumerate(self.codes()):
+            yield self.stock(index, code)
+
+
+def total_dividend(amounts):
+    """按采集脚本的方式累加各次分红"""
+    total = 0.0
+    for amount in amounts:
+        total += amount
+    return total
+
+
+CURRENT_FIELDS = ["股票代码", "股票名称", f"{CURRENT_YEAR}年累计分红", f"{CURRENT_DATE}收盘价", "股息率(%)"]
+
+
+def current_row(stock):
+    """all_dividend_yield_2025.csv的一行，计算方式与dividend_yield_collector一致"""
+    dividend = total_dividend(stock["yearly"][CURRENT_YEAR][0])
+    close = stock["current_close"]
+    return {
+        "股票代码": stock["code"],
+        "股票名称": stock["name"],
+        f"{CURRENT_YEAR}年累计分红": round(dividend, 4),
+        f"{CURRENT_DATE}收盘价": float(close) if close else 0.0,
+        "股息率(%)": round(dividend / close * 100, 2) if close else 0.0,
+    }
+
+
+def yearly_fields(years):
+    """年度数据CSV的列名"""
+    fields = ["股票代码", "股票名称"]
+    for year in years:
+        fields.extend([f"{year}年分红", f"{year}年收盘价", f"{year}年股息率(%)", f"{year}年利润(亿元)"])
+    span = f"{years[0]}-{years[-1]}"
+    fields.extend([f"{span}年累计分红", f"{span}年平均股息率(%)", f"{span}年平均利润(亿元)"])
+    return fields
+
+
+def yearly_row(stock, years):
+    """年度数据CSV的一行，计算方式与get_2020_2025_data一致"""
+    row = {"股票代码": stock["code"], "股票名称": stock["name"]}
+    for year in years:
+        amounts, close, profit = stock["yearly"][year]
+        dividend = total_dividend(amounts)
+        row[f"{year}年分红"] = round(dividend, 4)
+        row[f"{year}年收盘价"] = close if close is not None else 0.0
+        row[f"{year}年股息率(%)"] = round(dividend / close * 100, 2) if close else 0.0
+        row[f"{year}年利润(亿元)"] = round(profit, 4)
+
+    valid_yields = [row[f"{year}年股息率(%)"] for year in years if row[f"{year}年股息率(%)"] > 0]
+    span = f"{years[0]}-{years[-1]}"
+    row[f"{span}年累计分红"] = round(sum(row[f"{year}年分红"] for year in years), 4)
+    row[f"{span}年平均股息率(%)"] = round(sum(valid_yields) / len(valid_yields), 2) if valid_yields else 0.0
+    row[f"{span}年平均利润(亿元)"] = round(sum(row[f"{year}年利润(亿元)"] for year in years) / len(years), 4)
+    return row
+
+
+class FixtureWriter:
+    """流式写入回放数据，每个API一个JSON Lines文件，格式与FixtureStore相同"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.files = {}
+        self.count = 0
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def add(self, record):
+        api = record["api"]
+        if api not in self.files:
+            self.files[api] = open(os.path.join(self.fixture_dir, f"{api}.jsonl"), 'w', encoding='utf-8')
+        self.files[api].write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def generate_dataset(output_dir="synthetic", stocks=5170, years=6, seed=0, watchlist="screened", fixtures=True):
+    """生成合成数据集
+    watchlist为screened时stocks.id只包含股息率大于3%的股票（与extract_high_dividend_stocks一致），为all时包含全部股票；
+    年度数据和年度回放数据只针对stocks.id中的股票生成"""
+    start_time = time.time()
+    market = SyntheticMarket(stocks, years, seed)
+    data_dir = os.path.join(output_dir, "output")
+    os.makedirs(data_dir, exist_ok=True)
+
+    current_path = os.path.join(data_dir, f"all_dividend_yield_{CURRENT_YEAR}.csv")
+    yearly_path = os.path.join(data_dir, yearly_csv_name(market.years))
+    stocks_path = os.path.join(output_dir, "stocks.id")
+    fixture_writer = FixtureWriter(os.path.join(output_dir, "fixtures", "baostock")) if fixtures else None
+    basics = []
+    watched = 0
+
+    with open(current_path, 'w', newline='', encoding='utf-8') as current_file, \
+            open(yearly_path, 'w', newline='', encoding='utf-8') as yearly_file, \
+            open(stocks_path, 'w', encoding='utf-8') as stocks_file:
+        current_writer = csv.DictWriter(current_file, fieldnames=CURRENT_FIELDS)
+        yearly_writer = csv.DictWriter(yearly_file, fieldnames=yearly_fields(market.years))
+        current_writer.writeheader()
+        yearly_writer.writeheader()
+
+        for stock in market:
+            code = stock["code"]
+            row = current_row(stock)
+            current_writer.writerow(row)
+            basics.append((code, stock["name"], f"{max(stock['ipo_year'], 1990)}-01-01", "1", "1"))
+
+            if fixture_writer:
+                fixture_writer.add(dividend_record(code, CURRENT_YEAR, stock["yearly"][CURRENT_YEAR][0]))
+                fixture_writer.add(close_record(code, CURRENT_DATE, stock["current_close"]))
+
+            if watchlist != "all" and row["股息率(%)"] <= 3:
+                continue
+
+            watched += 1
+            stocks_file.write(f"{code} {stock['name']}\n")
+            yearly_writer.writerow(yearly_row(stock, market.years))
+
+            if fixture_writer:
+                for year in market.years:
+                    amounts, close, profit = stock["yearly"][year]
+                    if year != CURRENT_YEAR:
+                        fixture_writer.add(dividend_record(code, year, amounts))
+                    fixture_writer.add(yearly_close_record(code, year, f"{year}-12-31", close))
+                    fixture_writer.add(profit_record(code, year, 4, profit * 100000000 if profit else None))
+                    if not profit:
+                        fixture_writer.add(profit_record(code, year, 3, None))
+
+    if fixture_writer:
+        fixture_writer.add(stock_basic_record(basics))
+        fixture_writer.close()
+
+    elapsed = time.time() - start_time
+    print(f"已生成{stocks}只股票、{len(market.years)}年的合成数据到{output_dir}，耗时{elapsed:.2f}秒")
+    print(f"  {current_path}: {stocks}行")
+    print(f"  {yearly_path}: {watched}行")
+    print(f"  {stocks_path}: {watched}只股票")
+    if fixture_writer:
+        print(f"  {fixture_writer.fixture_dir}: {fixture_writer.count}条回放数据")
+    return {"current_csv": current_path, "yearly_csv": yearly_path, "stocks_id": stocks_path, "watchlist": watched}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--stocks", type=int, default=5170, help="股票数量")
+    parser.add_argument("--years", type=int, default=6, help=f"年数，截止到{CURRENT_YEAR}年")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--watchlist", choices=["screened", "all"], default="screened",
+                        help="stocks.id包含的股票：screened为股息率大于3%%的股票，all为全部股票")
+    parser.add_argument("--output-dir", default="synthetic", help="输出目录")
+    parser.add_argument("--no-fixtures", action="store_true", help="不生成回放数据")
+    args = parser.parse_args()
+    generate_dataset(args.output_dir, args.stocks, args.years, args.seed, args.watchlist, not args.no_fixtures)
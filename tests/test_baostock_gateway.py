@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""本地Baostock网关：请求处理、缓存键和残留socket的处理，上游为进程内的假模块"""
+
+import os
+import sys
+import json
+import socket
+import threading
+import types
+
+import pytest
+
+import baostock_gateway
+from baostock_gateway import (
+    BAD_REQUEST_ERROR_CODE, BaostockGateway, GatewayServer, QueryCache, RateLimiter, send_request,
+)
+from baostock_metrics import BaostockMetrics
+from baostock_replay import ReplayResultData
+
+
+def fake_baostock():
+    module = types.ModuleType("baostock")
+    module.calls = []
+
+    def query_history_k_data_plus(code, fields, start_date="", end_date=""):
+        module.calls.append((code, fields, start_date, end_date))
+        return ReplayResultData(fields=["close"], rows=[["10.0"]])
+
+    module.query_history_k_data_plus = query_history_k_data_plus
+    module.login = module.logout = lambda: ReplayResultData()
+    return module
+
+
+@pytest.fixture
+def gateway(tmp_path):
+    module = fake_baostock()
+    path = str(tmp_path / "gateway.sock")
+    gateway = BaostockGateway(module, BaostockMetrics(), QueryCache(), RateLimiter(), module)
+    server = GatewayServer(path, gateway)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path, gateway, module
+    server.shutdown()
+    server.server_close()
+
+
+def test_malformed_requests_get_an_error_response(gateway):
+    path, _, module = gateway
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.settimeout(5)
+        with sock.makefile("rwb") as f:
+            for line in (b"not json\n", b'{"op": "query"}\n', b'{"api": "login"}\n', b'{"op": "ping"}\n'):
+                f.write(line)
+                f.flush()
+                response = json.loads(f.readline())
+                if line != b'{"op": "ping"}\n':
+                    assert response["error_code"] == BAD_REQUEST_ERROR_CODE
+    # 格式错误的请求之后同一连接仍可使用
+    assert response["error_msg"] == "pong"
+    assert module.calls == []
+
+
+def test_positional_and_keyword_arguments_share_the_cache(gateway):
+    path, gateway, module = gateway
+    keyword = {"op": "query", "api": "query_history_k_data_plus",
+               "kwargs": {"code": "sh.600000", "fields": "date,close"}}
+    positional = {"op": "query", "api": "query_history_k_data_plus", "args": ["sh.600000", "date,close"]}
+    assert send_request(keyword, path, timeout=5)["rows"] == [["10.0"]]
+    assert send_request(positional, path, timeout=5)["rows"] == [["10.0"]]
+    assert len(module.calls) == 1
+    assert gateway.requests == 2
+
+
+def test_serve_keeps_the_socket_of_a_busy_gateway(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "baostock", fake_baostock())
+    monkeypatch.setattr(baostock_gateway, "resilient_baostock", lambda bs, *args: bs)
+    path = str(tmp_path / "busy.sock")
+    # 在监听但不处理请求的网关：ping超时
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as busy:
+        busy.bind(path)
+        busy.listen(1)
+        assert baostock_gateway.serve(path) is False
+        assert os.path.exists(path)
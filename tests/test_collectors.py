@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""采集脚本在回放数据上的端到端测试：结果合并、失败队列、分片合并、调用预算、增量采集"""
+
+import csv
+import glob
+import io
+
+from baostock_retry import CircuitBreaker
+from collector_shards import SHARD_DIR, ShardMerger
+from stock_universe import fetch_snapshot
+from dividend_yield_collector import DividendYieldCollector
+from conftest import read_rows, write_rows, fast
+
+CURRENT_CSV = "output/all_dividend_yield_2025.csv"
+
+
+def read_rows_from_bytes(data):
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_breaker_abort_keeps_previous_rows(replay):
+    before = read_rows(CURRENT_CSV)
+    # 先保存股票池快照，采集时不再查询股票列表
+    fetch_snapshot(replay())
+    replay(error_rate=0.6, seed=3)
+    collector = fast(DividendYieldCollector())
+    collector.max_retries = 0
+    collector.breaker = CircuitBreaker(window=5, threshold=0.5, cooldown=0, max_trips=0)
+    assert collector.run()
+    assert collector.dead_letter.aborted
+    after = read_rows(CURRENT_CSV)
+    assert [row["股票代码"] for row in after] == [row["股票代码"] for row in before]
+
+
+def test_retry_failed_merges_into_the_existing_csv(replay):
+    expected = read_bytes(CURRENT_CSV)
+    fetch_snapshot(replay())
+    replay(error_rate=0.3, seed=5)
+    collector = fast(DividendYieldCollector())
+    collector.max_retries = 0
+    collector.breaker = CircuitBreaker(window=1000)
+    assert collector.run()
+    failed = [entry["code"] for entry in collector.dead_letter.load()]
+    assert failed
+    assert not {row["股票代码"] for row in read_rows(CURRENT_CSV)} & set(failed)
+
+    replay()
+    collector = fast(DividendYieldCollector())
+    assert collector.run(retry_failed=True)
+    assert collector.dead_letter.load() == []
+    assert sorted(read_rows(CURRENT_CSV), key=lambda row: row["股票代码"]) == \
+        sorted(read_rows_from_bytes(expected), key=lambda row: row["股票代码"])
+
+
+def test_shards_merge_to_the_full_result(replay, tmp_path):
+    expected = read_rows(CURRENT_CSV)
+    fetch_snapshot(replay())
+    for index in (1, 2, 3):
+        assert fast(DividendYieldCollector(shard=(index, 3))).run()
+    paths = sorted(glob.glob(f"{SHARD_DIR}/all_dividend_yield_2025.shard-*.csv"))
+    assert len(paths) == 3
+    merged = str(tmp_path / "merged.csv")
+    assert ShardMerger(paths).merge(merged) == len(expected)
+    assert read_rows(merged) == sorted(expected, key=lambda row: row["股票代码"])
+
+
+def test_budget_is_a_hard_cap_including_retries(replay):
+    fetch_snapshot(replay())
+    replay(error_rate=0.5, seed=7)
+    collector = fast(DividendYieldCollector())
+    collector.max_retries = 3
+    collector.budget = 11
+    assert collector.run()
+    assert collector.call_budget.exhausted
+    assert collector.metrics.total_calls() <= 11
+    assert collector.dead_letter.entries[-1]["error_code"] == "budget"
+
+
+def test_changes_only_follows_csv_and_keeps_dead_letter(replay):
+    fetch_snapshot(replay())
+    rows = read_rows(CURRENT_CSV)
+    missing, renamed = rows[0], rows[1]
+    # 已有结果：少一只股票、多一只已退市的股票、一只股票的名称过时
+    stale = [dict(row) for row in rows[1:]]
+    stale[0]["股票名称"] = "旧名称"
+    stale.append(dict(rows[2], **{"股票代码": "sz.009999", "股票名称": "退市样本"}))
+    write_rows(CURRENT_CSV, stale)
+    collector = fast(DividendYieldCollector())
+    collector.dead_letter.start()
+    collector.dead_letter.add("sh.600999", "之前失败", RuntimeError("网络错误"))
+
+    collector = fast(DividendYieldCollector())
+    collector.changes_only = True
+    assert collector.run()
+    assert collector.stock_list == [(missing["股票代码"], missing["股票名称"])]
+    after = {row["股票代码"]: row for row in read_rows(CURRENT_CSV)}
+    assert set(after) == {row["股票代码"] for row in rows}
+    assert after[renamed["股票代码"]]["股票名称"] == renamed["股票名称"]
+    assert [entry["code"] for entry in collector.dead_letter.load()] == ["sh.600999"]
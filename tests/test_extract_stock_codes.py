@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""截图识别：代码列定位和识别缓存，不需要OpenCV和Tesseract"""
+
+import os
+
+import pytest
+
+import extract_stock_codes
+from extract_stock_codes import StockCodeExtractor, column_bounds
+
+
+def synthetic_table():
+    """三列表格：跨列的标题、两列合并的表头、8行主体，左侧一条竖线、表头下一条横线"""
+    np = pytest.importorskip("numpy")
+    image = np.zeros((200, 400), dtype=np.uint8)
+    image[5:15, 20:380] = 255
+    image[25:35, 20:80] = 255
+    image[25:35, 150:330] = 255
+    image[40, :] = 255
+    image[:, 5] = 255
+    for row in range(8):
+        y = 50 + row * 18
+        for x0, x1 in ((20, 80), (150, 220), (260, 330)):
+            image[y:y + 10, x0:x1] = 255
+    return image
+
+
+def test_column_bounds_ignores_title_and_header_rows():
+    assert column_bounds(synthetic_table(), 8) == [(20, 80), (150, 220), (260, 330)]
+
+
+def test_failed_pages_are_not_cached(tmp_path, monkeypatch):
+    image = tmp_path / "stock.png"
+    image.write_bytes(b"not really a png")
+    cache_dir = str(tmp_path / "cache")
+
+    monkeypatch.setattr(extract_stock_codes, "ocr_page", lambda path, page, column, crop: None)
+    assert StockCodeExtractor(str(image), workers=1, cache_dir=cache_dir).extract_codes() == []
+    assert not os.path.exists(cache_dir)
+
+    def broken(path, page, column, crop):
+        raise RuntimeError("tesseract exited")
+    monkeypatch.setattr(extract_stock_codes, "ocr_page", broken)
+    assert StockCodeExtractor(str(image), workers=1, cache_dir=cache_dir).extract_codes() == []
+    assert not os.path.exists(cache_dir)
+
+    monkeypatch.setattr(extract_stock_codes, "ocr_page", lambda path, page, column, crop: ["600000"])
+    assert StockCodeExtractor(str(image), workers=1, cache_dir=cache_dir).extract_codes() == ["600000"]
+    extractor = StockCodeExtractor(str(image), workers=1, cache_dir=cache_dir)
+    assert extractor.extract_codes() == ["600000"]
+    assert extractor.cached_pages == 1
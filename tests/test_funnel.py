@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""两阶段筛选漏斗在回放数据上的测试"""
+
+from baostock_retry import CircuitBreaker
+from stock_universe import fetch_snapshot
+from funnel import ScreeningFunnel
+from conftest import read_rows, fast
+
+CURRENT_CSV = "output/all_dividend_yield_2025.csv"
+YEARLY_CSV = "output/2020_2025_dividend_data.csv"
+
+
+def make_funnel():
+    funnel = ScreeningFunnel()
+    fast(funnel.current)
+    fast(funnel.yearly)
+    return funnel
+
+
+def test_phase_one_abort_keeps_stocks_id_and_csv(replay):
+    fetch_snapshot(replay())
+    with open("stocks.id", 'rb') as f:
+        stocks_id = f.read()
+    before = read_rows(CURRENT_CSV)
+    replay(error_rate=0.6, seed=3)
+    funnel = make_funnel()
+    funnel.current.max_retries = 0
+    funnel.current.breaker = CircuitBreaker(window=5, threshold=0.5, cooldown=0, max_trips=0)
+    assert funnel.run() is False
+    assert funnel.current.dead_letter.aborted
+    with open("stocks.id", 'rb') as f:
+        assert f.read() == stocks_id
+    assert [row["股票代码"] for row in read_rows(CURRENT_CSV)] == [row["股票代码"] for row in before]
+
+
+def test_funnel_output_is_byte_identical_across_runs(replay):
+    outputs = []
+    for _ in range(2):
+        fetch_snapshot(replay())
+        assert make_funnel().run()
+        with open("stocks.id", 'rb') as f, open(YEARLY_CSV, 'rb') as g:
+            outputs.append((f.read(), g.read()))
+    assert outputs[0] == outputs[1]
+    assert outputs[0][0]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""流水线的测试：阶段的代码输入包括脚本导入的全部本地模块"""
+
+import os
+
+import pytest
+
+from pipeline import STAGES
+
+
+@pytest.mark.parametrize("name, modules", [
+    ("collect", {"stock_universe.py", "query_planner.py", "stock_scheduler.py", "collector_shards.py",
+                 "baostock_metrics.py", "baostock_retry.py"}),
+    ("yearly", {"query_planner.py", "stock_scheduler.py", "baostock_retry.py"}),
+    ("report_complete", {"report_assets.py", "report_manifest.py", "report_data.py", "report_charts.py"}),
+])
+def test_stage_inputs_follow_imports(name, modules):
+    stage = next(stage for stage in STAGES if stage.name == name)
+    assert modules <= {os.path.basename(path) for path in stage.inputs}
+    assert all(os.path.exists(path) for path in stage.inputs if path.endswith(".py"))
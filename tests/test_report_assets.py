@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""报告资源构建的测试：预压缩副本覆盖全部输出，且不会留下过期副本"""
+
+import gzip
+import os
+
+from generate_complete_html import generate_complete_html
+
+OUTPUTS = ["output/dividend_rankings_2020_2025.html", "output/dividend_yield_heatmap.svg"]
+
+
+def test_precompressed_copies_follow_every_build(market):
+    assert generate_complete_html(build_assets=True)
+    for path in OUTPUTS:
+        with open(path, 'rb') as f, gzip.open(path + ".gz") as g:
+            assert g.read() == f.read()
+
+    assert generate_complete_html(build_assets=False)
+    for path in OUTPUTS:
+        assert os.path.exists(path)
+        assert not os.path.exists(path + ".gz")
+        assert not os.path.exists(path + ".br")
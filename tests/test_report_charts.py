@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""SVG图表的测试：迷你图的批量计算与逐行计算结果相同"""
+
+import random
+
+import pytest
+
+import report_charts
+from report_charts import sparkline_svgs
+
+
+def test_batched_sparklines_match_the_row_by_row_fallback(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    series = [[round(rng.uniform(-1, 10), 2) for _ in range(6)] for _ in range(200)] + [[2.5] * 6]
+    batched = sparkline_svgs(series)
+    monkeypatch.setattr(report_charts, "np", None)
+    assert sparkline_svgs(series) == batched
+
+
+def test_flat_series_is_drawn_at_the_bottom():
+    svg, = sparkline_svgs([[1.0, 1.0, 1.0]], width=10, height=10)
+    assert 'points="2.0,8.0 5.0,8.0 8.0,8.0"' in svg
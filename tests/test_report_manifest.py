@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""报告清单的测试：分片只随自身数据重建，生成器代码变化时清单失效"""
+
+import os
+
+from generate_complete_html import generate_complete_html
+from report_manifest import code_files
+from conftest import read_rows, write_rows
+
+YEARLY_CSV = "output/2020_2025_dividend_data.csv"
+
+
+def rebuilt(capsys):
+    out = capsys.readouterr().out
+    return int(out.split("重建")[1].split("个")[0])
+
+
+def test_only_the_shard_with_changed_rows_is_rebuilt(market, capsys):
+    assert generate_complete_html(shard_size=1)
+    assert rebuilt(capsys) == 4
+
+    rows = read_rows(YEARLY_CSV)
+    # 利润不参与排名，只影响该股票所在的分片
+    rows[-1]["2020年利润(亿元)"] = "1.2345"
+    write_rows(YEARLY_CSV, rows)
+    assert generate_complete_html(shard_size=1)
+    assert rebuilt(capsys) == 1
+
+
+def test_code_fingerprint_covers_every_imported_module():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    generator = os.path.join(root, "generate_complete_html.py")
+    names = {os.path.basename(path) for path in code_files(generator)}
+    assert {"report_data.py", "report_charts.py", "report_assets.py", "report_manifest.py", "profiling.py"} <= names
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""报告服务的测试：ETag重新验证和页面不把数据当作HTML解析"""
+
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+from report_server import ReportDataset, ReportRequestHandler, INDEX_HTML, etag_matches
+
+
+@pytest.mark.parametrize("header, matched", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", W/"abc"', True),
+    ('*', True),
+    ('"old"', False),
+    (None, False),
+])
+def test_etag_matches(header, matched):
+    assert etag_matches(header, '"abc"') is matched
+
+
+def test_etag_list_gets_not_modified(market):
+    ReportRequestHandler.dataset = ReportDataset("output/2020_2025_dividend_data.csv",
+                                                 "output/all_dividend_yield_2025.csv")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReportRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/stocks?page=1"
+    try:
+        with urllib.request.urlopen(url) as response:
+            etag = response.headers["ETag"]
+        request = urllib.request.Request(url, headers={"If-None-Match": f'"stale", W/{etag}'})
+        with pytest.raises(HTTPError) as e:
+            urllib.request.urlopen(request)
+        assert e.value.code == 304
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_index_page_does_not_render_data_as_html():
+    assert "innerHTML" not in INDEX_HTML
+    assert "td.textContent = row[key]" in INDEX_HTML
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""股票代码解析与纠错测试"""
+
+import os
+
+import pytest
+
+from baostock_replay import ReplayResultData, STOCK_BASIC_FIELDS
+from stock_universe import UniverseIndex, SnapshotError, fetch_snapshot, snapshot_paths
+
+NAMES = {
+    "sh.600000": "浦发银行",
+    "sz.000001": "平安银行",
+    "sh.600036": "招商银行",
+    "sh.601398": "工商银行",
+}
+
+
+@pytest.fixture
+def index():
+    return UniverseIndex(NAMES)
+
+
+@pytest.mark.parametrize("token, code, note", [
+    ("sh.600000", "sh.600000", ""),
+    ("SZ000001", "sz.000001", "补全前缀"),
+    ("000001.SZ", "sz.000001", "补全前缀"),
+    ("6OO036", "sh.600036", "纠正混淆字符6OO036→600036"),
+    ("招商银行", "sh.600036", "按名称匹配"),
+    ("12345678", None, "不是6位代码"),
+    ("abc", None, "无法识别为股票代码或名称"),
+])
+def test_resolve(index, token, code, note):
+    assert index.resolve(token) == (code, note)
+
+
+@pytest.mark.parametrize("token, code", [
+    ("6010398", "sh.601398"),
+    ("601399", "sh.601398"),
+])
+def test_resolve_by_edit_distance(index, token, code):
+    resolved, note = index.resolve(token)
+    assert resolved == code
+    assert note.startswith("按编辑距离")
+
+
+def test_resolve_similar_name(index):
+    assert index.resolve("招商银衍") == ("sh.600036", "按相近名称招商银行匹配")
+
+
+def test_validate_splits_codes_corrections_and_rejects(index):
+    codes, corrections, rejected = index.validate(["sh.600000", "6OO036", "abc"])
+    assert codes == ["sh.600000", "sh.600036"]
+    assert len(corrections) == 1
+    assert len(rejected) == 1
+
+
+class StockBasic:
+    """只返回给定股票池的query_stock_basic"""
+
+    def __init__(self, codes):
+        self.rows = [[code, f"股票{code[-3:]}", "2010-01-01", "", "1", "1"] for code in codes]
+
+    def query_stock_basic(self):
+        return ReplayResultData(fields=STOCK_BASIC_FIELDS, rows=self.rows)
+
+
+def test_empty_or_shrunken_results_are_not_saved(tmp_path):
+    universe_dir = str(tmp_path)
+    codes = [f"sh.{600000 + i}" for i in range(100)]
+    fetch_snapshot(StockBasic(codes), universe_dir)
+    saved = snapshot_paths(universe_dir)
+    mtime = os.path.getmtime(saved[-1])
+    with pytest.raises(SnapshotError):
+        fetch_snapshot(StockBasic([]), universe_dir)
+    with pytest.raises(SnapshotError):
+        fetch_snapshot(StockBasic(codes[:50]), universe_dir)
+    assert snapshot_paths(universe_dir) == saved
+    assert os.path.getmtime(saved[-1]) == mtime
+    snapshot, diff = fetch_snapshot(StockBasic(codes[:95]), universe_dir)
+    assert len(diff.delisted) == 5
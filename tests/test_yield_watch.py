@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""盯盘模式：初始排名和单独查询的分红，收盘价来自假的baostock"""
+
+import json
+
+from baostock_replay import ReplayResultData
+from dividend_yield_collector import DividendYieldCollector
+from yield_watch import YieldWatcher, EventSink, load_dividends
+from conftest import read_rows, write_rows
+
+
+class FakeBaostock:
+    """每只股票返回固定的最新收盘价"""
+
+    def __init__(self, closes):
+        self.closes = closes
+
+    def query_history_k_data_plus(self, code, **kwargs):
+        return ReplayResultData(fields=["date", "close"], rows=[["2026-01-05", str(self.closes[code])]])
+
+
+def watcher(closes):
+    watcher = YieldWatcher(threshold=3.0, sink=EventSink("output/events.jsonl"))
+    watcher.baostock = FakeBaostock(closes)
+    return watcher
+
+
+def test_first_poll_emits_crossings_against_the_collected_yields(market):
+    rows = {row["股票代码"]: row for row in read_rows("output/all_dividend_yield_2025.csv")}
+    stocks = [code for code, _ in watcher({}).stocks if float(rows[code]["股息率(%)"]) > 3.0]
+    code = stocks[0]
+    # 其他股票收盘价不变，这只股票收盘价翻三倍，股息率降到阈值以下
+    closes = {other: float(rows[other]["2025-11-28收盘价"]) for other in rows}
+    closes[code] *= 3
+    w = watcher(closes)
+    w.load_dividends()
+    w.restore()
+    w.seed()
+    assert code in w.poll()
+    with open("output/events.jsonl", 'r', encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    assert [(event["code"], event["event"]) for event in events] == [(code, "below")]
+
+
+def test_dividends_of_stocks_missing_from_the_csv_are_queried_once(market, monkeypatch):
+    rows = read_rows("output/all_dividend_yield_2025.csv")
+    missing = watcher({}).stocks[0][0]
+    write_rows("output/all_dividend_yield_2025.csv", [row for row in rows if row["股票代码"] != missing])
+    assert missing not in load_dividends()
+    queried = []
+    monkeypatch.setattr(DividendYieldCollector, "get_2025_dividends", lambda self, code: queried.append(code) or 0.5)
+
+    for _ in range(2):
+        w = watcher({})
+        w.load_dividends()
+        assert w.dividends[missing] == 0.5
+    assert queried == [missing]
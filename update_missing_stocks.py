@@ -8,23 +8,51 @@ import os
 import csv
 import time
 import random
-import baostock as bs
+import logging
+import argparse
+
+from baostock_metrics import BaostockMetrics
+from baostock_retry import (
+    resilient_baostock, add_retry_arguments, circuit_breaker_from_args, CircuitBreaker, DeadLetterQueue,
+    record_stock_result,
+)
+from progress import ProgressReporter, setup_logging, add_logging_arguments
+from profiling import add_profile_argument, run_with_profile, count_rows
+
+logger = logging.getLogger(__name__)
 
 class MissingStockUpdater:
+    # 每只股票处理完后的随机休眠区间（秒），避免API调用过于频繁
+    request_interval = (0.3, 1.0)
+    # 进度汇报间隔（秒）
+    progress_interval = 10.0
+    # 网络或会话错误时的最大重试次数和首次重试前的等待时间（秒）
+    max_retries = 3
+    retry_backoff = 1.0
+    # 单次Baostock调用的时限（秒），超时后关闭连接并重试
+    call_timeout = 30.0
+    
     def __init__(self):
         self.baostock = None
+        self.metrics = BaostockMetrics()
+        self.dead_letter = DeadLetterQueue("update_missing_stocks")
+        self.breaker = CircuitBreaker()
         self.input_csv = "output/all_dividend_yield_2025.csv"
         self.output_csv = "output/all_dividend_yield_2025_updated.csv"
         self.target_range = ("sz.301528", "sz.302132")
         
     def init_baostock(self):
         """初始化Baostock API"""
-        login_result = bs.login()
+        import baostock as bs
+        # 包装baostock：调用超时保护，记录每个接口的耗时、错误码和返回行数，失败时重试
+        self.baostock = resilient_baostock(bs, self.metrics, self.max_retries, self.retry_backoff, self.call_timeout)
+        
+        # 登录同样受调用时限保护
+        login_result = self.baostock.login()
         if login_result.error_code != '0':
-            print(f"Baostock登录失败: {login_result.error_msg}")
+            logger.error(f"Baostock登录失败: {login_result.error_msg}")
             return False
-        print("Baostock登录成功")
-        self.baostock = bs
+        logger.info("Baostock登录成功")
         return True
     
     def get_target_stocks(self):
@@ -32,7 +60,7 @@ class MissingStockUpdater:
         target_stocks = []
         
         if not os.path.exists(self.input_csv):
-            print(f"输入文件不存在: {self.input_csv}")
+            logger.error(f"输入文件不存在: {self.input_csv}")
             return target_stocks
         
         with open(self.input_csv, 'r', encoding='utf-8') as f:
@@ -46,11 +74,11 @@ class MissingStockUpdater:
                         "股票名称": row["股票名称"]
                     })
         
-        print(f"共找到{len(target_stocks)}只目标股票")
+        logger.info(f"共找到{len(target_stocks)}只目标股票")
         return target_stocks
     
     def get_2025_dividends(self, code):
-        """获取股票2025年的累计分红金额"""
+        """获取股票2025年的累计分红金额，查询失败时抛出BaostockError"""
         total_dividend = 0.0
         
         rs = self.baostock.query_dividend_data(
@@ -59,10 +87,6 @@ class MissingStockUpdater:
             yearType="report"
         )
         
-        if rs.error_code != '0':
-            print(f"  获取{code}分红数据失败: {rs.error_msg}")
-            return total_dividend
-        
         while rs.next():
             row = rs.get_row_data()
             if len(row) >= 10:
@@ -77,7 +101,7 @@ class MissingStockUpdater:
         return total_dividend
     
     def get_2025_close_price(self, code):
-        """获取股票2025年11月28日的收盘价"""
+        """获取股票2025年11月28日的收盘价，当天无数据时返回None，查询失败时抛出BaostockError"""
         rs = self.baostock.query_history_k_data_plus(
             code=code,
             fields="close",
@@ -87,10 +111,6 @@ class MissingStockUpdater:
             adjustflag="3"
         )
         
-        if rs.error_code != '0':
-            print(f"  获取{code}收盘价失败: {rs.error_msg}")
-            return None
-        
         if rs.next():
             row = rs.get_row_data()
             return row[0] if row[0] and row[0] != '' else None
@@ -99,11 +119,15 @@ class MissingStockUpdater:
     def update_stock_data(self, target_stocks):
         """更新目标股票的数据"""
         updated_data = {}
+        progress = ProgressReporter(len(target_stocks), "缺失数据更新", self.progress_interval, logger)
+        
+        def remaining(i):
+            return [(stock["股票代码"], stock["股票名称"]) for stock in target_stocks[i + 1:]]
         
         for i, stock in enumerate(target_stocks):
             code = stock["股票代码"]
             name = stock["股票名称"]
-            print(f"正在处理第{i+1}/{len(target_stocks)}只股票: {code} {name}")
+            logger.debug(f"正在处理第{i+1}/{len(target_stocks)}只股票: {code} {name}")
             
             try:
                 # 获取2025年累计分红
@@ -125,7 +149,7 @@ class MissingStockUpdater:
                         "股息率(%)": round(dividend_yield, 2)
                     }
                     
-                    print(f"  更新成功: 分红={total_dividend:.4f}, 收盘价={close_price}, 股息率={dividend_yield:.2f}%")
+                    logger.debug(f"更新成功: 分红={total_dividend:.4f}, 收盘价={close_price}, 股息率={dividend_yield:.2f}%")
                 else:
                     # 即使收盘价缺失，也要保存更新状态
                     updated_data[code] = {
@@ -136,21 +160,31 @@ class MissingStockUpdater:
                         "股息率(%)": 0.0
                     }
                     
-                    print(f"  更新成功: 分红={total_dividend:.4f}, 收盘价=0.0")
+                    logger.debug(f"更新成功: 分红={total_dividend:.4f}, 收盘价=0.0")
+                
+                progress.advance()
+                if not record_stock_result(self.breaker, self.dead_letter, True, remaining(i)):
+                    break
                 
                 # 随机休眠，避免API调用过于频繁
-                time.sleep(random.uniform(0.3, 1.0))
+                time.sleep(random.uniform(*self.request_interval))
                 
             except Exception as e:
-                print(f"  处理{code}时出错: {e}")
+                # 失败的股票保留原有数据，记录到失败队列
+                logger.warning(f"处理{code}时出错: {e}")
+                self.dead_letter.add(code, name, e)
+                progress.advance(errors=1)
+                if not record_stock_result(self.breaker, self.dead_letter, False, remaining(i)):
+                    break
                 continue
         
+        progress.finish()
         return updated_data
     
     def update_csv_file(self, updated_data):
         """更新CSV文件"""
         if not os.path.exists(self.input_csv):
-            print(f"输入文件不存在: {self.input_csv}")
+            logger.error(f"输入文件不存在: {self.input_csv}")
             return False
         
         with open(self.input_csv, 'r', encoding='utf-8') as f_in, \
@@ -165,44 +199,76 @@ class MissingStockUpdater:
                 if code in updated_data:
                     # 使用更新后的数据
                     writer.writerow(updated_data[code])
-                    print(f"已更新: {code}")
+                    logger.debug(f"已更新: {code}")
                 else:
                     # 使用原始数据
                     writer.writerow(row)
         
-        print(f"\nCSV文件更新完成，保存到: {self.output_csv}")
+        logger.info(f"CSV文件更新完成，保存到: {self.output_csv}")
         
         # 替换原始文件
         os.replace(self.output_csv, self.input_csv)
-        print(f"已替换原始文件: {self.input_csv}")
+        logger.info(f"已替换原始文件: {self.input_csv}")
         return True
     
-    def run(self):
-        """运行更新流程"""
+    def run(self, retry_failed=False):
+        """运行更新流程；retry_failed为True时只更新失败队列中的股票"""
         try:
             if not self.init_baostock():
                 return False
             
             # 获取目标股票
-            target_stocks = self.get_target_stocks()
+            previous = self.dead_letter.load() if retry_failed else []
+            if retry_failed:
+                target_stocks = [{"股票代码": entry["code"], "股票名称": entry["name"]} for entry in previous]
+                logger.info(f"失败队列中共{len(target_stocks)}只股票")
+            else:
+                target_stocks = self.get_target_stocks()
             if not target_stocks:
                 return False
             
             # 更新股票数据
+            self.dead_letter.start(previous)
             updated_data = self.update_stock_data(target_stocks)
             
             # 更新CSV文件
             if updated_data:
                 self.update_csv_file(updated_data)
+            self.dead_letter.finish()
             
             return True
             
         finally:
             # 登出Baostock
             if self.baostock:
-                bs.logout()
-                print("Baostock已退出")
+                self.baostock.logout()
+                logger.info("Baostock已退出")
+                # 输出并导出调用统计
+                self.metrics.print_summary()
+                self.metrics.export("update_missing_stocks")
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    add_logging_arguments(parser)
+    add_retry_arguments(parser)
+    add_profile_argument(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
 
-if __name__ == "__main__":
     updater = MissingStockUpdater()
-    updater.run()
+    updater.progress_interval = args.progress_interval
+    updater.max_retries = args.max_retries
+    updater.retry_backoff = args.retry_backoff
+    updater.call_timeout = args.call_timeout
+    updater.breaker = circuit_breaker_from_args(args)
+    return run_with_profile(args.profile, "update_missing_stocks", lambda: updater.run(args.retry_failed), count_rows(updater.input_csv, header=True), args.profile_top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())
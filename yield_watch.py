@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+盯盘模式：常驻运行，按固定间隔只查询stocks.id中股票的最新收盘价，2025年分红在启动时读取后保持不变；
+只对收盘价变化的股票重新计算股息率并调整排名，结果写入output/watch_yields.csv，
+股息率上穿或下穿阈值时记录事件到output/watch_events.jsonl，也可以POST到--webhook；
+第一轮查询前以上次采集的收盘价作为初始排名，上次采集中没有的股票单独查询的分红保存在output/watch_yields_dividends.json
+"""
+
+import os
+import csv
+import json
+import time
+import bisect
+import logging
+import argparse
+import urllib.request
+from datetime import datetime, timedelta
+
+from baostock_metrics import BaostockMetrics
+from baostock_retry import BaostockError, resilient_baostock
+from extract_high_dividend_stocks import MIN_YIELD
+from progress import setup_logging, add_logging_arguments
+
+logger = logging.getLogger(__name__)
+
+WATCH_FILE = "output/watch_yields.csv"
+EVENTS_FILE = "output/watch_events.jsonl"
+DIVIDEND_FILE = "output/all_dividend_yield_2025.csv"
+# 上次采集结果中收盘价的日期
+CLOSE_DATE = "2025-11-28"
+# 查询最近多少天的日线，覆盖节假日后取最后一个交易日
+LOOKBACK_DAYS = 10
+WATCH_FIELDS = ["股票代码", "股票名称", "排名", "2025年累计分红", "收盘价日期", "最新收盘价", "股息率(%)", "更新时间"]
+
+
+def load_watchlist(path="stocks.id"):
+    """读取stocks.id，返回(代码, 名称)列表"""
+    stocks = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split(None, 1)
+            if parts:
+                stocks.append((parts[0], parts[1].strip() if len(parts) > 1 else ""))
+    return stocks
+
+
+def load_dividends(path=DIVIDEND_FILE):
+    """上次采集的2025年累计分红，{代码: 每股分红}"""
+    dividends = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    dividends[row["股票代码"]] = float(row["2025年累计分红"])
+                except (ValueError, KeyError):
+                    continue
+    return dividends
+
+
+def load_closes(path=DIVIDEND_FILE):
+    """上次采集的收盘价，{代码: 收盘价}，没有收盘价的股票不包括在内"""
+    closes = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    close = float(row[f"{CLOSE_DATE}收盘价"])
+                except (ValueError, KeyError):
+                    continue
+                if close > 0:
+                    closes[row["股票代码"]] = close
+    return closes
+
+
+class YieldRanking:
+    """按股息率从高到低的排名：单只股票变化时用二分查找移动这一项，不重新排序全部股票"""
+
+    def __init__(self):
+        # (-股息率, 代码)升序，即股息率从高到低，相同时按代码
+        self.keys = []
+        self.yields = {}
+
+    def update(self, code, value):
+        old = self.yields.get(code)
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, (-old, code))]
+        bisect.insort(self.keys, (-value, code))
+        self.yields[code] = value
+
+    def rank(self, code):
+        return bisect.bisect_left(self.keys, (-self.yields[code], code)) + 1
+
+    def codes(self):
+        return [code for _, code in self.keys]
+
+
+class EventSink:
+    """阈值事件输出：追加到JSON Lines文件，设置了webhook时同时POST（失败只记录警告，不影响盯盘）"""
+
+    def __init__(self, path=EVENTS_FILE, webhook=None, timeout=5.0):
+        self.path = path
+        self.webhook = webhook
+        self.timeout = timeout
+
+    def emit(self, event):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if self.webhook:
+            self.post(event)
+
+    def post(self, event):
+        request = urllib.request.Request(self.webhook, data=json.dumps(event, ensure_ascii=False).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except (OSError, ValueError) as e:
+            logger.warning(f"发送事件到{self.webhook}失败: {e}")
+
+
+class YieldWatcher:
+    # 网络或会话错误时的最大重试次数和首次重试前的等待时间（秒）
+    max_retries = 3
+    retry_backoff = 1.0
+    # 单次Baostock调用的时限（秒）
+    call_timeout = 30.0
+
+    def __init__(self, threshold=MIN_YIELD, watchlist="stocks.id", sink=None, output_path=WATCH_FILE):
+        self.baostock = None
+        self.metrics = BaostockMetrics()
+        self.threshold = threshold
+        self.stocks = load_watchlist(watchlist)
+        self.names = dict(self.stocks)
+        self.sink = sink or EventSink()
+        self.output_path = output_path
+        # 上次采集中没有、单独查询的分红，与盯盘结果一起保存，重启后不再查询
+        self.dividends_path = os.path.splitext(output_path)[0] + "_dividends.json"
+        # 分红在启动时读取后保持不变；收盘价为(日期, 收盘价)
+        self.dividends = {}
+        self.prices = {}
+        self.updated = {}
+        self.ranking = YieldRanking()
+        self.polls = 0
+        self.events = 0
+
+    def init_baostock(self):
+        """初始化Baostock API"""
+        import baostock as bs
+        self.baostock = resilient_baostock(bs, self.metrics, self.max_retries, self.retry_backoff, self.call_timeout)
+        login_result = self.baostock.login()
+        if login_result.error_code != '0':
+            logger.error(f"Baostock登录失败: {login_result.error_msg}")
+            return False
+        logger.info("Baostock登录成功")
+        return True
+
+    def load_dividends(self):
+        """读取2025年累计分红；上次采集中没有的股票使用之前单独查询的结果，仍没有的查询一次并保存"""
+        dividends = load_dividends()
+        queried = self.load_queried()
+        missing = [code for code, _ in self.stocks if code not in dividends and code not in queried]
+        if missing:
+            from dividend_yield_collector import DividendYieldCollector
+            collector = DividendYieldCollector()
+            collector.baostock = self.baostock
+            for code in missing:
+                try:
+                    queried[code] = collector.get_2025_dividends(code)
+                except BaostockError as e:
+                    logger.warning(f"查询{code}的分红失败，不参与盯盘: {e}")
+            self.save_queried(queried)
+            logger.info(f"{DIVIDEND_FILE}中没有{len(missing)}只股票的分红，已单独查询")
+        # 采集结果更新后以采集结果为准
+        dividends = dict(queried, **dividends)
+        self.dividends = {code: dividends[code] for code, _ in self.stocks if code in dividends}
+
+    def load_queried(self):
+        if not os.path.exists(self.dividends_path):
+            return {}
+        try:
+            with open(self.dividends_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def save_queried(self, queried):
+        os.makedirs(os.path.dirname(self.dividends_path) or ".", exist_ok=True)
+        with open(self.dividends_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(queried, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(self.dividends_path + ".tmp", self.dividends_path)
+
+    def restore(self):
+        """读取上次盯盘的结果，重启后只有收盘价变化的股票才更新，阈值穿越也以上次的股息率为准"""
+        if not os.path.exists(self.output_path):
+            return
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                code = row["股票代码"]
+                if code not in self.dividends:
+                    continue
+                try:
+                    close = float(row["最新收盘价"])
+                except (ValueError, KeyError):
+                    continue
+                self.prices[code] = (row["收盘价日期"], close)
+                self.updated[code] = row["更新时间"]
+                self.ranking.update(code, self.dividend_yield(code, close))
+        logger.info(f"已从{self.output_path}恢复{len(self.prices)}只股票的收盘价")
+
+    def seed(self):
+        """没有盯盘记录的股票以上次采集的收盘价计算初始股息率和排名，第一轮查询即可判断阈值穿越"""
+        closes = load_closes()
+        if not closes:
+            return
+        collected = datetime.fromtimestamp(os.path.getmtime(DIVIDEND_FILE)).isoformat(timespec="seconds")
+        seeded = 0
+        for code in self.dividends:
+            if code in self.prices or code not in closes:
+                continue
+            self.prices[code] = (CLOSE_DATE, closes[code])
+            self.updated[code] = collected
+            self.ranking.update(code, self.dividend_yield(code, closes[code]))
+            seeded += 1
+        logger.info(f"{seeded}只股票以{DIVIDEND_FILE}中的收盘价作为初始排名")
+
+    def dividend_yield(self, code, close):
+        return round(self.dividends[code] / close * 100, 2) if close > 0 else 0.0
+
+    def latest_close(self, code):
+        """最近一个交易日的(日期, 收盘价)，没有数据时返回None，查询失败时抛出BaostockError"""
+        today = datetime.now()
+        rs = self.baostock.query_history_k_data_plus(
+            code=code,
+            fields="date,close",
+            start_date=(today - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d"),
+            end_date=today.strftime("%Y-%m-%d"),
+            frequency="d",
+            adjustflag="3"
+        )
+        latest = None
+        while rs.next():
+            date, close = rs.get_row_data()[:2]
+            if close:
+                latest = (date, float(close))
+        return latest
+
+    def poll(self):
+        """查询一轮收盘价，返回收盘价变化的股票"""
+        changed = []
+        errors = 0
+        for code in self.dividends:
+            try:
+                price = self.latest_close(code)
+            except BaostockError as e:
+                logger.debug(f"查询{code}的收盘价失败: {e}")
+                errors += 1
+                continue
+            if price is None or price == self.prices.get(code):
+                continue
+
+            previous = self.ranking.yields.get(code)
+            value = self.dividend_yield(code, price[1])
+            self.prices[code] = price
+            self.updated[code] = datetime.now().isoformat(timespec="seconds")
+            self.ranking.update(code, value)
+            changed.append(code)
+            if previous is not None and (previous > self.threshold) != (value > self.threshold):
+                self.emit(code, previous, value, price)
+
+        self.polls += 1
+        logger.info(f"第{self.polls}轮: {len(self.dividends)}只股票中{len(changed)}只收盘价变化"
+                    + (f"，{errors}只查询失败" if errors else ""))
+        return changed
+
+    def emit(self, code, previous, value, price):
+        """股息率穿越阈值（与筛选条件一致：大于阈值）"""
+        direction = "上穿" if value > self.threshold else "下穿"
+        event = {"time": datetime.now().isoformat(timespec="seconds"), "code": code, "name": self.names.get(code, ""),
+                 "event": "above" if value > self.threshold else "below", "threshold": self.threshold,
+                 "previous_yield": previous, "yield": value, "close": price[1], "date": price[0],
+                 "rank": self.ranking.rank(code)}
+        self.sink.emit(event)
+        self.events += 1
+        logger.info(f"{code} {event['name']}股息率{previous:.2f}% → {value:.2f}%，{direction}{self.threshold:g}%")
+
+    def save(self):
+        """按排名写入结果"""
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        with open(self.output_path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=WATCH_FIELDS)
+            writer.writeheader()
+            for rank, code in enumerate(self.ranking.codes(), 1):
+                date, close = self.prices[code]
+                writer.writerow({"股票代码": code, "股票名称": self.names.get(code, ""), "排名": rank,
+                                 "2025年累计分红": self.dividends[code], "收盘价日期": date, "最新收盘价": close,
+                                 "股息率(%)": self.ranking.yields[code], "更新时间": self.updated[code]})
+        os.replace(self.output_path + ".tmp", self.output_path)
+
+    def run(self, interval=3600.0, max_polls=None):
+        """每interval秒查询一轮，直到达到max_polls轮或Ctrl+C"""
+        try:
+            if not self.init_baostock():
+                return False
+            self.load_dividends()
+            self.restore()
+            self.seed()
+            logger.info(f"开始盯盘: {len(self.dividends)}只股票，每{interval / 60:g}分钟查询一次，阈值{self.threshold:g}%")
+            while True:
+                started = time.time()
+                if self.poll():
+                    self.save()
+                if max_polls is not None and self.polls >= max_polls:
+                    break
+                time.sleep(max(interval - (time.time() - started), 0.0))
+        except KeyboardInterrupt:
+            logger.info("已停止盯盘")
+        finally:
+            if self.baostock:
+                self.baostock.logout()
+                logger.info(f"Baostock已退出，共{self.polls}轮，阈值事件{self.events}个")
+                self.metrics.print_summary()
+                self.metrics.export("yield_watch")
+        return True
+
+
+def add_arguments(parser):
+    """添加命令行参数，脚本和dividend_ranker.py子命令共用"""
+    parser.add_argument("--interval", type=float, default=60.0, help="查询间隔（分钟）")
+    parser.add_argument("--once", action="store_true", help="只查询一轮")
+    parser.add_argument("--max-polls", type=int, default=None, help="查询指定轮数后退出")
+    parser.add_argument("--threshold", type=float, default=MIN_YIELD, help="股息率阈值(%%)，穿越时产生事件")
+    parser.add_argument("--watchlist", default="stocks.id", help="盯盘的股票列表")
+    parser.add_argument("--events", default=EVENTS_FILE, help="阈值事件文件（JSON Lines）")
+    parser.add_argument("--webhook", default=None, help="阈值事件同时以JSON POST到该地址")
+    add_logging_arguments(parser)
+
+
+def main(args):
+    """按命令行参数运行"""
+    setup_logging(args.log_level, args.log_json)
+    if not os.path.exists(args.watchlist):
+        logger.error(f"{args.watchlist}不存在，请先运行extract_high_dividend_stocks.py")
+        return False
+    watcher = YieldWatcher(args.threshold, args.watchlist, EventSink(args.events, args.webhook))
+    return watcher.run(args.interval * 60, 1 if args.once else args.max_polls)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    add_arguments(parser)
+    main(parser.parse_args())